@@ -1,20 +1,59 @@
 from .orm.orm_simpkg import *
+from .reflection_cache import ReflectionCache
+from .instrumentation import QueryReport
 
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+from inspect import isgeneratorfunction
+from types import SimpleNamespace
 
+import functools
 import warnings
+import re
+import threading
+import time
 
-from sqlalchemy import create_engine, and_
-from sqlalchemy import MetaData, Table, Column, Integer
+from sqlalchemy import create_engine, and_, case, event, func, inspect as sa_inspect
+from sqlalchemy import MetaData, Table, Column, Integer, text
 from sqlalchemy import exc as sa_exc
 from sqlalchemy.sql import select
+from sqlalchemy.types import NullType
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session, sessionmaker, mapper
 from sqlalchemy.sql.functions import Function as SQLFunction
 
-import psycopg2
+# Tuple containing information requried to connect to the database. Apart from the basic connection
+# parameters, the tuple holds optional settings for the engine's connection pool and its connections:
+#  - pool_size: number of connections kept open in the pool (int)
+#  - max_overflow: number of connections allowed in addition to the pool size (int)
+#  - pool_pre_ping: test connections for liveness before using them (bool)
+#  - pool_recycle: recycle connections after this number of seconds (int)
+#  - statement_timeout: abort statements that take longer than this number of milliseconds (int)
+#  - application_name: name used to identify the connections in the database (string)
+#  - reflection_cache_dir: directory for caching reflected table metadata across processes (string)
+PostgreSQLConnectionInfo = namedtuple(
+    'PostgreSQLConnectionInfo',
+    [ 'user', 'pwd', 'host', 'port', 'dbname',
+      'pool_size', 'max_overflow', 'pool_pre_ping', 'pool_recycle', 'statement_timeout', 'application_name',
+      'reflection_cache_dir' ]
+    )
+PostgreSQLConnectionInfo.__new__.__defaults__ = ( None, None, False, None, None, None, None )
+
+# SQL query for retrieving the kind and the columns of several tables and views at once.
+RELATION_COLUMNS_QUERY = text(
+    """
+    SELECT n.nspname, c.relname, c.relkind, a.attname, format_type( a.atttypid, a.atttypmod )
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+    WHERE ( n.nspname || '.' || c.relname ) = ANY( :relations )
+    AND a.attnum > 0 AND NOT a.attisdropped
+    ORDER BY n.nspname, c.relname, a.attnum
+    """
+    )
 
-# Tuple containing information requried to connect to the database.
-PostgreSQLConnectionInfo = namedtuple( 'PostgreSQLConnectionInfo', [ 'user', 'pwd', 'host', 'port', 'dbname' ] )
+# Pattern for retrieving the name of the SQL function called by a statement (first entry of the target list).
+SQL_FUNCTION_PATTERN = re.compile( r'^\s*SELECT\s+([\w.]+)\s*\(', re.IGNORECASE )
 
 # Tuple containing information about the existing object representation in the database.
 ObjectClassInfo = namedtuple( 'ObjectClassInfo', [ 'id', 'schema', 'table_name' ] )
@@ -22,67 +61,458 @@ ObjectClassInfo = namedtuple( 'ObjectClassInfo', [ 'id', 'schema', 'table_name'
 # Tuple containing information about the mapped object representation.
 MappedClassInfo = namedtuple( 'MappedClassInfo', [ 'impl', 'schema', 'table_name' ] )
 
+# Tuple containing the parameters of a query for joining mapped object classes (see function 'DBAccess.join_citydb_objects').
+JoinQuery = namedtuple( 'JoinQuery', [ 'class_names', 'conditions', 'result_index', 'columns', 'group_by' ] )
+JoinQuery.__new__.__defaults__ = ( None, None, None )
+
+
+# Tuple containing the mapped classes of the Simulation Package.
+SimPkgClasses = namedtuple(
+    'SimPkgClasses',
+    [ 'Simulation', 'SimulationTool', 'Node', 'Port', 'PortConnectionExt',
+      'GenericParameterTool', 'GenericParameterNode', 'GenericParameterSimulation', 'GenericAttribute' ]
+    )
+
+
+class ORMRegistry:
+    """
+    Engine, reflected meta data and object relational mappings associated to one database.
+
+    All instances of class DBAccess connected to the same database (with the same host, port, database name and user) share one registry, i.e., they share the engine (and its connection pool) and classes are mapped only once. Connections to different databases use separate registries, which allows to access several databases concurrently from one process.
+    """
+
+    def __init__( self, connection_info, engine ):
+        """
+        Constructor.
+
+        :param connection_info: tuple containing connection parameters for database (PostgreSQLConnectionInfo)
+        :param engine: engine connected to the database (sqlalchemy.engine.Engine)
+        """
+        self.connection_info = connection_info
+        self.engine = engine
+
+        # Number of instances of class DBAccess connected via this registry.
+        self.users = 0
+
+        # Number of active reports counting the statements sent via the engine (see function 'instrument').
+        self.instrumented = 0
+
+        # Meta data of all reflected tables and views.
+        self.metadata = MetaData( engine )
+        self.reflection_cache = None
+        self.objectclass_data = None
+        self.cached_table_count = 0
+
+        # Flag to check whether ORM mapping for the Simulation Package has already been done.
+        self.simpkg_orm_mapping_init = False
+
+        # Mapped classes of the Simulation Package (SimPkgClasses).
+        self.simpkg = None
+
+        # Flag to check whether ORM mapping for the CityDB has already been initialized.
+        self.citydb_orm_mapping_init = False
+
+        # List of all classes in 3dCityDB (to be retrieved from CityDB).
+        self.citydb_objectclass_list = {}
+
+        # List of mapped classes from 3DCityDB.
+        self.citydb_objectclass_map = {}
+
+        # Lock for mapping classes and reflecting tables (reentrant, because mapping a class may trigger the initialization of the CityDB mapping).
+        self.lock = threading.RLock()
+
+
+    def instrument( self, enable ):
+        """
+        Turn the counting of the statements sent via the engine on or off (see function 'DBAccess.query_report'). Statements are counted as long as at least one report is active, the event handlers are only registered with the engine for this time.
+
+        :param enable: count statements for one more report (True) or for one report less (False) (bool)
+        :return: none
+        """
+        with self.lock:
+            if enable is True:
+                self.instrumented += 1
+
+                if self.instrumented == 1:
+                    event.listen( self.engine, 'before_cursor_execute', _before_cursor_execute )
+                    event.listen( self.engine, 'after_cursor_execute', _after_cursor_execute )
+            else:
+                self.instrumented -= 1
+
+                if self.instrumented == 0:
+                    event.remove( self.engine, 'before_cursor_execute', _before_cursor_execute )
+                    event.remove( self.engine, 'after_cursor_execute', _after_cursor_execute )
+
+
+    def dispose( self ):
+        """
+        Close all pooled connections of the engine and remove the mappings of all classes mapped for this registry (classes of the Simulation Package and classes mapped with function 'DBAccess.map_citydb_object_class'). The classes can no longer be used for queries afterwards, new connections to the database use a new registry with newly mapped classes.
+
+        :return: none
+        """
+        with self.lock:
+            mapped_classes = [ info.impl for info in self.citydb_objectclass_map.values() ]
+            if self.simpkg is not None:
+                mapped_classes.extend( self.simpkg )
+
+            # Mappers are only referenced by their classes, i.e., disposed mappers are garbage collected.
+            for cls in mapped_classes:
+                class_mapper = sa_inspect( cls, raiseerr = False )
+                if class_mapper is not None:
+                    class_mapper.dispose()
+
+            self.citydb_objectclass_map = {}
+            self.citydb_orm_mapping_init = False
+            self.simpkg = None
+            self.simpkg_orm_mapping_init = False
+
+            self.engine.dispose()
+
+
+    def load_reflection_cache( self, cache_dir ):
+        """
+        Load reflected tables and views (and the list of object classes) from the reflection cache.
+
+        :param cache_dir: directory for storing the cache files (string)
+        :return: none
+        """
+        self.reflection_cache = ReflectionCache( cache_dir, self.connection_info, self.engine )
+
+        ( cached_metadata, self.objectclass_data ) = self.reflection_cache.load()
+
+        if cached_metadata is not None:
+            cached_metadata.bind = self.engine
+            self.metadata = cached_metadata
+
+        self.cached_table_count = len( self.metadata.tables )
+
+
+def instrumented( method ):
+    """
+    Decorator for methods of class DBAccess (and derived classes) that send statements to the database. The statements are attributed to the method in the reports of the instance (see function 'DBAccess.query_report'). Statements sent by nested calls of other instrumented methods are attributed to the innermost method.
+
+    :param method: method sending statements to the database (function or generator function)
+    :return: decorated method (function)
+    """
+    if isgeneratorfunction( method ):
+        # Generators send their statements while they are iterated.
+        @functools.wraps( method )
+        def generator_wrapper( self, *args, **kwargs ):
+            generator = method( self, *args, **kwargs )
+
+            while True:
+                with self._instrumented_call( method.__name__ ):
+                    try:
+                        result = next( generator )
+                    except StopIteration:
+                        return
+
+                yield result
+
+        return generator_wrapper
+
+    @functools.wraps( method )
+    def wrapper( self, *args, **kwargs ):
+        with self._instrumented_call( method.__name__ ):
+            return method( self, *args, **kwargs )
+
+    return wrapper
+
 
 class DBAccess:
     """
     Base class for accessing the database.
     """
 
-    # Flag to check whether ORM mapping for the Simulation Package has already been done.
-    simpkg_orm_mapping_init = False
+    # Registries of engines and mappings, one for each database (dict of ORMRegistry, see function 'registry_key').
+    registries = {}
+
+    # Lock for creating registries.
+    registries_lock = threading.Lock()
 
-    # Flag to check whether ORM mapping for the CityDB has already been initialized.
-    citydb_orm_mapping_init = False
+    # Maximum number of entries in the target list of a single PostgreSQL statement.
+    max_target_list_length = 1664
 
-    # List of all classes in 3dCityDB (to be retrieved from CityDB).
-    citydb_objectclass_list = {}
 
-    # List of mapped classes from 3DCityDB.
-    citydb_objectclass_map = {}
+    def __init__( self, thread_safe = False ):
+        """
+        Constructor.
+
+        :param thread_safe: if True, each thread uses its own current session, which allows to share the instance among several threads (bool, optional, default=False)
+        """
+        self.thread_safe = thread_safe
 
+        # Holder of the current session, of the currently called instrumented method and of the names of the
+        # SQL functions called by the current statement (one per thread in thread-safe mode).
+        self._thread_state = threading.local() if thread_safe is True else SimpleNamespace()
+
+        # Statistics of all statements sent to the database by this instance while statements are counted, i.e., while
+        # a report of any instance connected to the same database is active (QueryReport).
+        self.query_statistics = QueryReport()
+
+        # Reports of the currently instrumented blocks of code (list of QueryReport). The list is replaced instead of
+        # modified, i.e., other threads may iterate over it at any time.
+        self._query_reports = []
+        self._query_reports_lock = threading.Lock()
 
-    def __init__( self ):
         self.engine = None
+        self._instance_engine = None
         self.session = None
         self.current_session = None
         self.connection_info = None
+        self.metadata = None
+        self.registry = None
+
+
+    @property
+    def current_session( self ):
+        """
+        Current database session, or None if no session has been started (sqlalchemy.orm.session.Session). In thread-safe mode, the current session refers to the calling thread.
+        """
+        return getattr( self._thread_state, 'session', None )
+
+
+    @current_session.setter
+    def current_session( self, session ):
+        self._thread_state.session = session
+
+
+    @contextmanager
+    def query_report( self ):
+        """
+        Context manager for retrieving the statistics of the statements sent to the database by this instance within a block of code (from any thread). Statements are only counted while a report is active.
+
+        Example:
+            with access.query_report() as report:
+                net = reader.get_net( network_id )
+            print( report.total.round_trips )
+
+        :return: report, filled when the block is left (QueryReport)
+        """
+        report = QueryReport()
+
+        # Instances that are not connected (e.g., simulation model readers constructed with a snapshot file) send no statements, i.e., their reports remain empty.
+        registry = self.registry
+
+        with self._query_reports_lock:
+            self._query_reports = self._query_reports + [ report ]
+
+        if registry is not None: registry.instrument( True )
+
+        start = time.perf_counter()
+
+        try:
+            yield report
+        finally:
+            report.elapsed = time.perf_counter() - start
+
+            if registry is not None: registry.instrument( False )
+
+            with self._query_reports_lock:
+                self._query_reports = [ r for r in self._query_reports if r is not report ]
+
+
+    @contextmanager
+    def _instrumented_call( self, method ):
+        """
+        Context manager for attributing the statements sent to the database within a block of code to a method (see decorator 'instrumented').
+
+        :param method: name of the method (string)
+        :return: none
+        """
+        previous = getattr( self._thread_state, 'method', None )
+        self._thread_state.method = method
+
+        try:
+            yield
+        finally:
+            self._thread_state.method = previous
+
+
+    def _record_query( self, statement, rows, elapsed ):
+        """
+        Count a statement sent to the database, attributed to the currently called instrumented method (or to 'other').
+
+        :param statement: SQL statement (string)
+        :param rows: number of rows fetched or affected by the statement (int)
+        :param elapsed: time spent executing the statement in seconds (float)
+        :return: none
+        """
+        method = getattr( self._thread_state, 'method', None ) or 'other'
+        functions = getattr( self._thread_state, 'functions', None )
+
+        if functions is None:
+            match = SQL_FUNCTION_PATTERN.match( statement )
+            functions = [] if match is None else [ match.group( 1 ) ]
+
+        for report in [ self.query_statistics ] + self._query_reports:
+            report.add( method, functions, rows, elapsed )
+
+
+    @staticmethod
+    def registry_key( connection_info ):
+        """
+        Retrieve the key identifying the registry of engine and mappings for a database.
+
+        :param connection_info: tuple containing connection parameters for database (PostgreSQLConnectionInfo)
+        :return: host, port, database name and user (tuple)
+        """
+        return ( connection_info.host, str( connection_info.port ), connection_info.dbname, connection_info.user )
 
 
     def connect_to_citydb( self, connection_info ):
         """
-        Connect to the database by initializing an engine and a session.
+        Connect to the database by initializing an engine and a session. Engine and mappings are shared with all other instances connected to the same database, which must therefore specify the same password, pool and connection settings.
 
         :return: none
         """
         if not isinstance( connection_info, PostgreSQLConnectionInfo ):
             raise TypeError( 'parameter \'connection_info\' must be of type \'PostgreSQLConnectionInfo\'' )
 
-        # Construct connection string.
-        db_connection_string = str()
-
-        if isinstance( connection_info, PostgreSQLConnectionInfo ):
-            db_connection_string = 'postgresql://{0}:{1}@{2}:{3}/{4}'
-            db_connection_string = db_connection_string.format(
-                connection_info.user,
-                connection_info.pwd,
-                connection_info.host,
-                connection_info.port,
-                connection_info.dbname
-                )
-        else:
-            err_msg = 'unrecognized type for parameter \'connection_info\''
-            raise RuntimeError( err_msg )
+        # Release the registry of a previous connection.
+        if self.registry is not None: self.disconnect_from_citydb()
+
+        key = DBAccess.registry_key( connection_info )
+
+        with DBAccess.registries_lock:
+            # Retrieve registry of engine and mappings.
+            registry = DBAccess.registries.get( key )
+
+            if registry is not None:
+                self._check_shared_registry( registry, connection_info )
+            else:
+                # Construct connection string.
+                db_connection_string = 'postgresql://{0}:{1}@{2}:{3}/{4}'
+                db_connection_string = db_connection_string.format(
+                    connection_info.user,
+                    connection_info.pwd,
+                    connection_info.host,
+                    connection_info.port,
+                    connection_info.dbname
+                    )
+
+                # Connect to database.
+                engine = create_engine( db_connection_string, **self._engine_options( connection_info ) )
+
+                registry = ORMRegistry( connection_info, engine )
+
+                if connection_info.reflection_cache_dir is not None:
+                    registry.load_reflection_cache( connection_info.reflection_cache_dir )
 
-        # Connect to database.
-        self.engine = create_engine( db_connection_string )
+                DBAccess.registries[ key ] = registry
 
-        # Create session.
-        self.session = sessionmaker( bind = self.engine )
+            registry.users += 1
+
+        self.registry = registry
+
+        # Engine and meta data of all reflected tables and views.
+        self.engine = registry.engine
+        self.metadata = registry.metadata
+
+        # Engine (sharing the connection pool) and session factory tagging all statements with this instance (see function 'query_report').
+        self._instance_engine = registry.engine.execution_options( dblayer_access = self )
+        self.session = sessionmaker( bind = self._instance_engine )
 
         # Save database connection information.
         self.connection_info = connection_info
 
 
+    def disconnect_from_citydb( self, dispose = True ):
+        """
+        Close the current session. When the last instance connected to the database disconnects, all pooled connections of the shared engine are closed.
+
+        :param dispose: close the pooled connections and discard the registry of engine and mappings when no other instance is connected to the database, classes mapped for the registry can no longer be used afterwards (bool, optional, default=True)
+        :return: none
+        """
+        self.close_citydb_session()
+
+        if self.registry is not None:
+            key = DBAccess.registry_key( self.connection_info )
+
+            with DBAccess.registries_lock:
+                self.registry.users -= 1
+
+                if self.registry.users == 0 and dispose is True:
+                    self.registry.dispose()
+
+                    if DBAccess.registries.get( key ) is self.registry:
+                        del DBAccess.registries[ key ]
+
+        self.engine = None
+        self._instance_engine = None
+        self.session = None
+        self.connection_info = None
+        self.metadata = None
+        self.registry = None
+
+
+    @property
+    def simpkg( self ):
+        """
+        Mapped classes of the Simulation Package for the connected database (SimPkgClasses). Use these classes for queries (e.g., 'access.simpkg.Node'), the classes defined in module 'dblayer.orm.orm_simpkg' are not mapped.
+        """
+        if self.registry is None:
+            raise RuntimeError( 'not connected to database' )
+
+        self._init_simpkg_orm()
+
+        return self.registry.simpkg
+
+
+    def _check_shared_registry( self, registry, connection_info ):
+        """
+        Check that the connection parameters are compatible with the registry of engine and mappings that is shared with other instances.
+
+        :param registry: registry of engine and mappings for the database (ORMRegistry)
+        :param connection_info: tuple containing connection parameters for database (PostgreSQLConnectionInfo)
+        :return: none
+        """
+        shared_info = registry.connection_info
+
+        if connection_info.pwd != shared_info.pwd:
+            raise RuntimeError( 'password differs from the one of the engine shared with other instances' )
+
+        if self._engine_options( connection_info ) != self._engine_options( shared_info ):
+            raise RuntimeError( 'pool and connection settings conflict with those of the engine shared with other instances' )
+
+        if connection_info.reflection_cache_dir is not None and \
+            connection_info.reflection_cache_dir != shared_info.reflection_cache_dir:
+            raise RuntimeError( 'reflection cache directory conflicts with the one of the registry shared with other instances' )
+
+
+    def _engine_options( self, connection_info ):
+        """
+        Retrieve the options for creating an engine from the connection information.
+
+        :param connection_info: tuple containing connection parameters for database (PostgreSQLConnectionInfo)
+        :return: keyword arguments for function 'sqlalchemy.create_engine' (dict)
+        """
+        engine_options = dict( pool_pre_ping = bool( connection_info.pool_pre_ping ) )
+
+        if connection_info.pool_size is not None:
+            engine_options[ 'pool_size' ] = connection_info.pool_size
+
+        if connection_info.max_overflow is not None:
+            engine_options[ 'max_overflow' ] = connection_info.max_overflow
+
+        if connection_info.pool_recycle is not None:
+            engine_options[ 'pool_recycle' ] = connection_info.pool_recycle
+
+        # Settings applied to each new connection (via psycopg2).
+        connect_args = {}
+
+        if connection_info.application_name is not None:
+            connect_args[ 'application_name' ] = connection_info.application_name
+
+        if connection_info.statement_timeout is not None:
+            connect_args[ 'options' ] = '-c statement_timeout={:d}'.format( connection_info.statement_timeout )
+
+        if connect_args:
+            engine_options[ 'connect_args' ] = connect_args
+
+        return engine_options
+
+
     def start_citydb_session( self ):
         """
         Start a new database session.
@@ -96,6 +526,17 @@ class DBAccess:
         self.current_session = self.session()
 
 
+    def close_citydb_session( self ):
+        """
+        Close the current session (in thread-safe mode, the session of the calling thread) and return its connection to the pool.
+
+        :return: none
+        """
+        if self.current_session is not None:
+            self.current_session.close()
+            self.current_session = None
+
+
     def commit_citydb_session( self ):
         """
         Commit changes of the current session to the database.
@@ -105,6 +546,7 @@ class DBAccess:
         if self.current_session is not None: self.current_session.commit()
 
 
+    @instrumented
     def add_citydb_object( self, func, **args ):
         """
         Add a new object to the database.
@@ -112,13 +554,75 @@ class DBAccess:
         :param func: inserter function (sqlalchemy.sql.functions.Function)
         :return: returns the scalar return value of the inserter function (typically an object-specific ID)
         """
-        # Check if parameter 'func' is a callable object (function)
-        if not callable( func ):
-            raise TypeError( 'parameter \'func\' must be a function returning type \'sqlalchemy.sql.functions.Function\'' )
+        # Retrieve inserter function.
+        inserter_func = self._get_inserter_function( func, args )
 
         # Start new session if necessary.
         if self.current_session is None: self.start_citydb_session()
 
+        return self.current_session.query( inserter_func ).one()[0]
+
+
+    @instrumented
+    def add_citydb_objects( self, objects, args = None, chunk_size = 1000 ):
+        """
+        Add several new objects to the database. Instead of one round trip per object, the inserter functions are sent to the database in chunks, with all calls of one chunk evaluated in a single SQL statement.
+
+        The objects can either be specified as a list of tuples, each containing an inserter function and a dict of its arguments, or as a single inserter function together with a list of dicts of arguments.
+
+        :param objects: list of tuples (inserter function, dict of arguments) or a single inserter function (sqlalchemy.sql.functions.Function)
+        :param args: list of arguments used with a single inserter function (list of dict, optional)
+        :param chunk_size: maximum number of inserter function calls per SQL statement (int, optional, default=1000)
+        :return: returns the scalar return values of the inserter functions in input order (list)
+        """
+        if args is None:
+            items = list( objects )
+        else:
+            items = [ ( objects, a ) for a in args ]
+
+        # PostgreSQL restricts the number of entries in the target list of a statement.
+        if not 0 < chunk_size <= DBAccess.max_target_list_length:
+            raise ValueError( 'parameter \'chunk_size\' must be between 1 and {}'.format( DBAccess.max_target_list_length ) )
+
+        # Retrieve all inserter functions before sending anything to the database.
+        inserter_funcs = [ self._get_inserter_function( func, a ) for ( func, a ) in items ]
+
+        # Start new session if necessary.
+        if self.current_session is None: self.start_citydb_session()
+
+        results = []
+
+        for start in range( 0, len( inserter_funcs ), chunk_size ):
+            chunk = inserter_funcs[ start : start + chunk_size ]
+
+            # Evaluate all inserter functions of the chunk as (uniquely labeled) columns of one single-row query.
+            columns = [ f.label( 'obj_{}'.format( i ) ) for ( i, f ) in enumerate( chunk ) ]
+
+            # Annotate the statement with the names of the called functions (for the query statistics).
+            self._thread_state.functions = sorted( set(
+                '.'.join( list( f.packagenames ) + [ f.name ] ) for f in chunk
+                ) )
+
+            try:
+                results.extend( self.current_session.query( *columns ).one() )
+            finally:
+                self._thread_state.functions = None
+
+        return results
+
+
+    def _get_inserter_function( self, func, args ):
+        """
+        Retrieve an inserter function and check its type.
+
+        :param func: inserter function (sqlalchemy.sql.functions.Function)
+        :param args: arguments of the inserter function (dict)
+        :return: inserter function call (sqlalchemy.sql.functions.Function)
+        """
+        # Check if parameter 'func' is a callable object (function)
+        if not callable( func ):
+            raise TypeError( 'parameter \'func\' must be a function returning type \'sqlalchemy.sql.functions.Function\'' )
+
         # Retrieve inserter function.
         inserter_func = func( **args )
 
@@ -126,10 +630,11 @@ class DBAccess:
         if not isinstance( inserter_func, SQLFunction ):
             raise TypeError( 'parameter \'func\' must be a function returning type \'sqlalchemy.sql.functions.Function\'' )
 
-        return self.current_session.query( inserter_func ).one()[0]
+        return inserter_func
 
 
-    def get_citydb_objects( self, class_name, table_name = None, schema = None, conditions = None ):
+    @instrumented
+    def get_citydb_objects( self, class_name, table_name = None, schema = None, conditions = None, columns = None ):
         """
         Retrieve all objects of one type from the database.
 
@@ -137,8 +642,38 @@ class DBAccess:
         :param table: alternative table name (string, optional)
         :param schema: alternative schema name (string, optional)
         :param conditions: list of filters applied when retrieving the objects (list of sqlalchemy.sql.elements.BinaryExpression, optional)
+        :param columns: retrieve only these columns instead of complete objects, specified as column names of the mapped object class or as SQL expressions (list of string or sqlalchemy.sql.elements.ColumnElement, optional)
+
+        :return: list of results (mapped objects or, if parameter columns is specified, named tuples)
+        """
+        return self._get_citydb_objects_query( class_name, table_name, schema, conditions, columns ).all()
+
+
+    @instrumented
+    def iter_citydb_objects( self, class_name, table_name = None, schema = None, conditions = None, columns = None, yield_per = 1000 ):
+        """
+        Iterate over all objects of one type from the database. In contrast to function 'get_citydb_objects', the results are not retrieved all at once, but are fetched in chunks via a server-side cursor.
+
+        :param class_name: name of mapped object class (string)
+        :param table: alternative table name (string, optional)
+        :param schema: alternative schema name (string, optional)
+        :param conditions: list of filters applied when retrieving the objects (list of sqlalchemy.sql.elements.BinaryExpression, optional)
+        :param columns: retrieve only these columns instead of complete objects, specified as column names of the mapped object class or as SQL expressions (list of string or sqlalchemy.sql.elements.ColumnElement, optional)
+        :param yield_per: number of objects fetched from the database per chunk (int, optional, default=1000)
+
+        :return: generator of results (mapped objects or, if parameter columns is specified, named tuples)
+        """
+        query = self._get_citydb_objects_query( class_name, table_name, schema, conditions, columns )
+
+        for result in query.yield_per( yield_per ):
+            yield result
+
+
+    def _get_citydb_objects_query( self, class_name, table_name, schema, conditions, columns = None ):
+        """
+        Define query for retrieving all objects of one type from the database.
 
-        :return: list of results
+        :return: query (sqlalchemy.orm.query.Query)
         """
         # Retrieve mapped class representing the object.
         ObjectClass = self.map_citydb_object_class( class_name, table_name, schema )
@@ -147,9 +682,9 @@ class DBAccess:
         if self.current_session is None: self.start_citydb_session()
 
         # Retrieve class info.
-        class_info = DBAccess.citydb_objectclass_list[ class_name ]
+        class_info = self.registry.citydb_objectclass_list[ class_name ]
 
-        if conditions is None: conditions = []
+        conditions = [] if conditions is None else list( conditions )
 
         if not class_info.id is None:
             try:
@@ -165,26 +700,119 @@ class DBAccess:
 
         filter_conditions = and_( *conditions )
 
-        return self.current_session.query( ObjectClass ).filter( filter_conditions ).all()
+        if columns is None:
+            return self.current_session.query( ObjectClass ).filter( filter_conditions )
 
+        # Retrieve only selected columns (as plain named tuples, bypassing the identity map).
+        return self.current_session.query( *self._get_columns( ObjectClass, columns ) ) \
+            .select_from( ObjectClass ).filter( filter_conditions )
 
-    def join_citydb_objects( self, class_names, conditions, result_index = None ):
+
+    @instrumented
+    def join_citydb_objects( self, class_names, conditions, result_index = None, columns = None, group_by = None ):
         """
         Retrieve selected objects from the database by 'joining' more than one table or view. The tables or views are represented by object classes, which have to mapped before performing this operation.
 
         :param class_names: list name of mapped object class (list of string)
         :param conditions: list of filters applied when retrieving the objects (list of sqlalchemy.sql.elements.BinaryExpression, optional)
         :param result_index: restrict results to the collection output associated to this index, i.e., if result_index == N then only the results for the (N+1)th object class will be returned (int, optional)
+        :param columns: retrieve only these columns instead of complete objects, specified as column names of the object class selected by parameter result_index (or of the first object class) or as SQL expressions (list of string or sqlalchemy.sql.elements.ColumnElement, optional)
+        :param group_by: group the results by these columns, e.g., when retrieving aggregates with parameter columns (list of sqlalchemy.sql.elements.ColumnElement, optional)
 
-        :return: list of results, with each entry a collection of associated result objects (list of sqlalchemy.util._collections.result), unless parameter result_index is specified (see above)
+        :return: list of results, with each entry a collection of associated result objects (list of sqlalchemy.util._collections.result), unless parameter result_index is specified (see above), or a list of named tuples if parameter columns is specified
         """
+        query_result = self._join_citydb_objects_query( class_names, conditions, result_index, columns, group_by ).all()
+
+        return \
+            query_result if ( result_index is None or columns is not None ) else \
+            [ result[result_index] for result in query_result ]
+
+
+    @instrumented
+    def iter_join_citydb_objects( self, class_names, conditions, result_index = None, columns = None, yield_per = 1000, group_by = None ):
+        """
+        Iterate over selected objects from the database by 'joining' more than one table or view. In contrast to function 'join_citydb_objects', the results are not retrieved all at once, but are fetched in chunks via a server-side cursor.
+
+        :param class_names: list name of mapped object class (list of string)
+        :param conditions: list of filters applied when retrieving the objects (list of sqlalchemy.sql.elements.BinaryExpression, optional)
+        :param result_index: restrict results to the collection output associated to this index, i.e., if result_index == N then only the results for the (N+1)th object class will be returned (int, optional)
+        :param columns: retrieve only these columns instead of complete objects, specified as column names of the object class selected by parameter result_index (or of the first object class) or as SQL expressions (list of string or sqlalchemy.sql.elements.ColumnElement, optional)
+        :param yield_per: number of results fetched from the database per chunk (int, optional, default=1000)
+        :param group_by: group the results by these columns, e.g., when retrieving aggregates with parameter columns (list of sqlalchemy.sql.elements.ColumnElement, optional)
+
+        :return: generator of results, with each entry a collection of associated result objects (sqlalchemy.util._collections.result), unless parameter result_index is specified (see above), or named tuples if parameter columns is specified
+        """
+        query = self._join_citydb_objects_query( class_names, conditions, result_index, columns, group_by )
+
+        for result in query.yield_per( yield_per ):
+            yield result if ( result_index is None or columns is not None ) else result[result_index]
+
+
+    @instrumented
+    def pivot_generic_attributes( self, attribute_names, class_names = None, conditions = None,
+        class_name = 'GenericAttribute', value_column = 'realval' ):
+        """
+        Retrieve the values of several generic attributes as a table with one column per attribute, keyed by the ID of the associated city object. All attributes are retrieved in one pass over the table of generic attributes.
+
+        :param attribute_names: names of the generic attributes (list of string)
+        :param class_names: names of further mapped object classes joined with the generic attributes (list of string, optional)
+        :param conditions: list of filters applied when retrieving the generic attributes, e.g., for joining them with the further object classes (list of sqlalchemy.sql.elements.BinaryExpression, optional)
+        :param class_name: name of the mapped object class representing the generic attributes (string, optional, default='GenericAttribute')
+        :param value_column: name of the column storing the attribute values (string, optional, default='realval')
+
+        :return: list of named tuples, each containing the ID of a city object (column 'cityobject_id') and the attribute values (column named like the attribute, None if the city object has no such attribute)
+        """
+        return self.join_citydb_objects(
+            *self._pivot_generic_attributes_query( attribute_names, class_names, conditions, class_name, value_column )
+            )
+
+
+    def _pivot_generic_attributes_query( self, attribute_names, class_names = None, conditions = None,
+        class_name = 'GenericAttribute', value_column = 'realval' ):
+        """
+        Define query for retrieving the values of several generic attributes with one column per attribute (see function 'pivot_generic_attributes').
+
+        :return: query parameters (JoinQuery)
+        """
+        if len( attribute_names ) == 0:
+            raise RuntimeError( 'parameter \'attribute_names\' must not be empty' )
+
+        GenericAttribute = self.map_citydb_object_class( class_name )
+        value = getattr( GenericAttribute, value_column )
+
+        # One aggregate per attribute, picking the value of the row with the matching attribute name.
+        columns = [ 'cityobject_id' ] + [
+            func.max( case( [ ( GenericAttribute.attrname == name, value ) ] ) ).label( name )
+            for name in attribute_names
+            ]
+
+        conditions = [ GenericAttribute.attrname.in_( attribute_names ) ] + \
+            ( [] if conditions is None else list( conditions ) )
+
+        return JoinQuery(
+            class_names = [ class_name ] + ( [] if class_names is None else list( class_names ) ),
+            conditions = conditions,
+            result_index = 0,
+            columns = columns,
+            group_by = [ GenericAttribute.cityobject_id ]
+            )
+
+
+    def _join_citydb_objects_query( self, class_names, conditions, result_index = None, columns = None, group_by = None ):
+        """
+        Define query for retrieving selected objects from the database by 'joining' more than one table or view.
+
+        :return: query (sqlalchemy.orm.query.Query)
+        """
+        conditions = [] if conditions is None else list( conditions )
+
         # Retrieve mapped classes representing the objects.
         object_classes = []
         for class_name in class_names:
             ObjectClass = self.map_citydb_object_class( class_name )
 
             # Retrieve class info.
-            class_info = DBAccess.citydb_objectclass_list[ class_name ]
+            class_info = self.registry.citydb_objectclass_list[ class_name ]
 
             if not class_info.id is None:
                 try:
@@ -205,13 +833,42 @@ class DBAccess:
 
         filter_conditions = and_( *conditions )
 
-        query_result = self.current_session.query( *object_classes ).filter( filter_conditions ).all()
+        if columns is None:
+            query = self.current_session.query( *object_classes ).filter( filter_conditions )
+        else:
+            # Retrieve only selected columns (as plain named tuples, bypassing the identity map).
+            ObjectClass = object_classes[ 0 if result_index is None else result_index ]
 
-        return \
-            [ result for result in query_result ] if result_index is None else \
-            [ result[result_index] for result in query_result ]
+            query = self.current_session.query( *self._get_columns( ObjectClass, columns ) ) \
+                .select_from( *object_classes ).filter( filter_conditions )
+
+        return query if group_by is None else query.group_by( *group_by )
+
+
+    def _get_columns( self, ObjectClass, columns ):
+        """
+        Retrieve columns of a mapped object class.
+
+        :param ObjectClass: mapped object class
+        :param columns: column names or SQL expressions (list of string or sqlalchemy.sql.elements.ColumnElement)
+        :return: list of columns
+        """
+        column_entities = []
+
+        for column in columns:
+            if not isinstance( column, str ):
+                column_entities.append( column )
+                continue
 
+            try:
+                column_entities.append( getattr( ObjectClass, column ) )
+            except AttributeError:
+                raise RuntimeError( 'unknown column for object class {}: {}'.format( ObjectClass.__name__, column ) )
+
+        return column_entities
 
+
+    @instrumented
     def execute_function( self, func ):
         """
         Execute SQL function.
@@ -229,6 +886,7 @@ class DBAccess:
         return self.current_session.query( func ).one()[0]
 
 
+    @instrumented
     def cleanup_simpkg_schema( self ):
         """
         Clean-up the simulation package database, i.e., delete the content of all tables and views related to the simulation package.
@@ -238,21 +896,11 @@ class DBAccess:
         if self.connection_info is None:
             raise RuntimeError( 'not connected to database' )
 
-        # Make low-level connection (via psycopg2).
-        connection = psycopg2.connect(
-            user = self.connection_info.user,
-            password = self.connection_info.pwd,
-            host = self.connection_info.host,
-            port = self.connection_info.port,
-            dbname = self.connection_info.dbname )
-
-        # Get cursor and execute 'cleanup_schema' function.
-        connection.cursor().execute( 'SELECT sim_pkg.cleanup_schema();' )
-
-        # Commit the changes.
-        connection.commit()
+        # Execute 'cleanup_schema' function.
+        self._execute_raw_sql( 'SELECT sim_pkg.cleanup_schema();' )
 
 
+    @instrumented
     def cleanup_citydb_schema( self ):
         """
         Clean-up the 3DCityDB database, i.e., delete the content of all tables and views related to the 3DCityDB.
@@ -262,99 +910,115 @@ class DBAccess:
         if self.connection_info is None:
             raise RuntimeError( 'not connected to database' )
 
-        # Make low-level connection (via psycopg2).
-        connection = psycopg2.connect(
-            user = self.connection_info.user,
-            password = self.connection_info.pwd,
-            host = self.connection_info.host,
-            port = self.connection_info.port,
-            dbname = self.connection_info.dbname )
+        # Execute 'cleanup_schema' function.
+        self._execute_raw_sql( 'SELECT citydb_pkg.cleanup_schema();' )
 
-        # Get cursor and execute 'cleanup_schema' function.
-        connection.cursor().execute( 'SELECT citydb_pkg.cleanup_schema();' )
 
-        # Commit the changes.
-        connection.commit()
+    def _execute_raw_sql( self, sql ):
+        """
+        Execute an SQL command on a low-level (psycopg2) connection and commit the changes. The connection is borrowed from the engine's connection pool and returned to it afterwards.
 
+        :param sql: SQL command (string)
+        :return: none
+        """
+        if self.engine is None:
+            raise RuntimeError( 'not connected to database' )
 
-    def map_citydb_object_class( self, class_name, table_name = None, schema = None, user_defined = True ):
-        # Check if ORM for 3DCityDB has already been initialized.
-        if DBAccess.citydb_orm_mapping_init is False:
-            self._init_citydb_orm()
+        # Borrow low-level connection from the pool.
+        connection = self.engine.raw_connection()
 
-        if class_name not in DBAccess.citydb_objectclass_list and user_defined is True:
-            if table_name is None:
-                raise RuntimeError( 'a table name must be specified for user-defined mappings' )
-            if schema is None:
-                raise RuntimeError( 'a schema must be specified for user-defined mappings' )
+        try:
+            start = time.perf_counter()
 
-            # Add user-defined mapping to list.
-            DBAccess.citydb_objectclass_list[ class_name ] = \
-                ObjectClassInfo( id = None, schema = schema, table_name = table_name )
+            cursor = connection.cursor()
+            cursor.execute( sql )
 
-        try:
-            # Retrieve class info.
-            objectclass_info = DBAccess.citydb_objectclass_list[ class_name ]
+            # Low-level connections bypass the engine's events --> count statement explicitly.
+            if self.registry.instrumented > 0:
+                self._record_query( sql, max( cursor.rowcount, 0 ), time.perf_counter() - start )
 
-            # Check if class has already been mapped.
-            try:
-                mapped_class_info = DBAccess.citydb_objectclass_map[ class_name ]
-
-                schema_changed = ( schema is not None ) and ( mapped_class_info.schema is not schema )
-                table_name_changed = ( table_name is not None ) and ( mapped_class_info.table_name is not table_name )
-
-                if schema_changed or table_name_changed:
-                    # The class has already been mapped from the specified schema/table.
-                    if schema is None: schema = mapped_class_info.schema
-                    if table_name is None: table_name = mapped_class_info.table_name
-
-                    # Issue a warning, then re-map the class
-                    err = 'Class {} has already been mapped from table: {} (schema: {}). '
-                    err += 'It will be re-mapped from table: {} (schema: {}).'
-                    err = err.format( class_name, mapped_class_info.table_name,
-                        mapped_class_info.schema, table_name, schema )
-                    warnings.warn( err, RuntimeWarning )
-                else:
-                    # The class has already been mapped from the specified schema/table.
-                    return mapped_class_info.impl
-            except KeyError:
-                # The class has not been mapped before --> just continue.
-                # Use default values in case no schema or table has been given explicitly.
-                if schema is None: schema = objectclass_info.schema
-                if table_name is None: table_name = objectclass_info.table_name
+            cursor.close()
 
-            # Define dummy class (but with correct name) for mapping.
-            MappedClass = type( class_name, (), {} )
+            # Commit the changes.
+            connection.commit()
+        finally:
+            # Return connection to the pool.
+            connection.close()
 
-            # Retrieve meta data.
-            metadata = MetaData( self.engine )
 
-            with warnings.catch_warnings():
-                warnings.simplefilter( 'ignore', category = sa_exc.SAWarning )
+    @instrumented
+    def map_citydb_object_class( self, class_name, table_name = None, schema = None, user_defined = True ):
+        if self.registry is None:
+            raise RuntimeError( 'not connected to database' )
 
-                table_mappedclass = None
+        # Mappings are shared with other instances (and threads) using the same registry.
+        with self.registry.lock:
+            # Check if ORM for 3DCityDB has already been initialized.
+            if self.registry.citydb_orm_mapping_init is False:
+                self._init_citydb_orm()
 
-                # Define table to be mapped.
-                if schema is 'citydb_view':
-                    table_mappedclass = Table( table_name, metadata,
-                        Column( 'id', Integer, primary_key = True ),
-                        autoload = True, schema = schema )
-                else:
-                    table_mappedclass = Table( table_name, metadata,
-                        autoload = True, schema = schema )
+            if class_name not in self.registry.citydb_objectclass_list and user_defined is True:
+                if table_name is None:
+                    raise RuntimeError( 'a table name must be specified for user-defined mappings' )
+                if schema is None:
+                    raise RuntimeError( 'a schema must be specified for user-defined mappings' )
+
+                # Add user-defined mapping to list.
+                self.registry.citydb_objectclass_list[ class_name ] = \
+                    ObjectClassInfo( id = None, schema = schema, table_name = table_name )
+
+            try:
+                # Retrieve class info.
+                objectclass_info = self.registry.citydb_objectclass_list[ class_name ]
+
+                # Check if class has already been mapped.
+                try:
+                    mapped_class_info = self.registry.citydb_objectclass_map[ class_name ]
+
+                    schema_changed = ( schema is not None ) and ( mapped_class_info.schema is not schema )
+                    table_name_changed = ( table_name is not None ) and ( mapped_class_info.table_name is not table_name )
+
+                    if schema_changed or table_name_changed:
+                        # The class has already been mapped from the specified schema/table.
+                        if schema is None: schema = mapped_class_info.schema
+                        if table_name is None: table_name = mapped_class_info.table_name
+
+                        # Issue a warning, then re-map the class
+                        err = 'Class {} has already been mapped from table: {} (schema: {}). '
+                        err += 'It will be re-mapped from table: {} (schema: {}).'
+                        err = err.format( class_name, mapped_class_info.table_name,
+                            mapped_class_info.schema, table_name, schema )
+                        warnings.warn( err, RuntimeWarning )
+                    else:
+                        # The class has already been mapped from the specified schema/table.
+                        return mapped_class_info.impl
+                except KeyError:
+                    # The class has not been mapped before --> just continue.
+                    # Use default values in case no schema or table has been given explicitly.
+                    if schema is None: schema = objectclass_info.schema
+                    if table_name is None: table_name = objectclass_info.table_name
+
+                # Define dummy class (but with correct name) for mapping.
+                MappedClass = type( class_name, (), {} )
+
+                # Define table to be mapped (views in schema 'citydb_view' have no primary key).
+                table_mappedclass = self._reflect_table( table_name, schema, view = ( schema == 'citydb_view' ) )
 
                 # Map the class to the table.
                 mapper( MappedClass, table_mappedclass )
 
-            # Store mapped class.
-            DBAccess.citydb_objectclass_map[ class_name ] = \
-                MappedClassInfo( impl = MappedClass, schema = schema, table_name = table_name )
+                # Store reflected tables in cache.
+                self._update_reflection_cache()
 
-            return MappedClass
+                # Store mapped class.
+                self.registry.citydb_objectclass_map[ class_name ] = \
+                    MappedClassInfo( impl = MappedClass, schema = schema, table_name = table_name )
 
-        except KeyError:
-            # The object class name is not known --> raise error.
-            raise RuntimeError( 'unknown object class: {}'.format( class_name ) )
+                return MappedClass
+
+            except KeyError:
+                # The object class name is not known --> raise error.
+                raise RuntimeError( 'unknown object class: {}'.format( class_name ) )
 
 
     def _init_citydb_orm( self ):
@@ -364,48 +1028,48 @@ class DBAccess:
         if self.engine is None or self.session is None:
             raise RuntimeError( 'not connected to database' )
 
-        # Check if mapping has already been initialized.
-        if DBAccess.citydb_orm_mapping_init is True:
-            return
+        # Mappings are shared with other instances (and threads) using the same registry.
+        with self.registry.lock:
+            # Check if mapping has already been initialized.
+            if self.registry.citydb_orm_mapping_init is True:
+                return
 
-        # Retrieve meta data.
-        metadata = MetaData( self.engine )
+            if self.registry.objectclass_data is None:
+                # Define class for holding information about object classes defined in database.
+                ObjectClass = type( 'ObjectClass', (), {} )
 
-        # Define class for holding information about object classes defined in database.
-        ObjectClass = type( 'ObjectClass', (), {} )
+                # Describe table 'citydb.objectclass' and map it to class ObjectClass.
+                mapper( ObjectClass, self._reflect_table( 'objectclass', 'citydb' ) )
 
-        with warnings.catch_warnings():
-            warnings.simplefilter( 'ignore', category = sa_exc.SAWarning )
+                # Retrieve object classes from database.
+                if self.current_session is None: self.start_citydb_session()
+                self.registry.objectclass_data = [
+                    ( oc.id, oc.classname, oc.tablename )
+                    for oc in self.current_session.query( ObjectClass ).all()
+                    ]
 
-            # Describe table 'citydb.objectclass'.
-            table_objectclass = Table( 'objectclass', metadata, autoload = True, schema = 'citydb' )
+                # Store list of object classes in cache.
+                self._update_reflection_cache( force = True )
 
-            # Map table to class ObjectClass.
-            mapper( ObjectClass, table_objectclass )
+            # Store overview of object classes as defined in schema 'citydb' (default representation).
+            for ( oc_id, oc_classname, oc_tablename ) in self.registry.objectclass_data:
+                self.registry.citydb_objectclass_list[ oc_classname ] = \
+                    ObjectClassInfo( id = oc_id, table_name = oc_tablename, schema = 'citydb' )
 
-        # Retrieve object classes from database.
-        if self.current_session is None: self.start_citydb_session()
-        objectclass = self.current_session.query( ObjectClass ).all()
-
-        # Store overview of object classes as defined in schema 'citydb' (default representation).
-        for oc in objectclass:
-            DBAccess.citydb_objectclass_list[ oc.classname ] = \
-                ObjectClassInfo( id = oc.id, table_name = oc.tablename, schema = 'citydb' )
-
-        # Generic attributes are not listed --> add manually.
-        DBAccess.citydb_objectclass_list[ 'GenericAttribute' ] = \
-            ObjectClassInfo( id = None, table_name = 'cityobject_genericattrib', schema = 'citydb' )
+            # Generic attributes are not listed --> add manually.
+            self.registry.citydb_objectclass_list[ 'GenericAttribute' ] = \
+                ObjectClassInfo( id = None, table_name = 'cityobject_genericattrib', schema = 'citydb' )
 
-        # Add also specialized representations of generic attributes (from 'citydb_view').
-        DBAccess.citydb_objectclass_list[ 'GenericAttributeReal' ] = \
-            ObjectClassInfo( id = None, table_name = 'cityobject_genericattrib_real', schema = 'citydb_view' )
-        DBAccess.citydb_objectclass_list[ 'GenericAttributeInteger' ] = \
-            ObjectClassInfo( id = None, table_name = 'cityobject_genericattrib_int', schema = 'citydb_view' )
-        DBAccess.citydb_objectclass_list[ 'GenericAttributeString' ] = \
-            ObjectClassInfo( id = None, table_name = 'cityobject_genericattrib_string', schema = 'citydb_view' )
+            # Add also specialized representations of generic attributes (from 'citydb_view').
+            self.registry.citydb_objectclass_list[ 'GenericAttributeReal' ] = \
+                ObjectClassInfo( id = None, table_name = 'cityobject_genericattrib_real', schema = 'citydb_view' )
+            self.registry.citydb_objectclass_list[ 'GenericAttributeInteger' ] = \
+                ObjectClassInfo( id = None, table_name = 'cityobject_genericattrib_int', schema = 'citydb_view' )
+            self.registry.citydb_objectclass_list[ 'GenericAttributeString' ] = \
+                ObjectClassInfo( id = None, table_name = 'cityobject_genericattrib_string', schema = 'citydb_view' )
 
-        # Set flag to indicate that mapping has been initialized.
-        DBAccess.citydb_orm_mapping_init = True
+            # Set flag to indicate that mapping has been initialized.
+            self.registry.citydb_orm_mapping_init = True
 
 
     def _init_simpkg_orm( self ):
@@ -415,103 +1079,227 @@ class DBAccess:
         if self.engine is None or self.session is None:
             raise RuntimeError( 'not connected to database' )
 
-        # Check if mapping has already been done.
-        if DBAccess.simpkg_orm_mapping_init is True:
+        # Mappings are shared with other instances (and threads) using the same registry.
+        with self.registry.lock:
+            # Check if mapping has already been done.
+            if self.registry.simpkg_orm_mapping_init is True:
+                return
+
+            # Describe tables 'sim_pkg.simulation', 'sim_pkg.tool', 'sim_pkg.node' and 'sim_pkg.port'.
+            table_simulation = self._reflect_table( 'simulation', 'sim_pkg' )
+            table_simulation_tool = self._reflect_table( 'tool', 'sim_pkg' )
+            table_node = self._reflect_table( 'node', 'sim_pkg' )
+            table_port = self._reflect_table( 'port', 'sim_pkg' )
+
+            # Describe views 'sim_pkg.port_connection_ext', 'sim_pkg.generic_parameter_tool',
+            # 'sim_pkg.generic_parameter_node' and 'sim_pkg.generic_parameter_sim'.
+            view_port_connection_ext = self._reflect_table( 'port_connection_ext', 'sim_pkg', view = True )
+            view_generic_parameter_tool = self._reflect_table( 'generic_parameter_tool', 'sim_pkg', view = True )
+            view_generic_parameter_node = self._reflect_table( 'generic_parameter_node', 'sim_pkg', view = True )
+            view_generic_parameter_sim = self._reflect_table( 'generic_parameter_sim', 'sim_pkg', view = True )
+
+            # Describe table 'citydb.cityobject_genericattrib'.
+            table_generic_attribute = self._reflect_table( 'cityobject_genericattrib', 'citydb' )
+
+            mapped_tables = [
+                ( Simulation, table_simulation ),
+                ( SimulationTool, table_simulation_tool ),
+                ( Node, table_node ),
+                ( Port, table_port ),
+                ( PortConnectionExt, view_port_connection_ext ),
+                ( GenericParameterTool, view_generic_parameter_tool ),
+                ( GenericParameterNode, view_generic_parameter_node ),
+                ( GenericParameterSimulation, view_generic_parameter_sim ),
+                ( GenericAttribute, table_generic_attribute )
+                ]
+
+            # Map tables and views to classes. Each registry maps its own copies of the classes defined in module
+            # 'orm_simpkg' (the module classes themselves are never mapped), which are disposed with the registry.
+            mapped_classes = []
+            for ( template, table ) in mapped_tables:
+                cls = type( template.__name__, ( object, ), { '__doc__': template.__doc__ } )
+
+                mapper( cls, table )
+                mapped_classes.append( cls )
+
+            self.registry.simpkg = SimPkgClasses( *mapped_classes )
+
+            # Store reflected tables in cache.
+            self._update_reflection_cache()
+
+            # Set flag to indicate that mapping has been done.
+            self.registry.simpkg_orm_mapping_init = True
+
+
+    def _reflect_table( self, table_name, schema, view = False ):
+        """
+        Retrieve the description of a table or view. The table or view is reflected from the database only if it is not already part of the meta data (e.g., from the reflection cache).
+
+        :param table_name: name of table or view (string)
+        :param schema: name of schema (string)
+        :param view: if True, column 'id' is used as primary key, because views do not define one (bool, optional, default=False)
+        :return: table description (sqlalchemy.Table)
+        """
+        if self.metadata is None:
+            raise RuntimeError( 'not connected to database' )
+
+        # The meta data is shared with other instances (and threads) using the same registry.
+        with self.registry.lock:
+            table_key = '{}.{}'.format( schema, table_name )
+
+            if table_key in self.metadata.tables:
+                return self.metadata.tables[ table_key ]
+
+            with warnings.catch_warnings():
+                warnings.simplefilter( 'ignore', category = sa_exc.SAWarning )
+
+                if view is True:
+                    return Table( table_name, self.metadata,
+                        Column( 'id', Integer, primary_key = True ),
+                        autoload = True, schema = schema )
+                else:
+                    return Table( table_name, self.metadata,
+                        autoload = True, schema = schema )
+
+
+    @instrumented
+    def reflect_tables( self, tables ):
+        """
+        Reflect several tables and views from the database in one go. Tables and views that are already part of the meta data are skipped.
+
+        The kinds and columns of all requested relations are retrieved with a single catalog query, which suffices to describe views (with column 'id' used as primary key). Tables are reflected with one batch per schema.
+
+        :param tables: tables and views to be reflected (list of tuples (table_name, schema))
+        :return: none
+        """
+        if self.metadata is None:
+            raise RuntimeError( 'not connected to database' )
+
+        # The meta data is shared with other instances (and threads) using the same registry.
+        with self.registry.lock:
+            relations = [
+                '{}.{}'.format( schema, table_name ) for ( table_name, schema ) in tables
+                if '{}.{}'.format( schema, table_name ) not in self.metadata.tables
+                ]
+
+            if not relations:
+                return
+
+            # Retrieve kind and columns of all relations (single round trip).
+            with self._instance_engine.connect() as connection:
+                rows = connection.execute( RELATION_COLUMNS_QUERY, relations = relations ).fetchall()
+
+            views = OrderedDict()
+            base_tables = OrderedDict()
+
+            for ( schema, table_name, relkind, column_name, format_type ) in rows:
+                if relkind in ( 'v', 'm' ):
+                    views.setdefault( ( schema, table_name ), [] ).append( ( column_name, format_type ) )
+                else:
+                    base_tables.setdefault( schema, OrderedDict() )[ table_name ] = None
+
+            # Describe views from the retrieved column information.
+            for ( ( schema, table_name ), columns ) in views.items():
+                Table( table_name, self.metadata,
+                    *[ Column( column_name, self._column_type( format_type ), primary_key = ( column_name == 'id' ) )
+                       for ( column_name, format_type ) in columns ],
+                    schema = schema )
+
+            # Reflect tables (including all tables they refer to).
+            with warnings.catch_warnings():
+                warnings.simplefilter( 'ignore', category = sa_exc.SAWarning )
+
+                for ( schema, table_names ) in base_tables.items():
+                    self.metadata.reflect( schema = schema, only = list( table_names ) )
+
+            # Store reflected tables in cache.
+            self._update_reflection_cache()
+
+
+    def _column_type( self, format_type ):
+        """
+        Retrieve the column type corresponding to a PostgreSQL type name.
+
+        :param format_type: type name as returned by PostgreSQL function 'format_type' (string)
+        :return: column type (sqlalchemy.types.TypeEngine), NullType for unknown types (e.g., PostGIS geometries)
+        """
+        format_type = format_type.strip()
+
+        if format_type.endswith( '[]' ):
+            return ARRAY( self._column_type( format_type[:-2] ) )
+
+        # Strip type modifiers, e.g., 'character varying(256)', 'timestamp(3) with time zone' or 'geometry(PointZ,4326)'.
+        type_name = re.sub( r'\(.*?\)', '', format_type ).strip()
+
+        # Numerical type modifiers (length, precision and scale).
+        modifiers = re.search( r'\(([\d,]+)\)', format_type )
+        modifiers = tuple( int( m ) for m in modifiers.group( 1 ).split( ',' ) ) if modifiers else ()
+
+        # Apply the type modifiers in the same way as the PostgreSQL dialect of SQLAlchemy does when reflecting tables.
+        args = ()
+        kwargs = {}
+
+        if type_name in ( 'timestamp with time zone', 'time with time zone' ):
+            kwargs[ 'timezone' ] = True
+            if modifiers: kwargs[ 'precision' ] = modifiers[0]
+        elif type_name in ( 'timestamp without time zone', 'time without time zone', 'time' ):
+            kwargs[ 'timezone' ] = False
+            if modifiers: kwargs[ 'precision' ] = modifiers[0]
+        elif type_name == 'double precision':
+            args = ( 53, )
+        elif type_name == 'bit varying':
+            kwargs[ 'varying' ] = True
+            args = modifiers
+        elif type_name != 'integer':
+            args = modifiers
+
+        try:
+            column_type = self.engine.dialect.ischema_names[ type_name ]
+        except KeyError:
+            return NullType()
+
+        return column_type( *args, **kwargs )
+
+
+    def _update_reflection_cache( self, force = False ):
+        """
+        Store the reflected tables and views (and the list of object classes) in the reflection cache, in case new tables or views have been reflected since the last update.
+
+        :param force: store data even if no new tables or views have been reflected (bool, optional, default=False)
+        :return: none
+        """
+        registry = self.registry
+
+        if registry.reflection_cache is None:
             return
 
-        # Retrieve meta data.
-        metadata = MetaData( self.engine )
-        #metadata.reflect()
-
-        with warnings.catch_warnings():
-            warnings.simplefilter( 'ignore', category = sa_exc.SAWarning )
-
-            # Describe table 'sim_pkg.simulation'.
-            table_simulation = Table(
-                'simulation',
-                metadata,
-                autoload = True,
-                schema = 'sim_pkg'
-                )
-
-            # Describe table 'sim_pkg.tool'.
-            table_simulation_tool = Table(
-                'tool',
-                metadata,
-                autoload = True,
-                schema = 'sim_pkg'
-                )
-
-            # Describe table 'sim_pkg.node'.
-            table_node = Table(
-                'node',
-                metadata,
-                autoload = True,
-                schema = 'sim_pkg'
-                )
-
-            # Describe table 'sim_pkg.port'.
-            table_port = Table(
-                'port',
-                metadata,
-                autoload = True,
-                schema = 'sim_pkg'
-                )
-
-            # Describe view 'sim_pkg.port_connection_ext'.
-            view_port_connection_ext = Table(
-                'port_connection_ext',
-                metadata,
-                Column( 'id', Integer, primary_key = True ),
-                autoload = True,
-                schema = 'sim_pkg'
-                )
-
-            # Describe view 'sim_pkg.generic_parameter_tool'.
-            view_generic_parameter_tool = Table(
-                'generic_parameter_tool',
-                metadata,
-                Column( 'id', Integer, primary_key = True ),
-                autoload = True,
-                schema = 'sim_pkg'
-                )
-
-            # Describe view 'sim_pkg.generic_parameter_node'.
-            view_generic_parameter_node = Table(
-                'generic_parameter_node',
-                metadata,
-                Column( 'id', Integer, primary_key = True ),
-                autoload = True,
-                schema = 'sim_pkg'
-                )
-
-            # Describe view 'sim_pkg.generic_parameter_sim'.
-            view_generic_parameter_sim = Table(
-                'generic_parameter_sim',
-                metadata,
-                Column( 'id', Integer, primary_key = True ),
-                autoload = True,
-                schema = 'sim_pkg'
-                )
-
-            # Describe table 'sim_pkg.port'.
-            table_generic_attribute = Table(
-                'cityobject_genericattrib',
-                metadata,
-                autoload = True,
-                schema = 'citydb'
-                )
-
-        # Map tables and views to classes.
-        mapper( Simulation, table_simulation )
-        mapper( SimulationTool, table_simulation_tool )
-        mapper( Node, table_node )
-        mapper( Port, table_port )
-        mapper( PortConnectionExt, view_port_connection_ext )
-        mapper( GenericParameterTool, view_generic_parameter_tool )
-        mapper( GenericParameterNode, view_generic_parameter_node )
-        mapper( GenericParameterSimulation, view_generic_parameter_sim )
-        mapper( GenericAttribute, table_generic_attribute )
-
-        # Set flag to indicate that mapping has been done.
-        DBAccess.simpkg_orm_mapping_init = True
+        if force is False and len( registry.metadata.tables ) == registry.cached_table_count:
+            return
+
+        registry.reflection_cache.save( registry.metadata, registry.objectclass_data )
+        registry.cached_table_count = len( registry.metadata.tables )
+
+
+def _before_cursor_execute( conn, cursor, statement, parameters, context, executemany ):
+    """
+    Event handler called before a statement is sent to the database (only registered while statements are counted).
+    """
+    conn.info.setdefault( 'dblayer_query_start', [] ).append( time.perf_counter() )
+
+
+def _after_cursor_execute( conn, cursor, statement, parameters, context, executemany ):
+    """
+    Event handler called after a statement has been sent to the database (only registered while statements are counted). The statement is counted for the instance of class DBAccess whose session issued it, which is passed via the execution options.
+    """
+    starts = conn.info.get( 'dblayer_query_start' )
+
+    # The handlers may have been registered while the statement was executed.
+    if not starts:
+        return
+
+    elapsed = time.perf_counter() - starts.pop()
+
+    access = None if context is None else context.execution_options.get( 'dblayer_access' )
+
+    if access is not None:
+        access._record_query( statement, max( cursor.rowcount, 0 ), elapsed )
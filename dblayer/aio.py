@@ -0,0 +1,330 @@
+from .access import *
+from .sim.network_snapshot import NetworkSnapshot
+
+import asyncio
+
+import aiopg.sa
+
+from sqlalchemy.util import lightweight_named_tuple
+
+
+class AsyncDBAccess:
+    """
+    Asynchronous counterpart of class DBAccess, based on the asyncio PostgreSQL driver aiopg (requires the optional dependencies 'dblayer[async]').
+
+    Queries are defined in exactly the same way as with class DBAccess and are sent to the database via a pool of asynchronous connections, i.e., independent queries can be issued concurrently (e.g., with asyncio.gather). In contrast to class DBAccess:
+     - results are returned as named tuples (containing all columns of the mapped object class if parameter columns is not specified) instead of mapped objects,
+     - changes are committed immediately (function 'add_citydb_objects' adds all objects within one transaction).
+
+    Classes are mapped (and tables reflected) with a synchronous instance of class DBAccess, which shares its engine and mappings with all other instances connected to the same database. Use function 'map_citydb_object_class' to map classes upfront without blocking the event loop.
+    """
+
+    # Default size of the connection pool (same as for the engine of class DBAccess).
+    default_pool_size = 5
+
+    # Default number of connections allowed in addition to the pool size (same as for the engine of class DBAccess).
+    default_max_overflow = 10
+
+
+    def __init__( self ):
+        self.engine = None
+        self.connection_info = None
+
+        # Synchronous access for mapping classes and defining queries (used from several threads).
+        self.access = DBAccess( thread_safe = True )
+
+
+    async def connect_to_citydb( self, connection_info ):
+        """
+        Connect to the database by initializing a pool of asynchronous connections.
+
+        :param connection_info: tuple containing connection parameters for database (PostgreSQLConnectionInfo)
+        :return: none
+        """
+        if not isinstance( connection_info, PostgreSQLConnectionInfo ):
+            raise TypeError( 'parameter \'connection_info\' must be of type \'PostgreSQLConnectionInfo\'' )
+
+        await self._run_sync( self.access.connect_to_citydb, connection_info )
+
+        self.engine = await aiopg.sa.create_engine( **self._engine_options( connection_info ) )
+
+        # Save database connection information.
+        self.connection_info = connection_info
+
+
+    async def disconnect_from_citydb( self ):
+        """
+        Close all connections of the pool. Engine and mappings of the synchronous access are kept for other instances connected to the same database.
+
+        :return: none
+        """
+        if self.engine is not None:
+            self.engine.close()
+            await self.engine.wait_closed()
+
+        self.access.disconnect_from_citydb( dispose = False )
+
+        self.engine = None
+        self.connection_info = None
+
+
+    def _engine_options( self, connection_info ):
+        """
+        Retrieve the options for creating an engine from the connection information.
+
+        :param connection_info: tuple containing connection parameters for database (PostgreSQLConnectionInfo)
+        :return: keyword arguments for function 'aiopg.sa.create_engine' (dict)
+        """
+        pool_size = AsyncDBAccess.default_pool_size \
+            if connection_info.pool_size is None else connection_info.pool_size
+        max_overflow = AsyncDBAccess.default_max_overflow \
+            if connection_info.max_overflow is None else connection_info.max_overflow
+
+        # A negative overflow means that the number of connections is not limited (as for the engine of class DBAccess).
+        maxsize = 0 if max_overflow < 0 else pool_size + max_overflow
+
+        engine_options = dict(
+            user = connection_info.user,
+            password = connection_info.pwd,
+            host = connection_info.host,
+            port = connection_info.port,
+            database = connection_info.dbname,
+            minsize = pool_size,
+            maxsize = maxsize
+            )
+
+        if connection_info.pool_recycle is not None:
+            engine_options[ 'pool_recycle' ] = connection_info.pool_recycle
+
+        # Settings applied to each new connection (via psycopg2).
+        if connection_info.application_name is not None:
+            engine_options[ 'application_name' ] = connection_info.application_name
+
+        if connection_info.statement_timeout is not None:
+            engine_options[ 'options' ] = '-c statement_timeout={:d}'.format( connection_info.statement_timeout )
+
+        return engine_options
+
+
+    async def map_citydb_object_class( self, class_name, table_name = None, schema = None, user_defined = True ):
+        """
+        Map a table or view to a class (see function 'DBAccess.map_citydb_object_class'), without blocking the event loop.
+
+        :return: mapped class
+        """
+        return await self._run_sync(
+            self.access.map_citydb_object_class, class_name, table_name, schema, user_defined )
+
+
+    async def add_citydb_object( self, func, **args ):
+        """
+        Add a new object to the database.
+
+        :param func: inserter function (sqlalchemy.sql.functions.Function)
+        :return: returns the scalar return value of the inserter function (typically an object-specific ID)
+        """
+        # Retrieve inserter function.
+        inserter_func = self.access._get_inserter_function( func, args )
+
+        async with self._acquire() as connection:
+            return await connection.scalar( select( [ inserter_func ] ) )
+
+
+    async def add_citydb_objects( self, objects, args = None, chunk_size = 1000 ):
+        """
+        Add several new objects to the database within one transaction (see function 'DBAccess.add_citydb_objects').
+
+        :param objects: list of tuples (inserter function, dict of arguments) or a single inserter function (sqlalchemy.sql.functions.Function)
+        :param args: list of arguments used with a single inserter function (list of dict, optional)
+        :param chunk_size: maximum number of inserter function calls per SQL statement (int, optional, default=1000)
+        :return: returns the scalar return values of the inserter functions in input order (list)
+        """
+        if args is None:
+            items = list( objects )
+        else:
+            items = [ ( objects, a ) for a in args ]
+
+        # PostgreSQL restricts the number of entries in the target list of a statement.
+        if not 0 < chunk_size <= DBAccess.max_target_list_length:
+            raise ValueError( 'parameter \'chunk_size\' must be between 1 and {}'.format( DBAccess.max_target_list_length ) )
+
+        # Retrieve all inserter functions before sending anything to the database.
+        inserter_funcs = [ self.access._get_inserter_function( func, a ) for ( func, a ) in items ]
+
+        results = []
+
+        async with self._acquire() as connection:
+            async with connection.begin():
+                for start in range( 0, len( inserter_funcs ), chunk_size ):
+                    chunk = inserter_funcs[ start : start + chunk_size ]
+
+                    # Evaluate all inserter functions of the chunk as (uniquely labeled) columns of one single-row query.
+                    columns = [ f.label( 'obj_{}'.format( i ) ) for ( i, f ) in enumerate( chunk ) ]
+                    result = await connection.execute( select( columns ) )
+                    results.extend( await result.first() )
+
+        return results
+
+
+    async def get_citydb_objects( self, class_name, table_name = None, schema = None, conditions = None, columns = None ):
+        """
+        Retrieve all objects of one type from the database (see function 'DBAccess.get_citydb_objects').
+
+        :return: list of results (named tuples)
+        """
+        # Map the class first, since reflecting the table would block the event loop.
+        ObjectClass = await self.map_citydb_object_class( class_name, table_name, schema )
+
+        if columns is None:
+            columns = self._entity_columns( ObjectClass )
+
+        query = self.access._get_citydb_objects_query( class_name, table_name, schema, conditions, columns )
+
+        return await self._fetch( query )
+
+
+    async def join_citydb_objects( self, class_names, conditions, result_index = None, columns = None, group_by = None ):
+        """
+        Retrieve selected objects from the database by 'joining' more than one table or view (see function 'DBAccess.join_citydb_objects').
+
+        :return: list of results (named tuples), with each entry a named tuple of the results for each object class unless parameter result_index or parameter columns is specified
+        """
+        return await self._join_citydb_objects( self.access, class_names, conditions, result_index, columns, group_by )
+
+
+    async def execute_function( self, func ):
+        """
+        Execute SQL function.
+
+        :param func: SQL function (sqlalchemy.sql.functions.Function)
+        :return: returns the scalar return value of the SQL function (typically an object-specific ID)
+        """
+        # Check if 'inserter_func' is a function of type 'sqlalchemy.sql.functions.Function'
+        if not isinstance( func, SQLFunction ):
+            raise TypeError( 'parameter \'func\' must be a function returning type \'sqlalchemy.sql.functions.Function\'' )
+
+        async with self._acquire() as connection:
+            return await connection.scalar( select( [ func ] ) )
+
+
+    async def get_net( self, reader, network_id ):
+        """
+        Retrieve the simulation model for a network with the help of a simulation model reader (e.g., class ElectricalSimModelDBReader). In contrast to function 'get_net' of the reader, all queries of the reader are issued concurrently.
+
+        The reader must be connected to the same database. It must not be used by other tasks or threads at the same time.
+
+        :param reader: simulation model reader (dblayer.sim.sim_model_db_reader_base.SimModelDBReaderBase)
+        :param network_id: ID of the network (int)
+        :return: simulation model
+        """
+        # Map structure from database to classes.
+        await self._run_sync( reader._map_classes )
+
+        # Retrieve relevant data.
+        feature_ids = [
+            f.network_feature_id for f in await self._join_citydb_objects( reader, *reader._feature_ids_query( network_id ) )
+            ]
+
+        queries = reader._data_queries( network_id, feature_ids )
+
+        results = await asyncio.gather( *[
+            self._join_citydb_objects( reader, *query ) for query in queries.values()
+            ] )
+
+        snapshot = NetworkSnapshot.from_rows( network_id, OrderedDict(
+            ( name, ( reader._query_column_names( query ), rows ) )
+            for ( ( name, query ), rows ) in zip( queries.items(), results )
+            ) )
+
+        # Create the simulation model.
+        return await self._run_sync( reader.get_net_from_snapshot, snapshot )
+
+
+    async def _join_citydb_objects( self, access, class_names, conditions, result_index, columns, group_by = None ):
+        """
+        Retrieve selected objects from the database by 'joining' more than one table or view, using the mapped classes of another instance.
+
+        :param access: instance for mapping classes and defining the query (DBAccess)
+        :return: list of results (named tuples)
+        """
+        # Map the classes first, since reflecting the tables would block the event loop.
+        object_classes = [
+            await self._run_sync( access.map_citydb_object_class, class_name ) for class_name in class_names
+            ]
+
+        if columns is not None:
+            return await self._fetch( access._join_citydb_objects_query( class_names, conditions, result_index, columns, group_by ) )
+
+        if result_index is not None:
+            columns = self._entity_columns( object_classes[ result_index ] )
+            return await self._fetch( access._join_citydb_objects_query( class_names, conditions, result_index, columns, group_by ) )
+
+        # Retrieve the columns of all object classes, then split the results by object class.
+        entity_columns = [ self._entity_columns( ObjectClass ) for ObjectClass in object_classes ]
+        columns = [
+            getattr( ObjectClass, column )
+            for ( ObjectClass, class_columns ) in zip( object_classes, entity_columns ) for column in class_columns
+            ]
+
+        rows = await self._fetch( access._join_citydb_objects_query( class_names, conditions, None, columns, group_by ) )
+
+        ResultTuple = lightweight_named_tuple( 'result', class_names )
+        ClassTuples = [ lightweight_named_tuple( 'result', class_columns ) for class_columns in entity_columns ]
+
+        results = []
+        for row in rows:
+            ( start, class_results ) = ( 0, [] )
+            for ( ClassTuple, class_columns ) in zip( ClassTuples, entity_columns ):
+                class_results.append( ClassTuple( row[ start : start + len( class_columns ) ] ) )
+                start += len( class_columns )
+            results.append( ResultTuple( class_results ) )
+
+        return results
+
+
+    def _entity_columns( self, ObjectClass ):
+        """
+        Retrieve the names of all columns of a mapped object class.
+
+        :param ObjectClass: mapped object class
+        :return: list of column names (list of string)
+        """
+        return [ attr.key for attr in sa_inspect( ObjectClass ).column_attrs ]
+
+
+    async def _fetch( self, query ):
+        """
+        Execute a query on an asynchronous connection and retrieve all results.
+
+        :param query: query (sqlalchemy.orm.query.Query)
+        :return: list of results (named tuples)
+        """
+        ResultTuple = lightweight_named_tuple( 'result', [ c[ 'name' ] for c in query.column_descriptions ] )
+
+        async with self._acquire() as connection:
+            result = await connection.execute( query.statement )
+            rows = await result.fetchall()
+
+        return [ ResultTuple( tuple( row ) ) for row in rows ]
+
+
+    def _acquire( self ):
+        """
+        Borrow a connection from the pool.
+
+        :return: asynchronous context manager returning the connection (aiopg.sa.SAConnection)
+        """
+        if self.engine is None:
+            raise RuntimeError( 'not connected to database' )
+
+        return self.engine.acquire()
+
+
+    async def _run_sync( self, func, *args ):
+        """
+        Run a blocking function in the default executor of the event loop.
+
+        :return: return value of the function
+        """
+        # Within a coroutine, this is the running event loop (function 'asyncio.get_running_loop' requires Python 3.7).
+        return await asyncio.get_event_loop().run_in_executor( None, func, *args )
@@ -1,6 +1,16 @@
 from sqlalchemy.sql import func
 from collections import namedtuple
 
+import collections.abc
+import numpy
+import struct
+
+
+# Geometry types of the well-known binary representation (WKB) of geometries with Z coordinates (ISO variant).
+WKB_POINT_Z = 1001
+WKB_LINESTRING_Z = 1002
+WKB_POLYGON_Z = 1003
+
 
 class Point2D( namedtuple( 'Point2D_Tuple', [ 'x', 'y' ] ) ):
     """
@@ -16,6 +26,169 @@ class Point2D( namedtuple( 'Point2D_Tuple', [ 'x', 'y' ] ) ):
     def list( self ): return [ self.x, self.y ]
 
 
+class Point2DArray( collections.abc.Sequence ):
+    """
+    Sequence of 2D points, stored as array of coordinates with shape (n, 2). Slices are views on the same array, i.e., the points of several geometries can share one buffer (see function 'from_wkb_list').
+
+    Points are accessed as Point2D (e.g., points[0].x), all coordinates at once via attributes 'coords', 'x' and 'y'.
+    """
+
+    __slots__ = ( 'coords', )
+
+    def __init__( self, coords ):
+        """
+        Constructor.
+
+        :param coords: coordinates of the points, e.g., a list of Point2D (array-like of shape (n, 2))
+        """
+        coords = numpy.asarray( coords, dtype = numpy.float64 )
+
+        if coords.size == 0:
+            coords = coords.reshape( 0, 2 )
+
+        if coords.ndim != 2 or coords.shape[1] != 2:
+            raise TypeError( 'parameter \'coords\' must be of shape (n, 2)' )
+
+        self.coords = coords
+
+
+    @property
+    def x( self ): return self.coords[ :, 0 ]
+
+
+    @property
+    def y( self ): return self.coords[ :, 1 ]
+
+
+    def list( self ): return self.coords.tolist()
+
+
+    def __len__( self ):
+        return len( self.coords )
+
+
+    def __getitem__( self, index ):
+        if isinstance( index, slice ):
+            return Point2DArray( self.coords[ index ] )
+
+        ( x, y ) = self.coords[ index ]
+        return Point2D( float( x ), float( y ) )
+
+
+    def __array__( self, dtype = None, copy = None ):
+        return self.coords if dtype is None else self.coords.astype( dtype )
+
+
+    def __eq__( self, other ):
+        try:
+            other = numpy.asarray( other, dtype = numpy.float64 )
+        except ( TypeError, ValueError ):
+            return False
+
+        return self.coords.shape == other.shape and bool( numpy.array_equal( self.coords, other ) )
+
+
+    __hash__ = None
+
+
+    def __repr__( self ):
+        return 'Point2DArray( {} )'.format( self.list() )
+
+
+    def to_wkb( self, geometry_type = WKB_LINESTRING_Z ):
+        """
+        Convert the points to the well-known binary representation of a geometry with Z coordinates (set to 0), in little endian byte order.
+
+        :param geometry_type: type of the geometry, i.e., WKB_POINT_Z, WKB_LINESTRING_Z or WKB_POLYGON_Z (int, optional, default=WKB_LINESTRING_Z)
+        :return: well-known binary representation (bytes)
+        """
+        if geometry_type == WKB_POINT_Z:
+            if len( self ) != 1:
+                raise ValueError( 'a point geometry must consist of exactly one point' )
+            header = struct.pack( '<BI', 1, geometry_type )
+        elif geometry_type == WKB_LINESTRING_Z:
+            header = struct.pack( '<BII', 1, geometry_type, len( self ) )
+        elif geometry_type == WKB_POLYGON_Z:
+            header = struct.pack( '<BIII', 1, geometry_type, 1, len( self ) )
+        else:
+            raise ValueError( 'unsupported geometry type: {}'.format( geometry_type ) )
+
+        xyz = numpy.zeros( ( len( self ), 3 ), dtype = '<f8' )
+        xyz[ :, :2 ] = self.coords
+
+        return header + xyz.tobytes()
+
+
+    @classmethod
+    def from_wkb( cls, wkb ):
+        """
+        Retrieve the points of a geometry from its well-known binary representation (see function 'from_wkb_list').
+
+        :param wkb: well-known binary representation (bytes or hexadecimal string)
+        :return: points (Point2DArray)
+        """
+        return cls( _wkb_coords( wkb ) )
+
+
+    @classmethod
+    def from_wkb_list( cls, wkbs ):
+        """
+        Retrieve the points of several geometries from their well-known binary representations, supporting points, line strings and polygons (only their exterior rings) in the ISO and the extended (PostGIS) variant. The coordinates of all geometries are stored in a single array, the points of each geometry are a view on this array.
+
+        :param wkbs: well-known binary representations (list of bytes or hexadecimal strings)
+        :return: points of each geometry (list of Point2DArray)
+        """
+        parts = [ _wkb_coords( wkb ) for wkb in wkbs ]
+
+        if len( parts ) == 0:
+            return []
+
+        coords = numpy.concatenate( parts )
+        offsets = numpy.cumsum( [ 0 ] + [ len( part ) for part in parts ] ).tolist()
+
+        return [ cls( coords[ start:end ] ) for ( start, end ) in zip( offsets[ :-1 ], offsets[ 1: ] ) ]
+
+
+def _wkb_coords( wkb ):
+    """
+    Retrieve the 2D coordinates of a geometry from its well-known binary representation (or its hexadecimal encoding, as returned by PostGIS for geometry columns), as view on the binary data.
+    """
+    if isinstance( wkb, str ):
+        wkb = bytes.fromhex( wkb )
+
+    ( byte_order, ) = struct.unpack_from( '<B', wkb, 0 )
+    endian = '<' if byte_order == 1 else '>'
+
+    ( geometry_type, ) = struct.unpack_from( endian + 'I', wkb, 1 )
+    offset = 5
+
+    # Extended variant: flags for Z and M coordinates and SRID.
+    dims = 2 + bool( geometry_type & 0x80000000 ) + bool( geometry_type & 0x40000000 )
+    if geometry_type & 0x20000000:
+        offset += 4
+    geometry_type &= 0x0FFFFFFF
+
+    # ISO variant: Z and M coordinates are encoded in the thousands.
+    dims += { 0: 0, 1: 1, 2: 1, 3: 2 }[ geometry_type // 1000 ]
+    geometry_type %= 1000
+
+    if geometry_type == 1:
+        count = 1
+    elif geometry_type == 2:
+        ( count, ) = struct.unpack_from( endian + 'I', wkb, offset )
+        offset += 4
+    elif geometry_type == 3:
+        ( rings, count ) = struct.unpack_from( endian + 'II', wkb, offset )
+        offset += 8
+        if rings == 0: count = 0
+    else:
+        raise ValueError( 'unsupported geometry type: {}'.format( geometry_type ) )
+
+    values = numpy.frombuffer( wkb, dtype = endian + 'f8', count = count * dims, offset = offset )
+
+    return values.reshape( count, dims )[ :, :2 ]
+
+
 def geom_from_text(
     well_known_text,
     srid = None
@@ -45,10 +218,8 @@ def geom_from_2dpoint(
     if not isinstance( point, Point2D ):
         raise TypeError( 'parameter \'point\' must be of type \'Point2D\'' )
 
-    # Construct well-known text representation of 2D point.
-    well_known_text = 'POINT({x} {y} 0)'.format( x = point.x, y = point.y )
-
-    return geom_from_text( well_known_text, srid )
+    # Construct well-known binary representation of 2D point.
+    return geom_from_wkb( Point2DArray( [ point ] ).to_wkb( WKB_POINT_Z ), srid )
 
 
 def geom_from_2dlinestring(
@@ -58,20 +229,13 @@ def geom_from_2dlinestring(
     """
     Define function call for converting a 2D line to PostGIS geometry object.
 
-    :param points: 2D points to be joined in a connected series of line segments (list of Point2D)
+    :param points: 2D points to be joined in a connected series of line segments (list of Point2D or Point2DArray)
     :return: SQL function (sqlalchemy.sql.functions.Function)
     """
-    if not all( isinstance( p, Point2D ) for p in points ):
-        raise TypeError( 'parameter \'points\' must be of type \'list of Point2D\'' )
-
-    # Construct well-known text representation of 2D linestring.
-    coordinates = []
-    for p in points:
-        coordinates.append( '{x} {y} 0'.format( x = p.x, y = p.y ) )
-    separator = ','
-    well_known_text = 'LINESTRING({})'.format( separator.join( coordinates ) )
+    points = _point2d_array( points )
 
-    return geom_from_text( well_known_text, srid )
+    # Construct well-known binary representation of 2D linestring.
+    return geom_from_wkb( points.to_wkb( WKB_LINESTRING_Z ), srid )
 
 
 def geom_from_2dpolygon(
@@ -81,25 +245,45 @@ def geom_from_2dpolygon(
     """
     Define function call for converting a 2D polygon to PostGIS geometry object.
 
-    :param points: 2D points to be joined in a closed loop of line segments (list of Point2D)
+    :param points: 2D points to be joined in a closed loop of line segments (list of Point2D or Point2DArray)
     :return: SQL function (sqlalchemy.sql.functions.Function)
     """
+    points = _point2d_array( points )
+
+    if len( points ) == 0 or not numpy.array_equal( points.coords[0], points.coords[-1] ):
+        raise ValueError( 'first and last point do not coincide' )
+
+    # Construct well-known binary representation of 2D polygon.
+    return geom_from_wkb( points.to_wkb( WKB_POLYGON_Z ), srid )
+
+
+def _point2d_array( points ):
+    """
+    Check a list of 2D points and convert it to an array of points.
+    """
+    if isinstance( points, Point2DArray ):
+        return points
+
     if not all( isinstance( p, Point2D ) for p in points ):
         raise TypeError( 'parameter \'points\' must be of type \'list of Point2D\'' )
 
-    first_point = points[0]
-    last_point = points[-1]
-    if ( first_point.x != last_point.x ) or ( first_point.y != last_point.y ):
-        raise ValueError( 'first and last point do not coincide' )
+    return Point2DArray( points )
+
 
-    # Construct well-known text representation of 2D polygon.
-    coordinates = []
-    for p in points:
-        coordinates.append( '{x} {y} 0'.format( x = p.x, y = p.y ) )
-    separator = ','
-    well_known_text = 'POLYGON(({}))'.format( separator.join( coordinates ) )
+def geom_from_wkb(
+    well_known_binary,
+    srid = None
+    ):
+    """
+    Define function call for converting well-known binary representation to PostGIS geometry object.
 
-    return geom_from_text( well_known_text, srid )
+    :param well_known_binary: well-known binary representation of geometry (bytes)
+    :return: SQL function (sqlalchemy.sql.functions.Function)
+    """
+    if ( srid is None ):
+        return func.ST_GeomFromWKB( well_known_binary )
+    else:
+        return func.ST_GeomFromWKB( well_known_binary, srid )
 
 
 def geom_as_text(
@@ -114,6 +298,70 @@ def geom_as_text(
     return func.ST_AsText( geometry )
 
 
+def geom_as_binary(
+    geometry
+    ):
+    """
+    Define function call for converting PostGIS geometry object to well-known binary representation.
+
+    :param geometry: PostGIS geometry object (string or sqlalchemy.sql.elements.ColumnElement)
+    :return: SQL function (sqlalchemy.sql.functions.Function)
+    """
+    return func.ST_AsBinary( geometry )
+
+
+def geom_x(
+    geometry
+    ):
+    """
+    Define function call for retrieving the X coordinate of a PostGIS point geometry object.
+
+    :param geometry: PostGIS geometry object (string or sqlalchemy.sql.elements.ColumnElement)
+    :return: SQL function (sqlalchemy.sql.functions.Function)
+    """
+    return func.ST_X( geometry )
+
+
+def geom_y(
+    geometry
+    ):
+    """
+    Define function call for retrieving the Y coordinate of a PostGIS point geometry object.
+
+    :param geometry: PostGIS geometry object (string or sqlalchemy.sql.elements.ColumnElement)
+    :return: SQL function (sqlalchemy.sql.functions.Function)
+    """
+    return func.ST_Y( geometry )
+
+
+def transform_geom(
+    geometry,
+    srid
+    ):
+    """
+    Define function call for transforming a PostGIS geometry object to another spatial reference system.
+
+    :param geometry: PostGIS geometry object (string or sqlalchemy.sql.elements.ColumnElement)
+    :param srid: ID of the target spatial reference system (int)
+    :return: SQL function (sqlalchemy.sql.functions.Function)
+    """
+    return func.ST_Transform( geometry, srid )
+
+
+def geom_intersects(
+    geometry_a,
+    geometry_b
+    ):
+    """
+    Define function call for checking whether two PostGIS geometry objects intersect.
+
+    :param geometry_a: PostGIS geometry object (string or sqlalchemy.sql.elements.ColumnElement)
+    :param geometry_b: PostGIS geometry object (string or sqlalchemy.sql.elements.ColumnElement)
+    :return: SQL function (sqlalchemy.sql.functions.Function)
+    """
+    return func.ST_Intersects( geometry_a, geometry_b )
+
+
 def length_from_geom(
     geometry
     ):
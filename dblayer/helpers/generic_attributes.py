@@ -13,27 +13,21 @@ def add_generic_attributes( access, cityobject_id, attr ):
     if not isinstance( access, DBAccess ):
         raise TypeError( 'parameter \'access\' must be of type \'DBAccess\'' )
 
+    inserters = []
+
     for name, value in attr.items():
         if isinstance( value, int ):
-            access.add_citydb_object(
-                insert_genericattrib_integer,
-                attrname = name,
-                attrvalue = value,
-                cityobject_id = cityobject_id
-            )
+            inserter = insert_genericattrib_integer
         elif isinstance( value, float ):
-            access.add_citydb_object(
-                insert_genericattrib_real,
-                attrname = name,
-                attrvalue = value,
-                cityobject_id = cityobject_id
-            )
+            inserter = insert_genericattrib_real
         elif isinstance( value, str ):
-            access.add_citydb_object(
-                insert_genericattrib_string,
-                attrname = name,
-                attrvalue = value,
-                cityobject_id = cityobject_id
-            )
+            inserter = insert_genericattrib_string
         else:
             raise TypeError( 'type not supported: {}'.format( value.__class__.__name__) )
+
+        inserters.append(
+            ( inserter, dict( attrname = name, attrvalue = value, cityobject_id = cityobject_id ) )
+            )
+
+    # Add all generic attributes in one go.
+    access.add_citydb_objects( inserters )
@@ -150,7 +150,7 @@ def insert_ntw_feature_2dlinestring(
     :param network_id: ID of network (int)
     :param network_graph_id: ID of network graph (int)
     :param feature_name: name of new feature (str)
-    :param line_segment: list of 2D points defining the 2D line segment (list of Point2D)
+    :param line_segment: list of 2D points defining the 2D line segment (list of Point2D or Point2DArray)
     :param feature_args: additional keyword arguments to be used by function insert_ntw_feature_func (**kwargs)
     :return: tuple containing the new feature ID, feature graph ID, the IDs of the start and end node and the interior feature link ID
     '''
@@ -160,7 +160,7 @@ def insert_ntw_feature_2dlinestring(
     if not callable( insert_ntw_feature_func ):
         raise TypeError( 'parameter \'insert_ntw_feature_func\' must be a callable function' )
 
-    if not all( isinstance( p, Point2D ) for p in line_segment ):
+    if not isinstance( line_segment, Point2DArray ) and not all( isinstance( p, Point2D ) for p in line_segment ):
         raise TypeError( 'parameter \'line_segment\' must be of type \'list of Point2D\'' )
 
     # Insert new network feature (using the specific insert function).
@@ -246,7 +246,7 @@ def insert_and_link_ntw_feature_2dlinestring(
     :param network_id: ID of network (int)
     :param network_graph_id: ID of network graph (int)
     :param feature_name: name of new feature (str)
-    :param line_segment: list of 2D points defining the 2D line segment (list of Point2D)
+    :param line_segment: list of 2D points defining the 2D line segment (list of Point2D or Point2DArray)
     :param start_link_node_id: ID of the node that will be linked to the first point of the line segment (int)
     :param end_link_node_id: ID of the node that will be linked to the last point of the line segment (int)
     :param link_type: type of link (str: contains/connects)
@@ -0,0 +1,99 @@
+import threading
+
+from collections import OrderedDict
+
+
+class QueryCounter:
+    """
+    Counters for the statements sent to the database.
+    """
+
+    __slots__ = ( 'round_trips', 'rows', 'time' )
+
+
+    def __init__( self ):
+        # Number of statements sent to the database.
+        self.round_trips = 0
+
+        # Number of rows fetched (or affected) by the statements.
+        self.rows = 0
+
+        # Time spent executing the statements (in seconds).
+        self.time = 0.
+
+
+    def add( self, rows, time ):
+        """
+        Count a statement.
+
+        :param rows: number of rows fetched or affected by the statement (int)
+        :param time: time spent executing the statement in seconds (float)
+        :return: none
+        """
+        self.round_trips += 1
+        self.rows += rows
+        self.time += time
+
+
+    def __repr__( self ):
+        return 'QueryCounter(round_trips={}, rows={}, time={:.6f})'.format( self.round_trips, self.rows, self.time )
+
+
+class QueryReport:
+    """
+    Statistics of the statements sent to the database, broken down by the calling method (e.g., 'add_citydb_object', 'execute_function' or 'join_citydb_objects') and by the SQL function called.
+
+    Statements sent outside of the methods marked with decorator 'dblayer.access.instrumented' are attributed to method 'other'. A statement calling several SQL functions (e.g., when adding several objects in one go) is counted for each of them. Rows fetched via server-side cursors (i.e., by functions 'iter_citydb_objects' and 'iter_join_citydb_objects') are not counted.
+    """
+
+    def __init__( self ):
+        # Counters for all statements.
+        self.total = QueryCounter()
+
+        # Counters for the statements issued by each method (dict of QueryCounter).
+        self.by_method = OrderedDict()
+
+        # Counters for the statements calling each SQL function (dict of QueryCounter).
+        self.by_function = OrderedDict()
+
+        # Wall-clock time of the instrumented block of code (in seconds, only for reports returned by function 'DBAccess.query_report').
+        self.elapsed = None
+
+        # Counters may be updated from several threads.
+        self.lock = threading.Lock()
+
+
+    def add( self, method, functions, rows, time ):
+        """
+        Count a statement.
+
+        :param method: name of the method that issued the statement (string)
+        :param functions: names of the SQL functions called by the statement (list of string)
+        :param rows: number of rows fetched or affected by the statement (int)
+        :param time: time spent executing the statement in seconds (float)
+        :return: none
+        """
+        with self.lock:
+            self.total.add( rows, time )
+            self.by_method.setdefault( method, QueryCounter() ).add( rows, time )
+
+            for function in functions:
+                self.by_function.setdefault( function, QueryCounter() ).add( rows, time )
+
+
+    def __str__( self ):
+        lines = [ '{:<60} {:>11} {:>11} {:>11}'.format( '', 'round trips', 'rows', 'time [s]' ) ]
+
+        def add_line( name, counter ):
+            lines.append( '{:<60} {:>11d} {:>11d} {:>11.6f}'.format( name, counter.round_trips, counter.rows, counter.time ) )
+
+        add_line( 'total', self.total )
+
+        for ( title, counters ) in [ ( 'method', self.by_method ), ( 'function', self.by_function ) ]:
+            for ( name, counter ) in sorted( counters.items(), key = lambda item: -item[1].time ):
+                add_line( '{}: {}'.format( title, name ), counter )
+
+        if self.elapsed is not None:
+            lines.append( 'elapsed time: {:.6f} s'.format( self.elapsed ) )
+
+        return '\n'.join( lines )
@@ -1,3 +1,10 @@
+"""
+Classes for retrieving data from the tables and views of the Simulation Package.
+
+These classes are templates and are never mapped themselves: copies of them are mapped once per database (see class 'dblayer.access.ORMRegistry'), which are accessible via property 'DBAccess.simpkg' (e.g., 'access.simpkg.Node'). Do not query the classes of this module directly.
+"""
+
+
 class Simulation( object ):
     """Define class for retrieving data from table 'sim_pkg.simulation'."""
     def __init__( self ): pass
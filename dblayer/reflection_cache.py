@@ -0,0 +1,110 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+from sqlalchemy import text
+
+
+# SQL query for computing a fingerprint of the structure of all tables and views in the reflected schemas.
+SCHEMA_FINGERPRINT_QUERY = text(
+    """
+    SELECT md5( string_agg(
+        n.nspname || '.' || c.relname || '.' || a.attname || ':' || format_type( a.atttypid, a.atttypmod ),
+        ',' ORDER BY n.nspname, c.relname, a.attnum ) )
+    FROM pg_catalog.pg_attribute a
+    JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname IN ( 'citydb', 'citydb_view', 'sim_pkg' )
+    AND c.relkind IN ( 'r', 'v', 'm', 'p' )
+    AND a.attnum > 0 AND NOT a.attisdropped
+    """
+    )
+
+# SQL query for computing a fingerprint of the content of table 'citydb.objectclass'.
+OBJECTCLASS_FINGERPRINT_QUERY = text(
+    """
+    SELECT md5( string_agg( id || ':' || classname || ':' || coalesce( tablename, '' ), ',' ORDER BY id ) )
+    FROM citydb.objectclass
+    """
+    )
+
+
+class ReflectionCache:
+    """
+    On-disk cache of reflected table metadata and of the object classes listed in table 'citydb.objectclass'.
+
+    Cache files are identified by the database (host, port and name) and by a fingerprint of the database schema, i.e., any change to the structure of the reflected schemas invalidates the cache.
+    """
+
+    # Version of the cache file format.
+    version = 1
+
+
+    def __init__( self, cache_dir, connection_info, engine ):
+        """
+        Constructor.
+
+        :param cache_dir: directory for storing the cache files (string)
+        :param connection_info: tuple containing connection parameters for database (PostgreSQLConnectionInfo)
+        :param engine: engine connected to the database (sqlalchemy.engine.Engine)
+        """
+        self.cache_dir = cache_dir
+
+        # Retrieve fingerprints of the database schema and of the list of object classes.
+        with engine.connect() as connection:
+            schema_fingerprint = connection.execute( SCHEMA_FINGERPRINT_QUERY ).scalar()
+            objectclass_fingerprint = connection.execute( OBJECTCLASS_FINGERPRINT_QUERY ).scalar()
+
+        cache_key = '|'.join( [
+            str( ReflectionCache.version ),
+            str( connection_info.host ),
+            str( connection_info.port ),
+            str( connection_info.dbname ),
+            str( schema_fingerprint ),
+            str( objectclass_fingerprint )
+            ] )
+
+        self.file_name = os.path.join(
+            cache_dir, 'dblayer_reflection_{}.pickle'.format( hashlib.sha1( cache_key.encode() ).hexdigest() )
+            )
+
+
+    def load( self ):
+        """
+        Load cached data from disk.
+
+        :return: cached table metadata and list of object classes, or (None, None) if no valid cache exists (tuple of sqlalchemy.MetaData and list of tuples)
+        """
+        try:
+            with open( self.file_name, 'rb' ) as cache_file:
+                data = pickle.load( cache_file )
+        except ( OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError ):
+            # No (valid) cache file found.
+            return ( None, None )
+
+        return ( data[ 'metadata' ], data[ 'objectclass' ] )
+
+
+    def save( self, metadata, objectclass ):
+        """
+        Store data to disk. The cache file is replaced atomically, i.e., concurrent processes either see the old or the new cache file.
+
+        :param metadata: reflected table metadata (sqlalchemy.MetaData)
+        :param objectclass: content of table 'citydb.objectclass' (list of tuples (id, classname, tablename))
+        :return: none
+        """
+        os.makedirs( self.cache_dir, exist_ok = True )
+
+        ( fd, tmp_file_name ) = tempfile.mkstemp( dir = self.cache_dir, suffix = '.tmp' )
+
+        try:
+            with os.fdopen( fd, 'wb' ) as tmp_file:
+                pickle.dump(
+                    dict( metadata = metadata, objectclass = objectclass ),
+                    tmp_file, protocol = pickle.HIGHEST_PROTOCOL
+                    )
+
+            os.replace( tmp_file_name, self.file_name )
+        finally:
+            if os.path.exists( tmp_file_name ): os.remove( tmp_file_name )
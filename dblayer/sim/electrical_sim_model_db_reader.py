@@ -10,6 +10,9 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
     Base class for constructing a simulation model for an electrical network from information contained in the 3DCityDB.
     """
 
+    # Busses are the node features of electrical networks.
+    node_tables = [ 'busses' ]
+
     @abc.abstractmethod
     def add_bus(
         self, net, name, type, vn_kv, geodata
@@ -21,7 +24,7 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
         :param name: name of the electrical bus (string)
         :param type: type of electrical bus (string)
         :param vn_kv: grid voltage level in kV (float)
-        :param deodata: position of electrical bus (dblayer.func.func_postgis_geom.Point2D)
+        :param deodata: position of electrical bus (dblayer.func.func_postgis_geom.Point2D, or None if geodata are not retrieved)
 
         :return: None
         """
@@ -47,7 +50,7 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
         :param x_ohm_per_km: line reactance in Ohm per km (float)
         :param max_i_ka: maximum thermal current in kA (float)
         :param length_km: length of the line in km (float)
-        :param geodata: position of the line (list of dblayer.func.func_postgis_geom.Point2D)
+        :param geodata: position of the line (dblayer.func.func_postgis_geom.Point2DArray, or None if geodata are not retrieved)
 
         :return: None
         """
@@ -124,18 +127,95 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
         pass
 
 
-    def get_net( self, network_id ):
+    def add_busses( self, net, busses ):
+        """
+        Add several electrical busses to the simulation model. By default, function 'add_bus' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param busses: parameters of function 'add_bus' for each element, i.e., name, type, vn_kv and geodata, together with the ID of the bus feature (key 'id'), which other elements refer to (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_bus, net, [ { k: v for ( k, v ) in b.items() if k != 'id' } for b in busses ] )
+
+
+    def add_lines( self, net, lines ):
+        """
+        Add several electrical lines to the simulation model. By default, function 'add_line' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param lines: parameters of function 'add_line' for each element, i.e., name, from_bus_id, to_bus_id, type, c_nf_per_km, r_ohm_per_km, x_ohm_per_km, max_i_ka, length_km and geodata (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_line, net, lines )
+
+
+    def add_loads( self, net, loads ):
+        """
+        Add several electrical loads to the simulation model. By default, function 'add_load' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param loads: parameters of function 'add_load' for each element, i.e., name, bus_id, p_kw and q_kvar (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_load, net, loads )
+
+
+    def add_transformers( self, net, transformers ):
+        """
+        Add several transformers to the simulation model. By default, function 'add_transformer' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param transformers: parameters of function 'add_transformer' for each element, i.e., name, hv_bus_id, lv_bus_id and type (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_transformer, net, transformers )
+
+
+    def add_switches( self, net, switches ):
+        """
+        Add several switches to the simulation model. By default, function 'add_switch' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param switches: parameters of function 'add_switch' for each element, i.e., name, from_bus_id, to_bus_id and type (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_switch, net, switches )
+
+
+    def add_ext_grids( self, net, ext_grids ):
+        """
+        Add several external grids to the simulation model. By default, function 'add_ext_grid' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param ext_grids: parameters of function 'add_ext_grid' for each element, i.e., name and bus_id (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_ext_grid, net, ext_grids )
+
+
+    def get_net( self, network_id, with_geodata = None ):
         """
         Retrieve the simulation model for the electrical network.
+
+        :param network_id: ID of the network (int)
+        :param with_geodata: retrieve geodata (True), do not retrieve geodata (False) or retrieve geodata on first access ('lazy'), the mode of the reader is used if None (bool or string, optional, default=None)
+        :return: simulation model
         """
 
-        # Map structure from database to classes.
-        self._map_classes()
+        # Retrieve relevant data (or the cached model).
+        return self._get_net( network_id, with_geodata )
+
 
-        # Retrieve relevant data.
-        self._retrieve_data_network_features( network_id )
-        self._retrieve_data_feature_graphs( network_id )
-        self._retrieve_data_generic_attributes( network_id )
+    def _create_net( self ):
+        """
+        Create the simulation model from the retrieved data.
+        """
 
         # Create empty network model.
         net = self.create_empty_network()
@@ -156,6 +236,9 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
         Map relevant structures from database to classes.
         """
 
+        # Reflect all required tables and views in one go.
+        self.reflect_tables( SimModelDBReaderBase.reflected_tables )
+
         self.SimpleFunctionalElement = self.map_citydb_object_class(
             'SimpleFunctionalElement',
             table_name='utn9_ntw_feat_simple_funct_elem',
@@ -222,13 +305,14 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
             )
 
 
-    def _retrieve_data_network_features( self, network_id ):
+    def _network_feature_queries( self, network_id, feature_ids ):
         """
-        After mapping the classes, retrieve all relevant data associated to network features.
+        After mapping the classes, define the queries for retrieving all relevant data associated to network features.
         """
+        queries = OrderedDict()
 
-        self.busses = self.join_citydb_objects(
-            [ 'SimpleFunctionalElement', 'NetworkToFeature' ],
+        queries[ 'busses' ] = JoinQuery(
+            class_names = [ 'SimpleFunctionalElement' ],
             conditions = [
                 or_(
                     getattr( self.SimpleFunctionalElement, 'class' ) == 'busbar',
@@ -236,195 +320,157 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
                     getattr( self.SimpleFunctionalElement, 'class' ) == 'supply point',
                     getattr( self.SimpleFunctionalElement, 'class' ) == 'pole'
                     ),
-                self.SimpleFunctionalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.SimpleFunctionalElement.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name', 'class' ] + self.point2d_columns( self.SimpleFunctionalElement.geom )
             )
 
-        self.lines = self.join_citydb_objects(
-            [ 'Cable', 'NetworkToFeature' ],
+        queries[ 'lines' ] = JoinQuery(
+            class_names = [ 'Cable' ],
             conditions = [
-                self.Cable.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.Cable.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name', 'class' ] + self.length_columns( self.Cable.geom ) + self.list_point2d_columns( self.Cable.geom )
             )
 
-        self.loads = self.join_citydb_objects(
-            [ 'TerminalElement', 'NetworkToFeature' ],
+        queries[ 'loads' ] = JoinQuery(
+            class_names = [ 'TerminalElement' ],
             conditions = [
                 getattr( self.TerminalElement, 'class' ) == 'load',
-                self.TerminalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.TerminalElement.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name', 'conn_cityobject_id' ]
             )
 
-        self.trafos = self.join_citydb_objects(
-            [ 'ComplexFunctionalElement', 'NetworkToFeature' ],
+        queries[ 'trafos' ] = JoinQuery(
+            class_names = [ 'ComplexFunctionalElement' ],
             conditions = [
                 getattr( self.ComplexFunctionalElement, 'class' ) == 'transformer',
-                self.ComplexFunctionalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.ComplexFunctionalElement.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name', 'function' ]
             )
 
-        self.switches = self.join_citydb_objects(
-            [ 'SimpleFunctionalElement', 'NetworkToFeature' ],
+        queries[ 'switches' ] = JoinQuery(
+            class_names = [ 'SimpleFunctionalElement' ],
             conditions = [
                 getattr( self.SimpleFunctionalElement, 'class' ) == 'switch',
-                self.SimpleFunctionalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.SimpleFunctionalElement.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name', 'function' ]
             )
 
-        self.external_grids = self.join_citydb_objects(
-            [ 'TerminalElement', 'NetworkToFeature' ],
+        queries[ 'external_grids' ] = JoinQuery(
+            class_names = [ 'TerminalElement' ],
             conditions = [
                 getattr( self.TerminalElement, 'class' ) == 'external-grid',
-                self.TerminalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.TerminalElement.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name' ]
             )
 
-        self.electrical_appliances = self.join_citydb_objects(
-            [ 'ElectricalAppliances', 'TerminalElement', 'NetworkToFeature' ],
+        queries[ 'electrical_appliances' ] = JoinQuery(
+            class_names = [ 'ElectricalAppliances', 'TerminalElement' ],
             conditions = [
                 self.ElectricalAppliances.id == self.TerminalElement.conn_cityobject_id,
-                self.TerminalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.TerminalElement.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'electr_pwr' ]
             )
 
+        return queries
 
-    def _retrieve_data_feature_graphs( self, network_id ):
+
+    def _feature_graph_queries( self, network_id, feature_ids ):
         """
-        After mapping the classes, retrieve all relevant data associated to feature graphs.
+        After mapping the classes, define the queries for retrieving all relevant data associated to feature graphs.
         """
+        queries = OrderedDict()
 
-        self.feature_graphs = self.join_citydb_objects(
-            [ 'FeatureGraph', 'NetworkToFeature' ],
+        queries[ 'feature_graphs' ] = JoinQuery(
+            class_names = [ 'FeatureGraph' ],
             conditions = [
-                self.FeatureGraph.ntw_feature_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.FeatureGraph.ntw_feature_id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'ntw_feature_id' ]
             )
 
-        self.nodes = self.join_citydb_objects(
-            [ 'Node', 'FeatureGraph', 'NetworkToFeature' ],
+        queries[ 'nodes' ] = JoinQuery(
+            class_names = [ 'Node', 'FeatureGraph' ],
             conditions = [
                 self.Node.feat_graph_id == self.FeatureGraph.id,
-                self.FeatureGraph.ntw_feature_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.FeatureGraph.ntw_feature_id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'feat_graph_id' ]
             )
 
-        self.inter_feature_links = self.join_citydb_objects(
-            [ 'InterFeatureLink', 'NetworkGraph' ],
+        queries[ 'inter_feature_links' ] = JoinQuery(
+            class_names = [ 'InterFeatureLink', 'NetworkGraph' ],
             conditions = [
                 self.InterFeatureLink.ntw_graph_id == self.NetworkGraph.id,
-                self.NetworkGraph.network_id == network_id
+                self.network_condition( self.NetworkGraph.network_id, network_id )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'start_node_id', 'end_node_id', 'link_control', self.NetworkGraph.network_id ]
             )
 
+        return queries
+
 
-    def _retrieve_data_generic_attributes( self, network_id ):
+    def _generic_attribute_queries( self, network_id, feature_ids ):
         """
-        After mapping the classes, retrieve all relevant data stored as generic attributes.
+        After mapping the classes, define the queries for retrieving all relevant data stored as generic attributes.
         """
+        queries = OrderedDict()
 
-        bus_attributes = self.join_citydb_objects(
-            [ 'GenericAttribute', 'NetworkToFeature' ],
+        # Attributes of busses and lines.
+        queries[ 'feature_attributes' ] = self._pivot_generic_attributes_query(
+            attribute_names = [ 'vn_kv', 'c_nf_per_km', 'r_ohm_per_km', 'x_ohm_per_km', 'max_i_ka' ],
             conditions = [
-                self.GenericAttribute.attrname == 'vn_kv',
-                self.GenericAttribute.cityobject_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
-                ],
-            result_index = 0
+                self.in_network( self.GenericAttribute.cityobject_id, feature_ids )
+                ]
             )
 
-        line_attributes_c_nf_per_km = self.join_citydb_objects(
-            [ 'GenericAttribute', 'NetworkToFeature' ],
+        # Attributes of the electrical appliances connected to loads.
+        queries[ 'load_attributes' ] = self._pivot_generic_attributes_query(
+            attribute_names = [ 'q_kvar' ],
+            class_names = [ 'TerminalElement' ],
             conditions = [
-                self.GenericAttribute.attrname == 'c_nf_per_km',
-                self.GenericAttribute.cityobject_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
-                ],
-            result_index = 0
+                self.GenericAttribute.cityobject_id == self.TerminalElement.conn_cityobject_id,
+                self.in_network( self.TerminalElement.id, feature_ids )
+                ]
             )
 
-        line_attributes_r_ohm_per_km = self.join_citydb_objects(
-            [ 'GenericAttribute', 'NetworkToFeature' ],
-            conditions = [
-                self.GenericAttribute.attrname == 'r_ohm_per_km',
-                self.GenericAttribute.cityobject_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
-                ],
-            result_index = 0
-            )
+        return queries
 
-        line_attributes_x_ohm_per_km = self.join_citydb_objects(
-            [ 'GenericAttribute', 'NetworkToFeature' ],
-            conditions = [
-                self.GenericAttribute.attrname == 'x_ohm_per_km',
-                self.GenericAttribute.cityobject_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
-                ],
-            result_index = 0
-            )
 
-        line_attributes_max_i_ka = self.join_citydb_objects(
-            [ 'GenericAttribute', 'NetworkToFeature' ],
-            conditions = [
-                self.GenericAttribute.attrname == 'max_i_ka',
-                self.GenericAttribute.cityobject_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
-                ],
-            result_index = 0
-            )
+    def _store_generic_attributes( self, data ):
+        """
+        Store the data retrieved with the queries for generic attributes.
+        """
 
-        load_attributes = self.join_citydb_objects(
-            [ 'GenericAttribute', 'TerminalElement', 'NetworkToFeature' ],
-            conditions = [
-                self.GenericAttribute.attrname == 'q_kvar',
-                self.GenericAttribute.cityobject_id == self.TerminalElement.conn_cityobject_id,
-                self.TerminalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
-                ],
-            result_index = 0
-            )
+        feature_attributes = data[ 'feature_attributes' ]
 
         # Retrieve data associated to busses stored as generic attributes.
-        self.bus_vn_kv = {
-            attr.cityobject_id: attr.realval for attr in bus_attributes
-            }
+        self.bus_vn_kv = self._generic_attribute_values( feature_attributes, 'vn_kv' )
 
         # Retrieve data associated to lines stored as generic attributes.
-        self.line_c_nf_per_km = {
-            attr.cityobject_id: attr.realval for attr in line_attributes_c_nf_per_km
-            }
-        self.line_r_ohm_per_km = {
-            attr.cityobject_id: attr.realval for attr in line_attributes_r_ohm_per_km
-            }
-        self.line_x_ohm_per_km = {
-            attr.cityobject_id: attr.realval for attr in line_attributes_x_ohm_per_km
-            }
-        self.line_max_i_ka = {
-            attr.cityobject_id: attr.realval for attr in line_attributes_max_i_ka
-            }
+        self.line_c_nf_per_km = self._generic_attribute_values( feature_attributes, 'c_nf_per_km' )
+        self.line_r_ohm_per_km = self._generic_attribute_values( feature_attributes, 'r_ohm_per_km' )
+        self.line_x_ohm_per_km = self._generic_attribute_values( feature_attributes, 'x_ohm_per_km' )
+        self.line_max_i_ka = self._generic_attribute_values( feature_attributes, 'max_i_ka' )
 
         # Retrieve data associated to loads stored as generic attributes.
-        self.load_q_kvar = {
-            attr.cityobject_id: attr.realval for attr in load_attributes
-            }
+        self.load_q_kvar = self._generic_attribute_values( data[ 'load_attributes' ], 'q_kvar' )
 
 
     def _add_busses( self, net ):
@@ -433,21 +479,22 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
         """
         
         ( self.bus_ids_and_names, bus_feature_graph_ids, self.bus_node_ids ) = \
-            self._retrieve_feature_data( self.busses, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.busses )
 
-        for bus in self.busses:
-            bus_geom_wkt = self.execute_function( geom_as_text( bus.geom ) )
-            ( x, y,z ) = from_wkt( bus_geom_wkt ).coords[0]
+        busses = []
 
+        for bus in self.busses:
             bus_type = 'b' if getattr( bus, 'class' ) == 'busbar' else 'n'
 
-            self.add_bus(
-                net = net,
+            busses.append( dict(
+                id = bus.id,
                 name = bus.name,
                 type = bus_type,
                 vn_kv = self.bus_vn_kv[bus.id],
-                geodata = Point2D( x, y )
-                )
+                geodata = self.row_to_point2d( bus )
+                ) )
+
+        self.add_busses( net, busses )
 
 
     def _add_lines( self, net ):
@@ -456,12 +503,17 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( line_ids, line_feature_graph_ids, line_node_ids ) = \
-            self._retrieve_feature_data( self.lines, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.lines )
 
         all_bus_line_connections = \
-            self._retrieve_connections( self.bus_node_ids, line_node_ids, self.inter_feature_links )
+            self._retrieve_connections( self.bus_node_ids, line_node_ids )
 
-        for line in self.lines:
+        lines = []
+
+        # Decode the geometries of all lines in one go.
+        all_line_geomdata = self.rows_to_list_point2d( self.lines )
+
+        for ( line, line_geomdata ) in zip( self.lines, all_line_geomdata ):
             connected_bus_ids = all_bus_line_connections[line.id]
 
             if not len( connected_bus_ids ) == 2:
@@ -469,14 +521,9 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
                     'line \'{}\' is not connected to 2 busses'.format( line.name )
                     )
 
-            length = 1e-3 * self.execute_function( length_from_geom( line.geom ) )
-
-            line_geom_wkt = self.execute_function( geom_as_text( line.geom ) )
-            line_coords = from_wkt( line_geom_wkt ).coords
-            line_geomdata = [ Point2D( c[0], c[1] ) for c in line_coords ]
+            length = 1e-3 * line.length
 
-            self.add_line(
-                net = net,
+            lines.append( dict(
                 name = line.name,
                 from_bus_id = connected_bus_ids[0],
                 to_bus_id = connected_bus_ids[1],
@@ -487,7 +534,9 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
                 max_i_ka = self.line_max_i_ka[line.id],
                 length_km = length,
                 geodata = line_geomdata
-                )
+                ) )
+
+        self.add_lines( net, lines )
 
 
     def _add_loads( self, net ):
@@ -496,27 +545,30 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( load_ids, load_feature_graph_ids, load_node_ids ) = \
-            self._retrieve_feature_data( self.loads, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.loads )
 
         all_bus_load_connections = \
-            self._retrieve_unique_connections( self.bus_node_ids, load_node_ids, self.inter_feature_links )
+            self._retrieve_unique_connections( self.bus_node_ids, load_node_ids )
 
         elec_appliance_ids = {
             appliance.id: appliance
             for appliance in self.electrical_appliances
             }
 
+        loads = []
+
         for load in self.loads:
             connected_bus_id = all_bus_load_connections[load.id]
             connected_electrical_appliance = elec_appliance_ids[load.conn_cityobject_id]
 
-            self.add_load(
-                net = net,
+            loads.append( dict(
                 name = load.name,
                 bus_id = connected_bus_id,
                 p_kw = connected_electrical_appliance.electr_pwr,
                 q_kvar = self.load_q_kvar[connected_electrical_appliance.id]
-                )
+                ) )
+
+        self.add_loads( net, loads )
 
 
     def _add_transformers( self, net ):
@@ -525,10 +577,12 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( trafo_ids, trafo_feature_graph_ids, trafo_node_ids ) = \
-            self._retrieve_feature_data( self.trafos, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.trafos )
 
         all_bus_trafo_connections = \
-            self._retrieve_connections( self.bus_node_ids, trafo_node_ids, self.inter_feature_links )
+            self._retrieve_connections( self.bus_node_ids, trafo_node_ids )
+
+        trafos = []
 
         for trafo in self.trafos:
             connected_bus_ids = all_bus_trafo_connections[trafo.id]
@@ -553,13 +607,14 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
                     'trafo \'{}\' is not connected to 1 LV bus and 1 MV bus'.format( trafo.name )
                     )
 
-            self.add_transformer(
-                net = net,
+            trafos.append( dict(
                 name = trafo.name,
                 hv_bus_id = hv_bus_id,
                 lv_bus_id = lv_bus_id,
                 type = trafo.function
-                )
+                ) )
+
+        self.add_transformers( net, trafos )
 
 
     def _add_switches( self, net ):
@@ -568,11 +623,13 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( switch_ids, switch_feature_graph_ids, switch_node_ids ) = \
-            self._retrieve_feature_data( self.switches, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.switches )
 
         all_bus_switch_connections = \
-            self._retrieve_connections( self.bus_node_ids, switch_node_ids, self.inter_feature_links )
+            self._retrieve_connections( self.bus_node_ids, switch_node_ids )
+
 
+        switches = []
 
         for switch in self.switches:
             connected_bus_ids = all_bus_switch_connections[switch.id]
@@ -585,13 +642,14 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
             from_bus_id = connected_bus_ids[0]
             to_bus_id = connected_bus_ids[1]
 
-            self.add_switch(
-                net = net,
+            switches.append( dict(
                 name = switch.name,
                 from_bus_id = from_bus_id,
                 to_bus_id = to_bus_id,
                 type = switch.function
-                )
+                ) )
+
+        self.add_switches( net, switches )
 
 
     def _add_external_grid( self, net ):
@@ -600,16 +658,45 @@ class ElectricalSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( ext_grid_ids, ext_grid_feature_graph_ids, ext_grid_node_ids ) = \
-            self._retrieve_feature_data( self.external_grids, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.external_grids )
 
         all_bus_ext_grid_connections = \
-            self._retrieve_unique_connections( self.bus_node_ids, ext_grid_node_ids, self.inter_feature_links )
+            self._retrieve_unique_connections( self.bus_node_ids, ext_grid_node_ids )
+
+        ext_grids = []
 
         for ext_grid in self.external_grids:
 
             connected_bus_id = all_bus_ext_grid_connections[ext_grid.id]
-            self.add_ext_grid(
-                net = net,
+            ext_grids.append( dict(
                 name = ext_grid.name,
                 bus_id = connected_bus_id
-                )
+                ) )
+
+        self.add_ext_grids( net, ext_grids )
+
+        # Keep track of busses connected to external grids.
+        self.ext_grid_bus_ids = set( e[ 'bus_id' ] for e in ext_grids )
+
+
+    def _add_boundary_elements( self, net, feature_ids ):
+        """
+        Add an external grid to each bus at the boundary of a sub-network (unless the bus is already connected to an external grid).
+        """
+        ext_grids = [
+            dict( name = 'boundary-{}'.format( self.bus_ids_and_names[ id ] ), bus_id = id )
+            for id in feature_ids if id in self.bus_ids_and_names and id not in self.ext_grid_bus_ids
+            ]
+
+        self.add_ext_grids( net, ext_grids )
+
+
+    def _level_condition( self, levels ):
+        """
+        After mapping the classes, define a condition selecting network features by voltage level, i.e., excluding busses with a nominal voltage (generic attribute 'vn_kv') not in the list of levels.
+        """
+        return ~exists().where( and_(
+            self.GenericAttribute.cityobject_id == self.NetworkToFeature.network_feature_id,
+            self.GenericAttribute.attrname == 'vn_kv',
+            ~self.GenericAttribute.realval.in_( [ float( l ) for l in levels ] )
+            ) )
@@ -9,18 +9,34 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
     Base class for constructing a simulation model for a gas network from information contained in the 3DCityDB.
     """
 
-    def __init__( self, connect, verbose=False ):
+    # Network nodes are the node features of gas networks.
+    node_tables = [ 'network_nodes' ]
+
+    def __init__( self, connect, verbose=False, length_srid = None, model_cache = None, with_geodata = True ):
         """
         Constructor.
 
-        :param connect: tuple containing connection parameters for database (PostgreSQLConnectionInfo)
+        :param connect: tuple containing connection parameters for database (PostgreSQLConnectionInfo), snapshot file (SnapshotFile) or None (see class 'SimModelDBReaderBase')
         :param verbose: turn verbosity on/off (bool, optional, default=False)
+        :param length_srid: ID of a metric spatial reference system, pipe geometries are transformed to it before computing their lengths (int, optional, default=None)
+        :param model_cache: on-disk cache for the simulation models retrieved with function 'get_net' (ModelCache, optional, default=None)
+        :param with_geodata: retrieve geodata (True), do not retrieve geodata (False) or retrieve geodata on first access ('lazy') (bool or string, optional, default=True)
         """
 
-        super().__init__( connect )
+        super().__init__( connect, length_srid, model_cache, with_geodata )
         self.verbose = verbose
 
 
+    def _level_condition( self, levels ):
+        """
+        After mapping the classes, define a condition selecting network features by pressure level, i.e., excluding network nodes with a pressure level (attribute 'function_of_line') not in the list of levels.
+        """
+        return ~exists().where( and_(
+            self.OtherShapePipe.id == self.NetworkToFeature.network_feature_id,
+            ~self.OtherShapePipe.function_of_line.in_( list( levels ) )
+            ) )
+
+
     @abc.abstractmethod
     def add_network_node(
         self, net, name, level, geodata
@@ -31,7 +47,7 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
         :param net: simulation model
         :param name: name of the junction (string)
         :param level: pressure level (string)
-        :param deodata: position of the junction (dblayer.func.func_postgis_geom.Point2D)
+        :param deodata: position of the junction (dblayer.func.func_postgis_geom.Point2D, or None if geodata are not retrieved)
 
         :return: None
         """
@@ -50,7 +66,7 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
         :param node_id: ID of connected network node (int)
         :param p_lim_kw: maximum power in kW flowing through the feeder (float)
         :param p_pa: operating pressure level in Pa at the output of the feeder (float)
-        :param deodata: position of thermal sink (dblayer.func.func_postgis_geom.Point2D)
+        :param deodata: position of thermal sink (dblayer.func.func_postgis_geom.Point2D, or None if geodata are not retrieved)
 
         :return: None
         """
@@ -68,7 +84,7 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
         :param name: name of the electrical bus (string)
         :param node_id: ID of connected network node (int)
         :param p_kw: gas consumption in kW (float)
-        :param deodata: position of thermal sink (dblayer.func.func_postgis_geom.Point2D)
+        :param deodata: position of thermal sink (dblayer.func.func_postgis_geom.Point2D, or None if geodata are not retrieved)
 
         :return: None
         """
@@ -107,16 +123,89 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
         :param to_node_id: ID of connected thermal node (int)
         :param diameter_m: diameter of the pipe in m (float)
         :param length_km: length of the pipe in km (float)
-        :param geodata: position of the pipe (list of dblayer.func.func_postgis_geom.Point2D)
+        :param geodata: position of the pipe (dblayer.func.func_postgis_geom.Point2DArray, or None if geodata are not retrieved)
 
         :return: None
         """
         pass
 
 
-    def get_net( self, network_id ):
+    def add_network_nodes( self, net, network_nodes ):
+        """
+        Add several network nodes to the simulation model. By default, function 'add_network_node' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param network_nodes: parameters of function 'add_network_node' for each element, i.e., name, level and geodata (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_network_node, net, network_nodes )
+
+
+    def add_feeders( self, net, feeders ):
+        """
+        Add several feeders to the simulation model. By default, function 'add_feeder' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param feeders: parameters of function 'add_feeder' for each element, i.e., name, node_id, p_lim_kw, p_pa and geodata (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_feeder, net, feeders )
+
+
+    def add_sinks( self, net, sinks ):
+        """
+        Add several gas sinks to the simulation model. By default, function 'add_sink' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param sinks: parameters of function 'add_sink' for each element, i.e., name, node_id, p_kw and geodata (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_sink, net, sinks )
+
+
+    def add_stations( self, net, stations ):
+        """
+        Add several stations to the simulation model. By default, function 'add_station' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param stations: parameters of function 'add_station' for each element, i.e., name, hp_node_id, lp_node_id, p_lim_kw and p_pa (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_station, net, stations )
+
+
+    def add_pipes( self, net, pipes ):
+        """
+        Add several pipes to the simulation model. By default, function 'add_pipe' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param pipes: parameters of function 'add_pipe' for each element, i.e., name, from_node_id, to_node_id, diameter_m, length_m and geodata (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_pipe, net, pipes )
+
+
+    def get_net( self, network_id, with_geodata = None ):
         """
         Retrieve the electrical network as pandapower model.
+
+        :param network_id: ID of the network (int)
+        :param with_geodata: retrieve geodata (True), do not retrieve geodata (False) or retrieve geodata on first access ('lazy'), the mode of the reader is used if None (bool or string, optional, default=None)
+        :return: simulation model
+        """
+
+        # Retrieve relevant data (or the cached model).
+        return self._get_net( network_id, with_geodata )
+
+
+    def _create_net( self ):
+        """
+        Create the simulation model from the retrieved data.
         """
 
         # Initialize dict: network feature ID --> network feature name
@@ -125,14 +214,6 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
         # Initialize dict: feature graph node ID --> feature graph ID
         self.feature_graph_ids = {}
 
-        # Map structure from database to classes.
-        self._map_classes()
-
-        # Retrieve relevant data.
-        self._retrieve_data_network_features( network_id )
-        self._retrieve_data_feature_graphs( network_id )
-        self._retrieve_data_generic_attributes( network_id )
-
         # Create empty network model.
         net = self.create_empty_network()
 
@@ -151,6 +232,9 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
         Map relevant structures from database to classes.
         """
 
+        # Reflect all required tables and views in one go.
+        self.reflect_tables( SimModelDBReaderBase.reflected_tables )
+
         self.ComplexFunctionalElement = self.map_citydb_object_class(
             'ComplexFunctionalElement',
             table_name='utn9_ntw_feat_complex_funct_elem',
@@ -211,143 +295,133 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
             )
 
 
-    def _retrieve_data_network_features( self, network_id ):
+    def _network_feature_queries( self, network_id, feature_ids ):
         """
-        After mapping the classes, retrieve all relevant data associated to network features.
+        After mapping the classes, define the queries for retrieving all relevant data associated to network features.
         """
+        queries = OrderedDict()
 
-        self.feeders = self.join_citydb_objects(
-            [ 'TerminalElement', 'NetworkToFeature' ],
+        queries[ 'feeders' ] = JoinQuery(
+            class_names = [ 'TerminalElement' ],
             conditions = [
                 getattr( self.TerminalElement, 'class' ) == 'gas-network-feeder',
-                self.TerminalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.TerminalElement.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name' ] + self.point2d_columns( self.TerminalElement.geom )
             )
 
-        self.sinks = self.join_citydb_objects(
-            [ 'TerminalElement', 'NetworkToFeature' ],
+        queries[ 'sinks' ] = JoinQuery(
+            class_names = [ 'TerminalElement' ],
             conditions = [
                 getattr( self.TerminalElement, 'class' ) == 'gas-network-sink',
-                self.TerminalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.TerminalElement.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name' ] + self.point2d_columns( self.TerminalElement.geom )
             )
 
-        self.network_nodes = self.join_citydb_objects(
-            [ 'OtherShapePipe', 'NetworkToFeature' ],
+        queries[ 'network_nodes' ] = JoinQuery(
+            class_names = [ 'OtherShapePipe' ],
             conditions = [
                 getattr( self.OtherShapePipe, 'class' ) == 'gas-network-node',
-                self.OtherShapePipe.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.OtherShapePipe.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name', 'function_of_line' ] + self.point2d_columns( self.OtherShapePipe.geom )
             )
 
-        self.stations = self.join_citydb_objects(
-            [ 'ComplexFunctionalElement', 'NetworkToFeature' ],
+        queries[ 'stations' ] = JoinQuery(
+            class_names = [ 'ComplexFunctionalElement' ],
             conditions = [
                 getattr( self.ComplexFunctionalElement, 'class' ) == 'gas-network-station',
-                self.ComplexFunctionalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.ComplexFunctionalElement.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name' ]
             )
 
-        self.pipes = self.join_citydb_objects(
-            [ 'RoundPipe', 'NetworkToFeature' ],
+        queries[ 'pipes' ] = JoinQuery(
+            class_names = [ 'RoundPipe' ],
             conditions = [
                 getattr( self.RoundPipe, 'class' ) == 'gas-network-pipe',
-                self.RoundPipe.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.RoundPipe.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name', 'int_diameter' ] + self.length_columns( self.RoundPipe.geom ) + self.list_point2d_columns( self.RoundPipe.geom )
             )
 
+        return queries
+
 
-    def _retrieve_data_feature_graphs( self, network_id ):
+    def _feature_graph_queries( self, network_id, feature_ids ):
         """
-        After mapping the classes, retrieve all relevant data associated to feature graphs.
+        After mapping the classes, define the queries for retrieving all relevant data associated to feature graphs.
         """
+        queries = OrderedDict()
 
-        self.feature_graphs = self.join_citydb_objects(
-            [ 'FeatureGraph', 'NetworkToFeature' ],
+        queries[ 'feature_graphs' ] = JoinQuery(
+            class_names = [ 'FeatureGraph' ],
             conditions = [
-                self.FeatureGraph.ntw_feature_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.FeatureGraph.ntw_feature_id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'ntw_feature_id' ]
             )
 
-        self.nodes = self.join_citydb_objects(
-            [ 'Node', 'FeatureGraph', 'NetworkToFeature' ],
+        queries[ 'nodes' ] = JoinQuery(
+            class_names = [ 'Node', 'FeatureGraph' ],
             conditions = [
                 self.Node.feat_graph_id == self.FeatureGraph.id,
-                self.FeatureGraph.ntw_feature_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.FeatureGraph.ntw_feature_id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'feat_graph_id' ]
             )
 
-        self.inter_feature_links = self.join_citydb_objects(
-            [ 'InterFeatureLink', 'NetworkGraph' ],
+        queries[ 'inter_feature_links' ] = JoinQuery(
+            class_names = [ 'InterFeatureLink', 'NetworkGraph' ],
             conditions = [
                 self.InterFeatureLink.ntw_graph_id == self.NetworkGraph.id,
-                self.NetworkGraph.network_id == network_id
+                self.network_condition( self.NetworkGraph.network_id, network_id )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'start_node_id', 'end_node_id', 'link_control', self.NetworkGraph.network_id ]
             )
 
+        return queries
 
-    def _retrieve_data_generic_attributes( self, network_id ):
+
+    def _generic_attribute_queries( self, network_id, feature_ids ):
         """
-        After mapping the classes, retrieve all relevant data stored as generic attributes.
+        After mapping the classes, define the queries for retrieving all relevant data stored as generic attributes.
         """
+        queries = OrderedDict()
 
-        sink_attributes_consumption = self.join_citydb_objects(
-            [ 'GenericAttribute', 'NetworkToFeature' ],
+        # Attributes of sinks, feeders and stations.
+        queries[ 'feature_attributes' ] = self._pivot_generic_attributes_query(
+            attribute_names = [ 'gas_consumption', 'p_lim_kw', 'p_pa' ],
             conditions = [
-                self.GenericAttribute.attrname == 'gas_consumption',
-                self.GenericAttribute.cityobject_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
-                ],
-            result_index = 0
+                self.in_network( self.GenericAttribute.cityobject_id, feature_ids )
+                ]
             )
 
-        p_lim_kw_attributes = self.join_citydb_objects(
-            [ 'GenericAttribute', 'NetworkToFeature' ],
-            conditions = [
-                self.GenericAttribute.attrname == 'p_lim_kw',
-                self.GenericAttribute.cityobject_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
-                ],
-            result_index = 0
-            )
+        return queries
 
-        p_pa_attributes = self.join_citydb_objects(
-            [ 'GenericAttribute', 'NetworkToFeature' ],
-            conditions = [
-                self.GenericAttribute.attrname == 'p_pa',
-                self.GenericAttribute.cityobject_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
-                ],
-            result_index = 0
-            )
+
+    def _store_generic_attributes( self, data ):
+        """
+        Store the data retrieved with the queries for generic attributes.
+        """
+
+        feature_attributes = data[ 'feature_attributes' ]
 
         # Retrieve data associated to sinks stored as generic attributes.
-        self.sink_consumption = {
-            attr.cityobject_id: attr.realval for attr in sink_attributes_consumption
-            }
+        self.sink_consumption = self._generic_attribute_values( feature_attributes, 'gas_consumption' )
 
         # Retrieve data associated to feeders and stations stored as generic attributes.
-        self.p_lim_kw = {
-            attr.cityobject_id: attr.realval for attr in p_lim_kw_attributes
-            }
-        self.p_pa = {
-            attr.cityobject_id: attr.realval for attr in p_pa_attributes
-            }
+        self.p_lim_kw = self._generic_attribute_values( feature_attributes, 'p_lim_kw' )
+        self.p_pa = self._generic_attribute_values( feature_attributes, 'p_pa' )
 
 
     def _add_network_nodes( self, net ):
@@ -356,23 +430,23 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( self.ntwn_ids_and_names, ntwn_feature_graph_ids, self.ntwn_node_ids ) = \
-            self._retrieve_feature_data( self.network_nodes, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.network_nodes )
 
         self.ntwn_levels = {}
 
+        network_nodes = []
+
         for ntwn in self.network_nodes:
 
             self.ntwn_levels[ntwn.id] = ntwn.function_of_line
 
-            ntwn_geom_wkt = self.execute_function( geom_as_text( ntwn.geom ) )
-            ( x, y,z ) = from_wkt( ntwn_geom_wkt ).coords[0]
-
-            self.add_network_node(
-                net = net,
+            network_nodes.append( dict(
                 name = ntwn.name,
                 level = ntwn.function_of_line,
-                geodata = self.geom_to_point2d( ntwn.geom )
-                )
+                geodata = self.row_to_point2d( ntwn )
+                ) )
+
+        self.add_network_nodes( net, network_nodes )
 
 
     def _add_feeders( self, net ):
@@ -381,22 +455,25 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( feeder_ids, feeder_feature_graph_ids, feeder_node_ids ) = \
-            self._retrieve_feature_data( self.feeders, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.feeders )
 
         all_node_feeder_connections = \
-            self._retrieve_unique_connections( self.ntwn_node_ids, feeder_node_ids, self.inter_feature_links )
+            self._retrieve_unique_connections( self.ntwn_node_ids, feeder_node_ids )
+
+        feeders = []
 
         for feeder in self.feeders:
             connected_node_id = all_node_feeder_connections[feeder.id]
 
-            self.add_feeder(
-                net = net,
+            feeders.append( dict(
                 name = feeder.name,
                 node_id = connected_node_id,
                 p_lim_kw = float( self.p_lim_kw[feeder.id] ),
                 p_pa = float( self.p_pa[feeder.id] ),
-                geodata = self.geom_to_point2d( feeder.geom )
-                )
+                geodata = self.row_to_point2d( feeder )
+                ) )
+
+        self.add_feeders( net, feeders )
 
 
     def _add_sinks( self, net ):
@@ -405,21 +482,24 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( sink_ids, sink_feature_graph_ids, sink_node_ids ) = \
-            self._retrieve_feature_data( self.sinks, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.sinks )
 
         all_node_sink_connections = \
-            self._retrieve_unique_connections( self.ntwn_node_ids, sink_node_ids, self.inter_feature_links )
+            self._retrieve_unique_connections( self.ntwn_node_ids, sink_node_ids )
+
+        sinks = []
 
         for sink in self.sinks:
             connected_node_id = all_node_sink_connections[sink.id]
 
-            self.add_sink(
-                net = net,
+            sinks.append( dict(
                 name = sink.name,
                 node_id = connected_node_id,
                 p_kw = float( self.sink_consumption[sink.id] ),
-                geodata = self.geom_to_point2d( sink.geom )
-                )
+                geodata = self.row_to_point2d( sink )
+                ) )
+
+        self.add_sinks( net, sinks )
 
 
     def _add_stations( self, net ):
@@ -428,10 +508,12 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( station_ids, station_feature_graph_ids, station_node_ids ) = \
-            self._retrieve_feature_data( self.stations, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.stations )
 
         all_node_station_connections = \
-            self._retrieve_connections( self.ntwn_node_ids, station_node_ids, self.inter_feature_links )
+            self._retrieve_connections( self.ntwn_node_ids, station_node_ids )
+
+        stations = []
 
         for station in self.stations:
             connected_node_ids = all_node_station_connections[station.id]
@@ -456,14 +538,15 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
                     'station \'{}\' is not connected to 1 MP node and 1 BP node'.format( station.name )
                     )
 
-            self.add_station(
-                net = net,
+            stations.append( dict(
                 name = station.name,
                 hp_node_id = hp_node_id,
                 lp_node_id = lp_node_id,
                 p_lim_kw = float( self.p_lim_kw[station.id] ),
                 p_pa = float( self.p_pa[station.id] )
-                )
+                ) )
+
+        self.add_stations( net, stations )
 
 
     def _add_pipes( self, net ):
@@ -472,13 +555,18 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( pipe_ids, pipe_feature_graph_ids, pipe_node_ids ) = \
-            self._retrieve_feature_data( self.pipes, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.pipes )
 
         all_node_pipe_connections = self._retrieve_connections_with_link_control(
-            self.ntwn_node_ids, pipe_node_ids, self.inter_feature_links
+            self.ntwn_node_ids, pipe_node_ids
             )
 
-        for pipe in self.pipes:
+        pipes = []
+
+        # Decode the geometries of all pipes in one go.
+        all_pipe_geomdata = self.rows_to_list_point2d( self.pipes )
+
+        for ( pipe, pipe_geomdata ) in zip( self.pipes, all_pipe_geomdata ):
             connected_node_ids = all_node_pipe_connections[pipe.id]
 
             if not len( connected_node_ids ) == 2:
@@ -499,14 +587,15 @@ class GasSimModelDBReader( SimModelDBReaderBase ):
                 from_node_id = connected_node_ids[1][0]
                 to_node_id = connected_node_ids[0][0]
 
-            length = self.execute_function( length_from_geom( pipe.geom ) )
+            length = pipe.length
 
-            self.add_pipe(
-                net = net,
+            pipes.append( dict(
                 name = pipe.name,
                 from_node_id = from_node_id,
                 to_node_id = to_node_id,
                 diameter_m = float( pipe.int_diameter ),
                 length_m = length,
-                geodata = self.geom_to_list_point2d( pipe.geom )
-                )
+                geodata = pipe_geomdata
+                ) )
+
+        self.add_pipes( net, pipes )
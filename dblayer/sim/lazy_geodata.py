@@ -0,0 +1,207 @@
+from dblayer.func.func_postgis_geom import Point2D, Point2DArray
+
+from sqlalchemy import text
+
+import collections.abc
+
+
+# SQL query for retrieving the geometries of several network features (as well-known binary representation).
+FEATURE_GEOMETRY_QUERY = text(
+    """
+    SELECT id, ST_AsBinary( geom ) FROM citydb.utn9_network_feature WHERE id = ANY( :feature_ids )
+    """
+    )
+
+
+class GeodataLoader:
+    """
+    Loader of the geodata of network features, which are retrieved on demand (see parameter 'with_geodata' of class 'SimModelDBReaderBase').
+
+    The loader hands out placeholders for the geodata of the features (see classes 'LazyPoint2D' and 'LazyListPoint2D'). When the first placeholder is accessed, the geometries of all features with placeholders are retrieved with a single statement.
+    """
+
+    def __init__( self, reader ):
+        """
+        Constructor.
+
+        :param reader: simulation model reader used for retrieving the geometries (SimModelDBReaderBase)
+        """
+        self.reader = reader
+        self.feature_ids = []
+
+        # Points of the geometries of the features (None before the geometries have been retrieved).
+        self.geometries = None
+
+
+    def point2d( self, feature_id ):
+        """
+        Define a placeholder for the position of a network feature.
+
+        :param feature_id: ID of the network feature (int)
+        :return: placeholder (LazyPoint2D)
+        """
+        self.feature_ids.append( feature_id )
+        return LazyPoint2D( self, feature_id )
+
+
+    def list_point2d( self, feature_id ):
+        """
+        Define a placeholder for the line geometry of a network feature.
+
+        :param feature_id: ID of the network feature (int)
+        :return: placeholder (LazyListPoint2D)
+        """
+        self.feature_ids.append( feature_id )
+        return LazyListPoint2D( self, feature_id )
+
+
+    def geometry( self, feature_id ):
+        """
+        Retrieve the points of the geometry of a network feature, retrieving the geometries of all features with placeholders if necessary.
+
+        :param feature_id: ID of the network feature (int)
+        :return: points (Point2DArray)
+        """
+        if self.geometries is None or feature_id not in self.geometries:
+            self._load()
+
+        return self.geometries[ feature_id ]
+
+
+    def _load( self ):
+        if getattr( self.reader, 'snapshot_file', None ) is not None:
+            raise RuntimeError( 'geodata cannot be retrieved by a reader constructed with a snapshot file' )
+
+        # Start new session if necessary.
+        if self.reader.current_session is None: self.reader.start_citydb_session()
+
+        with self.reader._instrumented_call( 'GeodataLoader.geometry' ):
+            rows = self.reader.current_session.execute(
+                FEATURE_GEOMETRY_QUERY, dict( feature_ids = list( dict.fromkeys( self.feature_ids ) ) )
+                ).fetchall()
+
+        # Decode all geometries in one go.
+        self.geometries = dict( zip(
+            [ row[0] for row in rows ], Point2DArray.from_wkb_list( [ row[1] for row in rows ] )
+            ) )
+
+
+class LazyPoint2D:
+    """
+    Placeholder for the position of a network feature, which behaves like a Point2D. The position is retrieved on first access (see class 'GeodataLoader'). Placeholders are stored (e.g., pickled) as Point2D.
+    """
+
+    __slots__ = ( '_loader', '_feature_id', '_value' )
+
+
+    def __init__( self, loader, feature_id ):
+        self._loader = loader
+        self._feature_id = feature_id
+        self._value = None
+
+
+    def resolve( self ):
+        """
+        Retrieve the position.
+
+        :return: position (Point2D)
+        """
+        if self._value is None:
+            self._value = self._loader.geometry( self._feature_id )[0]
+
+        return self._value
+
+
+    @property
+    def x( self ):
+        return self.resolve().x
+
+
+    @property
+    def y( self ):
+        return self.resolve().y
+
+
+    def __iter__( self ):
+        return iter( self.resolve() )
+
+
+    def __len__( self ):
+        return 2
+
+
+    def __getitem__( self, index ):
+        return self.resolve()[ index ]
+
+
+    def __eq__( self, other ):
+        return self.resolve() == other
+
+
+    def __hash__( self ):
+        return hash( self.resolve() )
+
+
+    def __reduce__( self ):
+        return ( Point2D, tuple( self.resolve() ) )
+
+
+    def __repr__( self ):
+        return 'LazyPoint2D( {} )'.format( self._feature_id if self._value is None else self._value )
+
+
+class LazyListPoint2D( collections.abc.Sequence ):
+    """
+    Placeholder for the line geometry of a network feature, which behaves like a Point2DArray. The geometry is retrieved on first access (see class 'GeodataLoader'). Placeholders are stored (e.g., pickled) as Point2DArray.
+    """
+
+    __slots__ = ( '_loader', '_feature_id', '_value' )
+
+
+    def __init__( self, loader, feature_id ):
+        self._loader = loader
+        self._feature_id = feature_id
+        self._value = None
+
+
+    def resolve( self ):
+        """
+        Retrieve the points of the line geometry.
+
+        :return: points (Point2DArray)
+        """
+        if self._value is None:
+            self._value = self._loader.geometry( self._feature_id )
+
+        return self._value
+
+
+    def __getitem__( self, index ):
+        return self.resolve()[ index ]
+
+
+    def __len__( self ):
+        return len( self.resolve() )
+
+
+    def __array__( self, dtype = None, copy = None ):
+        return self.resolve().__array__( dtype )
+
+
+    def list( self ):
+        return self.resolve().list()
+
+
+    def __eq__( self, other ):
+        return self.resolve() == ( other.resolve() if isinstance( other, LazyListPoint2D ) else other )
+
+
+    __hash__ = None
+
+
+    def __reduce__( self ):
+        return ( Point2DArray, ( self.resolve().coords, ) )
+
+
+    def __repr__( self ):
+        return 'LazyListPoint2D( {} )'.format( self._feature_id if self._value is None else self._value )
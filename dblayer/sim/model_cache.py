@@ -0,0 +1,259 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+from sqlalchemy import text
+
+
+# Common table expression selecting the IDs of the city objects the simulation models of a network are built from
+# (the network, its features, feature graphs, nodes and links, and the city objects connected to its features).
+NETWORK_OBJECTS_CTE = """
+    WITH features AS (
+        SELECT network_feature_id AS id FROM citydb.utn9_network_to_network_feature WHERE network_id = :network_id
+    ), objects AS (
+        SELECT CAST( :network_id AS integer ) AS id
+        UNION
+        SELECT id FROM features
+        UNION
+        SELECT nf.conn_cityobject_id FROM citydb.utn9_network_feature nf JOIN features f ON f.id = nf.id
+        WHERE nf.conn_cityobject_id IS NOT NULL
+        UNION
+        SELECT fg.id FROM citydb.utn9_feature_graph fg JOIN features f ON f.id = fg.ntw_feature_id
+        UNION
+        SELECT n.id FROM citydb.utn9_node n
+        JOIN citydb.utn9_feature_graph fg ON fg.id = n.feat_graph_id
+        JOIN features f ON f.id = fg.ntw_feature_id
+        UNION
+        SELECT l.id FROM citydb.utn9_link l
+        JOIN citydb.utn9_network_graph g ON g.id = l.ntw_graph_id
+        WHERE g.network_id = :network_id
+    )
+    """
+
+# SQL query for computing a change token of a network, similar to the version of the database content (see
+# SNAPSHOT_VERSION_QUERY) but restricted to the city objects of the network: the number and maximal ID of the city
+# objects and their generic attributes, and the last modification and creation dates of the city objects. Whenever
+# objects or generic attributes are added or deleted (or the last modification date of an object is updated), the
+# token changes. Only aggregates of indexed columns are computed, i.e., the query is cheap compared to retrieving
+# the data. Generic attributes that are modified in place are not detected (see NETWORK_CONTENT_TOKEN_QUERY).
+NETWORK_CHANGE_TOKEN_QUERY = text(
+    NETWORK_OBJECTS_CTE +
+    """
+    SELECT
+        ( SELECT count( co.id ) || ':' || coalesce( max( co.id ), 0 ) || ':' ||
+            coalesce( max( co.last_modification_date )::text, '' ) || ':' || coalesce( max( co.creation_date )::text, '' )
+            FROM citydb.cityobject co JOIN objects o ON o.id = co.id ) || '|' ||
+        ( SELECT count( ga.id ) || ':' || coalesce( max( ga.id ), 0 )
+            FROM citydb.cityobject_genericattrib ga JOIN objects o ON o.id = ga.cityobject_id )
+    """
+    )
+
+# SQL query for computing a change token of a network that also covers all values of the generic attributes of
+# its city objects, i.e., generic attributes modified in place change the token as well. The values are hashed on
+# the server, which requires to read all generic attributes of the network (opt-in, see class ModelCache).
+NETWORK_CONTENT_TOKEN_QUERY = text(
+    NETWORK_OBJECTS_CTE +
+    """
+    SELECT
+        ( SELECT count( co.id ) || ':' || coalesce( max( co.id ), 0 ) || ':' ||
+            coalesce( max( co.last_modification_date )::text, '' ) || ':' || coalesce( max( co.creation_date )::text, '' )
+            FROM citydb.cityobject co JOIN objects o ON o.id = co.id ) || '|' ||
+        ( SELECT count( ga.id ) || ':' || coalesce( max( ga.id ), 0 ) || ':' || coalesce( md5( string_agg(
+            ga.id || ':' || ga.attrname || ':' || coalesce( ga.datatype::text, '' ) || ':' ||
+            coalesce( ga.realval::text, '' ) || ':' || coalesce( ga.intval::text, '' ) || ':' || coalesce( ga.strval, '' ) || ':' ||
+            coalesce( ga.dateval::text, '' ) || ':' || coalesce( ga.urival, '' ) || ':' || coalesce( ga.unit, '' ),
+            ',' ORDER BY ga.id ) ), '' )
+            FROM citydb.cityobject_genericattrib ga JOIN objects o ON o.id = ga.cityobject_id )
+    """
+    )
+
+
+class ModelCache:
+    """
+    On-disk cache of simulation models (together with the snapshots they have been constructed from).
+
+    Cache entries are identified by the database (host, port and name), the reader (class and settings), the network ID and a change token of the network, i.e., cached models are only reused as long as the network is unchanged. By default, the change token is computed from aggregates of the IDs and modification dates (see NETWORK_CHANGE_TOKEN_QUERY), which does not detect generic attributes modified in place. Optionally, the token covers all values of the generic attributes (see NETWORK_CONTENT_TOKEN_QUERY), which is more expensive to compute. Outdated entries are not deleted explicitly, instead the least recently used entries are evicted whenever the total size of the cache exceeds the limit. Placeholders for geodata retrieved on first access are resolved when storing a model, i.e., caching models with lazy geodata retrieves all geodata.
+    """
+
+    # Version of the cache file format.
+    version = 1
+
+    # Prefix of the names of the cache files.
+    file_prefix = 'dblayer_model_'
+
+
+    def __init__( self, cache_dir, max_size = None, hash_values = False ):
+        """
+        Constructor.
+
+        :param cache_dir: directory for storing the cache files (string)
+        :param max_size: maximal total size of all cache files in bytes, no limit if None (int, optional, default=None)
+        :param hash_values: compute the change tokens of the networks from all values of their generic attributes (bool, optional, default=False)
+        """
+        if max_size is not None and max_size <= 0:
+            raise RuntimeError( 'parameter \'max_size\' must be a positive number of bytes' )
+
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hash_values = hash_values
+
+
+    def key( self, connection_info, reader, network_id, token ):
+        """
+        Define the key of a cache entry.
+
+        :param connection_info: tuple containing connection parameters for database (PostgreSQLConnectionInfo)
+        :param reader: simulation model reader (SimModelDBReaderBase)
+        :param network_id: ID of the network (int)
+        :param token: change token of the network (string)
+        :return: cache key (string)
+        """
+        return '|'.join( [
+            str( ModelCache.version ),
+            str( connection_info.host ),
+            str( connection_info.port ),
+            str( connection_info.dbname ),
+            '{}.{}'.format( type( reader ).__module__, type( reader ).__qualname__ ),
+            repr( reader.cache_settings() ),
+            str( network_id ),
+            str( token )
+            ] )
+
+
+    def load( self, key ):
+        """
+        Load a cache entry from disk and mark it as recently used.
+
+        :param key: cache key (string)
+        :return: cached data, or None if no valid cache entry exists
+        """
+        file_name = self._file_name( key )
+
+        try:
+            with open( file_name, 'rb' ) as cache_file:
+                data = pickle.load( cache_file )
+        except ( OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError ):
+            # No (valid) cache file found.
+            return None
+
+        if data.get( 'key' ) != key:
+            return None
+
+        try:
+            # Mark entry as recently used.
+            os.utime( file_name )
+        except OSError:
+            pass
+
+        return data[ 'value' ]
+
+
+    def save( self, key, value ):
+        """
+        Store a cache entry to disk, then evict the least recently used entries if the cache exceeds its maximal size. The cache file is replaced atomically, i.e., concurrent processes either see the old or the new cache file.
+
+        :param key: cache key (string)
+        :param value: data to be cached (picklable object)
+        :return: none
+        """
+        os.makedirs( self.cache_dir, exist_ok = True )
+
+        file_name = self._file_name( key )
+        ( fd, tmp_file_name ) = tempfile.mkstemp( dir = self.cache_dir, suffix = '.tmp' )
+
+        try:
+            with os.fdopen( fd, 'wb' ) as tmp_file:
+                pickle.dump( dict( key = key, value = value ), tmp_file, protocol = pickle.HIGHEST_PROTOCOL )
+
+            os.replace( tmp_file_name, file_name )
+        finally:
+            if os.path.exists( tmp_file_name ): os.remove( tmp_file_name )
+
+        self._evict( keep = file_name )
+
+
+    def size( self ):
+        """
+        Retrieve the total size of all cache files.
+
+        :return: size in bytes (int)
+        """
+        return sum( size for ( _, _, size ) in self._entries() )
+
+
+    def clear( self ):
+        """
+        Delete all cache files.
+
+        :return: none
+        """
+        for ( file_name, _, _ ) in self._entries():
+            try:
+                os.remove( file_name )
+            except OSError:
+                pass
+
+
+    def _file_name( self, key ):
+        return os.path.join(
+            self.cache_dir, '{}{}.pickle'.format( ModelCache.file_prefix, hashlib.sha1( key.encode() ).hexdigest() )
+            )
+
+
+    def _entries( self ):
+        """
+        List all cache files.
+
+        :return: file name, time of last use and size of each cache file (list of tuples)
+        """
+        entries = []
+
+        try:
+            names = os.listdir( self.cache_dir )
+        except OSError:
+            return entries
+
+        for name in names:
+            if not ( name.startswith( ModelCache.file_prefix ) and name.endswith( '.pickle' ) ):
+                continue
+
+            file_name = os.path.join( self.cache_dir, name )
+
+            try:
+                stat = os.stat( file_name )
+            except OSError:
+                # File deleted by a concurrent process.
+                continue
+
+            entries.append( ( file_name, stat.st_mtime, stat.st_size ) )
+
+        return entries
+
+
+    def _evict( self, keep = None ):
+        """
+        Delete the least recently used cache files until the total size of the cache does not exceed its maximal size.
+
+        :param keep: never delete this cache file, e.g., the file that has just been stored (string, optional)
+        :return: none
+        """
+        if self.max_size is None:
+            return
+
+        entries = sorted( self._entries(), key = lambda entry: entry[1] )
+        total_size = sum( size for ( _, _, size ) in entries )
+
+        for ( file_name, _, size ) in entries:
+            if total_size <= self.max_size:
+                break
+
+            if file_name == keep:
+                continue
+
+            try:
+                os.remove( file_name )
+            except OSError:
+                pass
+
+            total_size -= size
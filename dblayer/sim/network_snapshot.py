@@ -0,0 +1,322 @@
+import pandas
+
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import text
+from sqlalchemy.util import lightweight_named_tuple
+
+
+# Version of the database content a snapshot has been retrieved from:
+#  - timestamp: transaction timestamp of the database when the snapshot was retrieved (datetime.datetime)
+#  - max_object_id: maximal ID of all city objects (int)
+#  - max_attribute_id: maximal ID of all generic attributes (int)
+SnapshotVersion = namedtuple( 'SnapshotVersion', [ 'timestamp', 'max_object_id', 'max_attribute_id' ] )
+
+# SQL query for retrieving the current version of the database content (see SnapshotVersion).
+SNAPSHOT_VERSION_QUERY = text(
+    """
+    SELECT now(),
+        ( SELECT coalesce( max( id ), 0 ) FROM citydb.cityobject ),
+        ( SELECT coalesce( max( id ), 0 ) FROM citydb.cityobject_genericattrib )
+    """
+    )
+
+# SQL query for retrieving the IDs of all features of a network that have changed since a snapshot has been
+# retrieved, i.e., features for which the feature itself, its feature graphs, its nodes or the city object
+# connected to it have been created or modified (according to their IDs and their creation and last modification
+# dates) or have new generic attributes.
+CHANGED_FEATURES_QUERY = text(
+    """
+    WITH features AS (
+        SELECT network_feature_id AS id FROM citydb.utn9_network_to_network_feature WHERE network_id = :network_id
+    ), related AS (
+        SELECT f.id AS feature_id, f.id AS object_id FROM features f
+        UNION ALL
+        SELECT f.id, nf.conn_cityobject_id FROM citydb.utn9_network_feature nf JOIN features f ON f.id = nf.id
+        WHERE nf.conn_cityobject_id IS NOT NULL
+        UNION ALL
+        SELECT f.id, fg.id FROM citydb.utn9_feature_graph fg JOIN features f ON f.id = fg.ntw_feature_id
+        UNION ALL
+        SELECT f.id, n.id FROM citydb.utn9_node n
+        JOIN citydb.utn9_feature_graph fg ON fg.id = n.feat_graph_id
+        JOIN features f ON f.id = fg.ntw_feature_id
+    )
+    SELECT r.feature_id FROM related r JOIN citydb.cityobject co ON co.id = r.object_id
+    WHERE co.id > :max_object_id OR co.creation_date > :timestamp OR co.last_modification_date > :timestamp
+    UNION
+    SELECT r.feature_id FROM related r JOIN citydb.cityobject_genericattrib ga ON ga.cityobject_id = r.object_id
+    WHERE ga.id > :max_attribute_id
+    """
+    )
+
+
+class NetworkSnapshot:
+    """
+    In-memory snapshot of all data retrieved from the database for constructing the simulation model of one network (see function 'SimModelDBReaderBase.load_snapshot').
+
+    The data is stored column by column, i.e., as named tables (e.g., 'busses' or 'feature_graphs') that map column names to lists of values. Missing values are stored as None.
+
+    Snapshots that know the IDs of the network features and the version of the database content they have been retrieved from can be refreshed, i.e., updated with the data of the features that have changed since (see function 'SimModelDBReaderBase.refresh_snapshot').
+    """
+
+    def __init__( self, network_id, tables = None, feature_ids = None, version = None, boundary_feature_ids = None ):
+        """
+        Constructor.
+
+        :param network_id: ID of the network (int)
+        :param tables: columns of the tables, each table given as column names mapped to lists of values (OrderedDict of OrderedDict, optional)
+        :param feature_ids: IDs of all features of the network (list of int, optional)
+        :param version: version of the database content the snapshot has been retrieved from (SnapshotVersion, optional)
+        :param boundary_feature_ids: IDs of the features at the boundary of a sub-network (list of int, optional)
+        """
+        self.network_id = network_id
+        self.tables = OrderedDict() if tables is None else tables
+        self.feature_ids = feature_ids
+        self.version = version
+        self.boundary_feature_ids = boundary_feature_ids
+
+
+    @classmethod
+    def from_rows( cls, network_id, results, feature_ids = None, version = None ):
+        """
+        Create a snapshot from query results.
+
+        :param network_id: ID of the network (int)
+        :param results: column names and result rows for each table (OrderedDict of tuples (list of string, list of tuples))
+        :param feature_ids: IDs of all features of the network (list of int, optional)
+        :param version: version of the database content the results have been retrieved from (SnapshotVersion, optional)
+        :return: snapshot (NetworkSnapshot)
+        """
+        tables = OrderedDict()
+
+        for ( name, ( columns, rows ) ) in results.items():
+            values = list( zip( *rows ) ) if len( rows ) > 0 else [ () ] * len( columns )
+            tables[ name ] = OrderedDict( ( c, _column( v ) ) for ( c, v ) in zip( columns, values ) )
+
+        return cls( network_id, tables, feature_ids, version )
+
+
+    @property
+    def names( self ):
+        """
+        Names of all tables in the snapshot.
+
+        :return: table names (list of string)
+        """
+        return list( self.tables.keys() )
+
+
+    def columns( self, name ):
+        """
+        Retrieve the column names of a table.
+
+        :param name: name of the table (string)
+        :return: column names (list of string)
+        """
+        return list( self.tables[ name ].keys() )
+
+
+    def rows( self, name ):
+        """
+        Retrieve the content of a table row by row.
+
+        :param name: name of the table (string)
+        :return: list of rows (named tuples)
+        """
+        table = self.tables[ name ]
+        Row = lightweight_named_tuple( 'result', list( table.keys() ) )
+
+        return [ Row( values ) for values in zip( *table.values() ) ]
+
+
+    def to_dataframe( self, name ):
+        """
+        Retrieve the content of a table as data frame. Note that pandas represents missing values in numerical columns as NaN.
+
+        :param name: name of the table (string)
+        :return: data frame (pandas.DataFrame)
+        """
+        return pandas.DataFrame( self.tables[ name ], columns = self.columns( name ) )
+
+
+    def merge( self, delta, feature_ids ):
+        """
+        Merge the data retrieved for a subset of the network features into the snapshot.
+
+        Rows are identified by their first column named 'id' or 'cityobject_id'. Rows of the delta replace rows with the same ID (at the same position), all other rows of the delta are appended. Rows associated to the given features (via columns 'id', 'cityobject_id', 'ntw_feature_id' or 'feat_graph_id') that are not part of the delta are removed. Tables without ID column are replaced completely.
+
+        :param delta: data retrieved for the network features (NetworkSnapshot)
+        :param feature_ids: IDs of the network features the delta has been retrieved for, including features that have been removed from the network (set of int)
+        :return: None
+        """
+        # Map feature graphs to network features (before and after the merge).
+        graph_features = self._graph_features()
+        graph_features.update( delta._graph_features() )
+
+        all_feature_ids = set( self.feature_ids or [] ) | set( feature_ids )
+
+        for ( name, delta_table ) in delta.tables.items():
+            table = self.tables.get( name )
+            key = self._key( delta_table )
+
+            if table is None or key is None:
+                self.tables[ name ] = delta_table
+                continue
+
+            # Features associated to the rows of the table.
+            owners = self._row_features( table, all_feature_ids, graph_features )
+
+            delta_rows = OrderedDict( ( id, i ) for ( i, id ) in enumerate( delta_table[ key ] ) )
+            columns = list( table.keys() )
+
+            merged = OrderedDict( ( c, [] ) for c in columns )
+            merged_ids = set()
+
+            for ( i, ( id, owner ) ) in enumerate( zip( table[ key ], owners ) ):
+                if id in delta_rows:
+                    # Replace row.
+                    ( source, j ) = ( delta_table, delta_rows[ id ] )
+                elif owner in feature_ids:
+                    # Remove row.
+                    continue
+                else:
+                    # Keep row.
+                    ( source, j ) = ( table, i )
+
+                for c in columns:
+                    merged[ c ].append( source[ c ][ j ] )
+
+                merged_ids.add( id )
+
+            # Append new rows.
+            for ( id, j ) in delta_rows.items():
+                if id in merged_ids: continue
+                for c in columns:
+                    merged[ c ].append( delta_table[ c ][ j ] )
+
+            self.tables[ name ] = merged
+
+
+    def split( self, network_feature_ids, by_network = True ):
+        """
+        Split a snapshot retrieved for several networks into one snapshot per network, or split the snapshot of one network into partitions.
+
+        Rows are associated to networks via column 'network_id' or via the network features they are associated to (see function 'merge'). Rows that cannot be associated to any network feature (e.g., generic attributes of city objects connected to network features) are included in the snapshots of all networks.
+
+        :param network_feature_ids: IDs of the features of each network or partition, with the network IDs (or partition IDs) as keys (OrderedDict of list of int)
+        :param by_network: associate rows via column 'network_id'; otherwise, inter-feature links are associated to the network feature of their start node (bool, optional, default=True)
+        :return: snapshots, with the network IDs (or partition IDs) as keys (OrderedDict of NetworkSnapshot)
+        """
+        feature_networks = {}
+        for ( network_id, feature_ids ) in network_feature_ids.items():
+            for feature_id in feature_ids:
+                feature_networks.setdefault( feature_id, [] ).append( network_id )
+
+        graph_features = self._graph_features()
+
+        tables = OrderedDict( ( network_id, OrderedDict() ) for network_id in network_feature_ids )
+
+        for ( name, table ) in self.tables.items():
+            if by_network and 'network_id' in table:
+                row_networks = [ [ network_id ] for network_id in table[ 'network_id' ] ]
+            elif 'start_node_id' in table:
+                node_features = self._node_features( graph_features )
+                row_networks = [
+                    feature_networks.get( node_features.get( id ), [] ) for id in table[ 'start_node_id' ]
+                    ]
+            else:
+                row_networks = [
+                    feature_networks.get( owner, [] ) if owner is not None else list( network_feature_ids )
+                    for owner in self._row_features( table, feature_networks, graph_features )
+                    ]
+
+            # Select the rows of each network.
+            network_rows = OrderedDict( ( network_id, [] ) for network_id in network_feature_ids )
+            for ( i, networks ) in enumerate( row_networks ):
+                for network_id in networks:
+                    if network_id in network_rows: network_rows[ network_id ].append( i )
+
+            for ( network_id, rows ) in network_rows.items():
+                tables[ network_id ][ name ] = OrderedDict(
+                    ( c, [ values[ i ] for i in rows ] ) for ( c, values ) in table.items()
+                    )
+
+        return OrderedDict(
+            ( network_id, NetworkSnapshot( network_id, tables[ network_id ], list( feature_ids ), self.version ) )
+            for ( network_id, feature_ids ) in network_feature_ids.items()
+            )
+
+
+    def _key( self, table ):
+        """
+        Retrieve the name of the column identifying the rows of a table, i.e., the first column named 'id' or 'cityobject_id' (or None).
+        """
+        return next( ( c for c in table.keys() if c in ( 'id', 'cityobject_id' ) ), None )
+
+
+    def _graph_features( self ):
+        """
+        Map the IDs of the feature graphs to the IDs of their network features.
+        """
+        if 'feature_graphs' not in self.tables:
+            return {}
+
+        table = self.tables[ 'feature_graphs' ]
+        return dict( zip( table[ 'id' ], table[ 'ntw_feature_id' ] ) )
+
+
+    def _node_features( self, graph_features ):
+        """
+        Map the IDs of the nodes to the IDs of their network features.
+        """
+        if 'nodes' not in self.tables:
+            return {}
+
+        table = self.tables[ 'nodes' ]
+        return dict( zip( table[ 'id' ], [ graph_features.get( id ) for id in table[ 'feat_graph_id' ] ] ) )
+
+
+    def _row_features( self, table, feature_ids, graph_features ):
+        """
+        Retrieve the network feature associated to each row of a table, via columns 'ntw_feature_id', 'feat_graph_id' or the ID column of the table (see function '_key').
+
+        :param table: columns of the table (OrderedDict)
+        :param feature_ids: IDs of all network features (set or dict)
+        :param graph_features: IDs of the feature graphs mapped to the IDs of their network features (dict)
+        :return: ID of the network feature for each row, None for rows not associated to a network feature (list)
+        """
+        if 'ntw_feature_id' in table:
+            return list( table[ 'ntw_feature_id' ] )
+
+        if 'feat_graph_id' in table:
+            return [ graph_features.get( id ) for id in table[ 'feat_graph_id' ] ]
+
+        key = self._key( table )
+        if key is None:
+            return [ None ] * len( next( iter( table.values() ), [] ) )
+
+        return [ id if id in feature_ids else None for id in table[ key ] ]
+
+
+    def __len__( self ):
+        return len( self.tables )
+
+
+    def __repr__( self ):
+        sizes = ', '.join(
+            '{}={}'.format( name, len( next( iter( table.values() ), [] ) ) ) for ( name, table ) in self.tables.items()
+            )
+        return 'NetworkSnapshot(network_id={}, {})'.format( self.network_id, sizes )
+
+
+def _column( values ):
+    """
+    Store the values of a column as list. Binary values (e.g., well-known binary representations of geometries), which are retrieved as memory views, are copied to bytes, i.e., snapshots can be pickled.
+    """
+    # Columns contain values of the same type (or None), hence checking the first value suffices.
+    first = next( ( v for v in values if v is not None ), None )
+
+    if isinstance( first, memoryview ):
+        return [ bytes( v ) if isinstance( v, memoryview ) else v for v in values ]
+
+    return list( values )
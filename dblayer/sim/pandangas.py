@@ -6,12 +6,16 @@ from .gas_sim_model_db_reader import GasSimModelDBReader
 # Import pandangas module.
 import pandangas as pg
 
+import inspect
+import pandas
 import warnings
 
 
 class PandaNGasModelDBReader( GasSimModelDBReader ):
     """
     Construct a pandngas simulation model from information contained in the 3DCityDB.
+
+    Elements are added to the data frames of the network model in one go (see functions 'add_network_nodes', 'add_feeders', 'add_sinks', 'add_stations' and 'add_pipes'), with one concatenation per data frame. The rows have the same columns and default values as the rows added by the according pandangas functions (e.g., 'pandangas.create_bus').
     """
 
     def create_empty_network( self ):
@@ -88,3 +92,187 @@ class PandaNGasModelDBReader( GasSimModelDBReader ):
             diameter_m = diameter_m,
             name = name
             )
+
+
+    def add_network_nodes( self, net, network_nodes ):
+
+        for n in network_nodes:
+            if n[ 'level' ] not in net.LEVELS:
+                raise ValueError( 'unknown pressure level: {}'.format( n[ 'level' ] ) )
+
+        defaults = self._defaults( pg.create_bus )
+
+        self._append_rows( net, 'bus', [
+            dict( name = n[ 'name' ], level = n[ 'level' ], zone = defaults[ 'zone' ], type = 'NODE' )
+            for n in network_nodes
+            ] )
+
+
+    def add_feeders( self, net, feeders ):
+
+        busses = [ self.ntwn_ids_and_names[ f[ 'node_id' ] ] for f in feeders ]
+
+        self._append_rows( net, 'feeder', [
+            dict( name = f[ 'name' ], bus = bus, p_lim_kW = f[ 'p_lim_kw' ], p_Pa = f[ 'p_pa' ] )
+            for ( f, bus ) in zip( feeders, busses )
+            ] )
+
+        # Busses connected to feeders are sources.
+        self._change_bus_types( net, busses, 'SRCE' )
+
+
+    def add_sinks( self, net, sinks ):
+
+        defaults = self._defaults( pg.create_load )
+
+        self._append_rows( net, 'load', [
+            dict(
+                name = s[ 'name' ], bus = self.ntwn_ids_and_names[ s[ 'node_id' ] ], p_kW = s[ 'p_kw' ],
+                min_p_Pa = defaults[ 'min_p_Pa' ], scaling = defaults[ 'scaling' ]
+                )
+            for s in sinks
+            ] )
+
+
+    def add_stations( self, net, stations ):
+
+        busses_low = [ self.ntwn_ids_and_names[ s[ 'lp_node_id' ] ] for s in stations ]
+
+        self._append_rows( net, 'station', [
+            dict(
+                name = s[ 'name' ], bus_high = self.ntwn_ids_and_names[ s[ 'hp_node_id' ] ], bus_low = bus_low,
+                p_lim_kW = s[ 'p_lim_kw' ], p_Pa = s[ 'p_pa' ]
+                )
+            for ( s, bus_low ) in zip( stations, busses_low )
+            ] )
+
+        # Busses on the low-pressure side of stations are sources.
+        self._change_bus_types( net, busses_low, 'SRCE' )
+
+
+    def add_pipes( self, net, pipes ):
+
+        defaults = self._defaults( pg.create_pipe )
+
+        self._append_rows( net, 'pipe', [
+            dict(
+                name = p[ 'name' ],
+                from_bus = self.ntwn_ids_and_names[ p[ 'from_node_id' ] ], to_bus = self.ntwn_ids_and_names[ p[ 'to_node_id' ] ],
+                length_m = p[ 'length_m' ], diameter_m = p[ 'diameter_m' ],
+                material = defaults[ 'material' ], in_service = defaults[ 'in_service' ]
+                )
+            for p in pipes
+            ] )
+
+
+    def _defaults( self, create ):
+        """
+        Retrieve the default values of the optional parameters of a pandangas function.
+
+        :param create: pandangas function creating one element (callable)
+        :return: default values by parameter name (dict)
+        """
+        return {
+            name: parameter.default for ( name, parameter ) in inspect.signature( create ).parameters.items()
+            if parameter.default is not inspect.Parameter.empty
+            }
+
+
+    def _append_rows( self, net, table_name, rows ):
+        """
+        Add several elements to the network model in one go, by appending rows to one of its data frames. The rows are numbered consecutively, as with the pandangas functions creating single elements.
+
+        :param net: network model
+        :param table_name: name of the data frame (string)
+        :param rows: values of all columns for each element (list of dict)
+        :return: None
+        """
+        if len( rows ) == 0:
+            return
+
+        table = self._tables( net )[ table_name ]
+
+        if set( rows[0].keys() ) != set( table.columns ):
+            raise RuntimeError( 'unexpected columns of pandangas data frame \'{}\': {}'.format( table_name, list( table.columns ) ) )
+
+        new_rows = pandas.DataFrame( rows, index = range( len( table ), len( table ) + len( rows ) ), columns = table.columns )
+
+        self._set_table( net, table_name, pandas.concat( [ table, new_rows ] ) if len( table ) > 0 else new_rows )
+
+
+    def _change_bus_types( self, net, busses, bus_type ):
+        """
+        Change the type of several busses, which must not be linked to a feeder or a station yet (as with function 'pandangas.create_feeder').
+
+        :param net: network model
+        :param busses: names of the busses (list of string)
+        :param bus_type: new type of the busses (string)
+        :return: None
+        """
+        if len( busses ) == 0:
+            return
+
+        table = self._tables( net )[ 'bus' ]
+        selected = table[ 'name' ].isin( busses )
+
+        if len( set( busses ) ) != len( busses ) or ( table.loc[ selected, 'type' ] != 'NODE' ).any():
+            raise ValueError( 'busses are already linked to a feeder or a station' )
+
+        table.loc[ selected, 'type' ] = bus_type
+
+
+    def merge_nets( self, nets ):
+        """
+        Merge network models of disjoint parts of a network into one network model, by concatenating their data frames. Elements refer to each other by name, hence only consecutively numbered rows need to be re-indexed.
+
+        :param nets: network models (list)
+        :return: merged network model
+        """
+        net = self.create_empty_network()
+
+        for ( name, table ) in self._tables( net ).items():
+            parts = [ self._tables( n )[ name ] for n in nets ]
+            parts = [ part for part in parts if len( part ) > 0 ]
+
+            if len( parts ) == 0:
+                continue
+
+            numbered = all( list( part.index ) == list( range( len( part ) ) ) for part in parts )
+            combined = pandas.concat( parts, ignore_index = numbered )
+
+            # Keep the data types of the columns.
+            for ( column, dtype ) in parts[0].dtypes.items():
+                try:
+                    combined[ column ] = combined[ column ].astype( dtype )
+                except ( TypeError, ValueError ):
+                    pass
+
+            self._set_table( net, name, combined )
+
+        return net
+
+
+    def _tables( self, net ):
+        """
+        Retrieve the data frames of a network model.
+
+        :param net: network model
+        :return: data frames by name (dict)
+        """
+        items = net.items() if isinstance( net, dict ) else vars( net ).items()
+        return { name: table for ( name, table ) in items if isinstance( table, pandas.DataFrame ) }
+
+
+    def _set_table( self, net, name, table ):
+        """
+        Replace a data frame of a network model.
+
+        :param net: network model
+        :param name: name of the data frame (string)
+        :param table: new data frame (pandas.DataFrame)
+        :return: None
+        """
+        if isinstance( net, dict ):
+            net[ name ] = table
+        else:
+            setattr( net, name, table )
@@ -2,18 +2,43 @@
 # coding: utf-8
 
 from .electrical_sim_model_db_reader import ElectricalSimModelDBReader
+from dblayer.func.func_postgis_geom import Point2DArray
 
 # Import pandapower module.
 import pandapower as pp
 
+from collections import OrderedDict
+
+import pandas
 import warnings
 
 
 class PandaPowerModelDBReader( ElectricalSimModelDBReader ):
     """
     Construct a pandapower simulation model from information contained in the 3DCityDB.
+
+    Lazy geodata are not supported (see parameter 'with_geodata' of the constructor): pandapower stores the coordinates of busses in numeric columns of table 'bus_geodata', the placeholders would be resolved when adding the busses.
     """
 
+    # The geodata are copied to the tables of the network model.
+    supports_lazy_geodata = False
+
+    # Tables of the network model that are merged (see function 'merge_nets'), with their columns referring to busses.
+    merged_tables = OrderedDict( [
+        ( 'bus', [] ),
+        ( 'line', [ 'from_bus', 'to_bus' ] ),
+        ( 'load', [ 'bus' ] ),
+        ( 'trafo', [ 'hv_bus', 'lv_bus' ] ),
+        ( 'switch', [ 'bus' ] ),
+        ( 'ext_grid', [ 'bus' ] )
+        ] )
+
+    # Tables containing the geodata of elements, with the tables of the elements.
+    geodata_tables = OrderedDict( [ ( 'bus_geodata', 'bus' ), ( 'line_geodata', 'line' ) ] )
+
+    # Tables of the elements switches refer to (column 'element'), by element type (column 'et').
+    switch_element_tables = OrderedDict( [ ( 'b', 'bus' ), ( 'l', 'line' ), ( 't', 'trafo' ) ] )
+
     def create_empty_network( self ):
         """
         Create an empty network model.
@@ -24,6 +49,256 @@ class PandaPowerModelDBReader( ElectricalSimModelDBReader ):
         return pp.create_empty_network()
 
 
+    def add_busses( self, net, busses ):
+
+        index = self._create_elements(
+            net, 'bus', pp.create_bus,
+            [ dict( name = b[ 'name' ], vn_kv = b[ 'vn_kv' ], type = b[ 'type' ] ) for b in busses ],
+            [ 'name', 'vn_kv', 'type' ]
+            )
+
+        if len( busses ) > 0 and busses[0][ 'geodata' ] is not None:
+            self._append_geodata( net, 'bus_geodata', index, dict(
+                x = [ b[ 'geodata' ].x for b in busses ],
+                y = [ b[ 'geodata' ].y for b in busses ]
+                ) )
+
+        # Map bus IDs to indices, for retrieving the busses connected to other elements.
+        self.bus_indices = dict( zip( [ b[ 'id' ] for b in busses ], index ) )
+
+
+    def add_lines( self, net, lines ):
+
+        index = self._create_elements(
+            net, 'line', pp.create_line_from_parameters,
+            [ dict(
+                name = l[ 'name' ],
+                from_bus = self._bus_index( l[ 'from_bus_id' ] ),
+                to_bus = self._bus_index( l[ 'to_bus_id' ] ),
+                length_km = l[ 'length_km' ],
+                type = self._line_type( l[ 'type' ] ),
+                c_nf_per_km = l[ 'c_nf_per_km' ],
+                r_ohm_per_km = l[ 'r_ohm_per_km' ],
+                x_ohm_per_km = l[ 'x_ohm_per_km' ],
+                max_i_ka = l[ 'max_i_ka' ]
+                ) for l in lines ],
+            [ 'name', 'from_bus', 'to_bus', 'length_km', 'type', 'c_nf_per_km', 'r_ohm_per_km', 'x_ohm_per_km', 'max_i_ka' ]
+            )
+
+        if len( lines ) > 0 and lines[0][ 'geodata' ] is not None:
+            self._append_geodata( net, 'line_geodata', index, dict(
+                coords = [ Point2DArray( l[ 'geodata' ] ).list() for l in lines ]
+                ) )
+
+
+    def add_loads( self, net, loads ):
+
+        self._create_elements(
+            net, 'load', pp.create_load,
+            [ dict(
+                name = l[ 'name' ],
+                bus = self._bus_index( l[ 'bus_id' ] ),
+                p_kw = l[ 'p_kw' ],
+                q_kvar = l[ 'q_kvar' ]
+                ) for l in loads ],
+            [ 'name', 'bus', 'p_kw', 'q_kvar' ]
+            )
+
+
+    def add_transformers( self, net, transformers ):
+
+        # Parameters derived from the standard type are the same for all transformers of one type.
+        for std_type in dict.fromkeys( t[ 'type' ] for t in transformers ):
+            self._create_elements(
+                net, 'trafo', pp.create_transformer,
+                [ dict(
+                    name = t[ 'name' ],
+                    hv_bus = self._bus_index( t[ 'hv_bus_id' ] ),
+                    lv_bus = self._bus_index( t[ 'lv_bus_id' ] ),
+                    std_type = std_type
+                    ) for t in transformers if t[ 'type' ] == std_type ],
+                [ 'name', 'hv_bus', 'lv_bus' ]
+                )
+
+
+    def add_switches( self, net, switches ):
+
+        self._create_elements(
+            net, 'switch', pp.create_switch,
+            [ dict(
+                name = s[ 'name' ],
+                bus = self._bus_index( s[ 'from_bus_id' ] ),
+                element = self._bus_index( s[ 'to_bus_id' ] ),
+                et = 'b',
+                closed = True,
+                type = s[ 'type' ]
+                ) for s in switches ],
+            [ 'name', 'bus', 'element', 'type' ]
+            )
+
+
+    def add_ext_grids( self, net, ext_grids ):
+
+        self._create_elements(
+            net, 'ext_grid', pp.create_ext_grid,
+            [ dict(
+                name = e[ 'name' ],
+                bus = self._bus_index( e[ 'bus_id' ] )
+                ) for e in ext_grids ],
+            [ 'name', 'bus' ]
+            )
+
+
+    def merge_nets( self, nets ):
+        """
+        Merge network models of disjoint parts of a network into one network model. The indices of the elements of each model are shifted by offsets, such that the indices of all models are disjoint, and all references to busses (and other elements) are shifted accordingly. Each table is then concatenated in one go.
+
+        :param nets: network models (list of pandapower.auxiliary.pandapowerNet)
+        :return: merged network model (pandapower.auxiliary.pandapowerNet)
+        """
+        merged = self.create_empty_network()
+
+        nets = [ net for net in nets if len( net.bus ) > 0 ]
+
+        for net in nets:
+            for ( name, table ) in net.items():
+                if isinstance( table, pandas.DataFrame ) and len( table ) > 0 and not name.startswith( '_' ) and \
+                    name not in self.merged_tables and name not in self.geodata_tables:
+                    raise RuntimeError( 'network models with elements in table \'{}\' cannot be merged'.format( name ) )
+
+        # Offsets of the indices of the elements of each model.
+        offsets = []
+        next_index = dict.fromkeys( self.merged_tables, 0 )
+
+        for net in nets:
+            offsets.append( dict( next_index ) )
+
+            for name in next_index:
+                if len( net[ name ] ) > 0:
+                    next_index[ name ] += int( net[ name ].index.max() ) + 1
+
+        for name in list( self.merged_tables ) + list( self.geodata_tables ):
+            element = self.geodata_tables.get( name, name )
+            parts = []
+
+            for ( net, offset ) in zip( nets, offsets ):
+                if len( net[ name ] ) == 0:
+                    continue
+
+                part = net[ name ].copy()
+                part.index = part.index + offset[ element ]
+
+                for column in self.merged_tables.get( name, [] ):
+                    part[ column ] = part[ column ] + offset[ 'bus' ]
+
+                if name == 'switch':
+                    for ( et, target ) in self.switch_element_tables.items():
+                        part.loc[ part[ 'et' ] == et, 'element' ] += offset[ target ]
+
+                parts.append( part )
+
+            if len( parts ) > 0:
+                merged[ name ] = self._preserve_dtypes( pandas.concat( parts, sort = False ), parts[0].dtypes )
+
+        return merged
+
+
+    def _create_elements( self, net, element, create, elements, columns ):
+        """
+        Add several elements to one table of the network in one vectorised step. The first element is created with the according pandapower function, which sets the default values of all other columns. Its row is then used as template for all other elements.
+
+        :param net: simulation model (pandapower.auxiliary.pandapowerNet)
+        :param element: name of the table (string)
+        :param create: pandapower function creating one element (e.g., pandapower.create_bus)
+        :param elements: parameters of the function for each element (list of dict)
+        :param columns: parameters that differ between the elements, which are stored in columns with the same name (list of string)
+        :return: indices of the new elements (list of int)
+        """
+        if len( elements ) == 0:
+            return []
+
+        dtypes = net[ element ].dtypes
+
+        first = create( net = net, **elements[0] )
+        index = list( range( first, first + len( elements ) ) )
+
+        table = net[ element ]
+
+        rows = table.loc[ [ first ] * len( elements ) ]
+        rows.index = index
+
+        for column in columns:
+            rows[ column ] = [ e[ column ] for e in elements ]
+
+        net[ element ] = self._preserve_dtypes(
+            pandas.concat( [ table.drop( first ), rows ] )[ table.columns ], dtypes )
+
+        return index
+
+
+    def _append_geodata( self, net, element, index, columns ):
+        """
+        Add geodata of several elements to the network.
+
+        :param net: simulation model (pandapower.auxiliary.pandapowerNet)
+        :param element: name of the table storing the geodata (string)
+        :param index: indices of the elements (list of int)
+        :param columns: geodata of the elements (dict of lists)
+        """
+        if len( index ) == 0:
+            return
+
+        table = net[ element ]
+        geodata = pandas.DataFrame( columns, index = index )
+
+        net[ element ] = pandas.concat( [ table, geodata ], sort = False )[ table.columns ]
+
+
+    def _preserve_dtypes( self, table, dtypes ):
+        """
+        Restore the column types of a table after adding rows. Columns that cannot be restored keep their new type, with a warning.
+
+        :return: table (pandas.DataFrame)
+        """
+        for ( column, dtype ) in dtypes.items():
+            if table[ column ].dtype != dtype:
+                try:
+                    table[ column ] = table[ column ].astype( dtype )
+                except ( ValueError, TypeError ) as e:
+                    warnings.warn( 'column \'{}\' cannot be converted from type \'{}\' to type \'{}\': {}'.format(
+                        column, table[ column ].dtype, dtype, e ), RuntimeWarning )
+
+        return table
+
+
+    def _bus_index( self, bus_id ):
+        """
+        Retrieve the index of a bus in the network.
+
+        :param bus_id: ID of the bus (int)
+        :return: index of the bus (int)
+        """
+        return self.bus_indices[ bus_id ]
+
+
+    def _line_type( self, type ):
+        """
+        Retrieve the pandapower line type.
+
+        :param type: type of line (string)
+        :return: pandapower line type (string)
+        """
+        line_type = None
+        if type == 'cable':
+            line_type = 'cs'
+        elif type == 'line':
+            line_type = 'ol'
+        else:
+            warnings.warn( 'unknown line type: {}'.format( type ), RuntimeWarning )
+
+        return line_type
+
+
     def add_bus(
             self, net, name, type, vn_kv, geodata
             ):
@@ -33,7 +308,7 @@ class PandaPowerModelDBReader( ElectricalSimModelDBReader ):
             name = name,
             vn_kv = vn_kv,
             type = type,
-            geodata = ( geodata.x, geodata.y )
+            geodata = None if geodata is None else ( geodata.x, geodata.y )
             )
 
 
@@ -51,22 +326,14 @@ class PandaPowerModelDBReader( ElectricalSimModelDBReader ):
             net, 'bus', self.bus_ids_and_names[to_bus_id]
             )
 
-        line_geodata = [ [ c.x, c.y ] for c in geodata ]
+        line_geodata = None if geodata is None else Point2DArray( geodata ).list()
 
-        line_type = None
-        if type == 'cable':
-            line_type = 'cs'
-        elif type == 'line':
-            line_type = 'ol'
-        else:
-            warnings.warn( 'unknown line type: {}'.format( type ), RuntimeWarning )
-        
         pp.create_line_from_parameters(
                 net = net,
                 from_bus = from_bus,
                 to_bus = to_bus,
                 length_km = length_km,
-                type = line_type,
+                type = self._line_type( type ),
                 c_nf_per_km = c_nf_per_km,
                 r_ohm_per_km = r_ohm_per_km,
                 x_ohm_per_km = x_ohm_per_km,
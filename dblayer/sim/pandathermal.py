@@ -9,6 +9,8 @@ import warnings
 class PandaThermalModelDBReader( ThermalSimModelDBReader ):
     """
     Construct a pandathermal simulation model from information contained in the 3DCityDB.
+
+    Elements are added to the network graph in one go (see functions 'add_thermal_sources', 'add_sinks', 'add_junctions' and 'add_pipes'), with the same node and edge attributes as set by the according pandathermal functions (e.g., 'pandathermal.add_srce'). In verbose mode, the elements are added one by one.
     """
 
     def create_empty_network( self ):
@@ -21,6 +23,48 @@ class PandaThermalModelDBReader( ThermalSimModelDBReader ):
         return pth.create_empty_directed_network()
 
 
+    def replace_net( self, net, new_net ):
+        """
+        Replace the content of a network graph with the content of another network graph.
+
+        :param net: network graph to be updated (networkx.classes.digraph.DiGraph)
+        :param new_net: network graph with the new content (networkx.classes.digraph.DiGraph)
+        :return: None
+        """
+        net.clear()
+        net.update( new_net )
+
+
+    def merge_nets( self, nets ):
+        """
+        Merge network graphs of disjoint parts of a network into one network graph. Nodes and edges are identified by name, hence the graphs are simply composed.
+
+        :param nets: network graphs (list of networkx.classes.digraph.DiGraph)
+        :return: merged network graph (networkx.classes.digraph.DiGraph)
+        """
+        net = self.create_empty_network()
+
+        for part in nets:
+            net.graph.update( part.graph )
+            net.add_nodes_from( part.nodes( data = True ) )
+            net.add_edges_from( part.edges( data = True ) )
+
+        return net
+
+
+    def net_elements( self, net ):
+        """
+        List the nodes and edges of a network graph, e.g., for comparing network graphs independent of the order of their elements.
+
+        :param net: network graph (networkx.classes.digraph.DiGraph)
+        :return: sorted names of the nodes and edges (dict of lists)
+        """
+        return dict(
+            nodes = sorted( str( n ) for n in net.nodes() ),
+            edges = sorted( '{}|{}'.format( *e ) for e in net.edges() )
+            )
+
+
     def add_thermal_source(
         self, net, name, geodata
         ):
@@ -58,3 +102,38 @@ class PandaThermalModelDBReader( ThermalSimModelDBReader ):
         if self.verbose: print( 'pth.add_pipe( net, "{}", "{}" )'.format( from_node_name, to_node_name ) )
 
         pth.add_pipe( net, from_node_name, to_node_name )
+
+
+    def add_thermal_sources( self, net, thermal_sources ):
+
+        if self.verbose:
+            return super().add_thermal_sources( net, thermal_sources )
+
+        net.add_nodes_from( ( s[ 'name' ], dict( type = 'SRCE' ) ) for s in thermal_sources )
+
+
+    def add_sinks( self, net, sinks ):
+
+        if self.verbose:
+            return super().add_sinks( net, sinks )
+
+        net.add_nodes_from( ( s[ 'name' ], dict( type = 'SINK', p_kw = s[ 'heat_diss_kw' ] ) ) for s in sinks )
+
+
+    def add_junctions( self, net, junctions ):
+
+        if self.verbose:
+            return super().add_junctions( net, junctions )
+
+        net.add_nodes_from( ( j[ 'name' ], dict( type = 'NODE' ) ) for j in junctions )
+
+
+    def add_pipes( self, net, pipes ):
+
+        if self.verbose:
+            return super().add_pipes( net, pipes )
+
+        net.add_edges_from(
+            ( self.feature_names[ p[ 'from_node_id' ] ], self.feature_names[ p[ 'to_node_id' ] ], dict( type = 'PIPE' ) )
+            for p in pipes
+            )
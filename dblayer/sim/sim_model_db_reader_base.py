@@ -4,11 +4,55 @@ import abc
 from dblayer.access import *
 from dblayer.func.func_postgis_geom import *
 
+from .model_cache import ModelCache, NETWORK_CHANGE_TOKEN_QUERY, NETWORK_CONTENT_TOKEN_QUERY
+from .network_snapshot import NetworkSnapshot, SnapshotVersion, SNAPSHOT_VERSION_QUERY, CHANGED_FEATURES_QUERY
+from .topology_index import TopologyIndex, NETWORK_WALK_QUERY
+from .lazy_geodata import GeodataLoader
+
 from pygeoif import from_wkt
 
+from sqlalchemy import any_, exists, func, literal
+
+from collections import OrderedDict
+from inspect import signature
+
+import concurrent.futures
+import contextlib
+import itertools
+import pandas
+import pickle
+import warnings
+
 
 class SimModelDBReaderBase( DBAccess, abc.ABC ):
 
+    # Tables of the snapshots listing network features that are represented as nodes of the simulation model (e.g., busses), as opposed to network features connecting them (e.g., lines).
+    node_tables = []
+
+    # Support for geodata retrieved on first access, i.e., the functions adding elements keep the placeholders without resolving them (see parameter 'with_geodata' of the constructor).
+    supports_lazy_geodata = True
+
+    # Tables and views used by the simulation model readers, which are reflected from the database in one go.
+    reflected_tables = [
+        ( 'utn9_ntw_feat_simple_funct_elem', 'citydb_view' ),
+        ( 'utn9_ntw_feat_complex_funct_elem', 'citydb_view' ),
+        ( 'utn9_ntw_feat_term_elem', 'citydb_view' ),
+        ( 'utn9_ntw_feat_distrib_elem_cable', 'citydb_view' ),
+        ( 'utn9_ntw_feat_distrib_elem_pipe_round', 'citydb_view' ),
+        ( 'utn9_ntw_feat_distrib_elem_pipe_other_shape', 'citydb_view' ),
+        ( 'utn9_network_graph', 'citydb_view' ),
+        ( 'utn9_node', 'citydb_view' ),
+        ( 'utn9_link_interfeature', 'citydb_view' ),
+        ( 'nrg8_facilities_electrical_appliances', 'citydb_view' ),
+        ( 'nrg8_facilities_dhw', 'citydb_view' ),
+        ( 'cityobject_genericattrib_real', 'citydb_view' ),
+        ( 'cityobject_genericattrib_int', 'citydb_view' ),
+        ( 'cityobject_genericattrib_string', 'citydb_view' ),
+        ( 'utn9_feature_graph', 'citydb' ),
+        ( 'utn9_network_to_network_feature', 'citydb' )
+        ]
+
+
     @abc.abstractmethod
     def create_empty_network( self ):
         """
@@ -26,122 +70,986 @@ class SimModelDBReaderBase( DBAccess, abc.ABC ):
         """
 
 
-    def __init__( self, connect ):
+    def __init__( self, connect, length_srid = None, model_cache = None, with_geodata = True ):
         """
         Constructor.
 
-        :param connect: tuple containing connection parameters for database (PostgreSQLConnectionInfo)
+        :param connect: tuple containing connection parameters for database (PostgreSQLConnectionInfo), or snapshot file for constructing the simulation model without access to the database (SnapshotFile), or None for a reader without access to the database, which only constructs simulation models from snapshots (see function 'get_net_from_snapshot')
+        :param length_srid: ID of a metric spatial reference system, line geometries are transformed to it before computing their lengths (int, optional, default=None)
+        :param model_cache: on-disk cache for the simulation models retrieved with function 'get_net', which may be shared among readers (ModelCache, optional, default=None)
+        :param with_geodata: retrieve geodata (True), do not retrieve geodata and pass None to the functions adding elements (False), or pass placeholders that retrieve the geodata of all elements on first access ('lazy', only if attribute 'supports_lazy_geodata' is True) (bool or string, optional, default=True)
         """
 
+        if model_cache is not None and not isinstance( model_cache, ModelCache ):
+            raise TypeError( 'parameter \'model_cache\' must be of type \'ModelCache\'' )
+
+        self._check_geodata_mode( with_geodata )
+
         super().__init__()
-        self.connect_to_citydb( connect )
+
+        # Snapshot file replacing the database (None for retrieving the data from the database).
+        self.snapshot_file = None
+
+        if connect is None:
+            if model_cache is not None:
+                raise RuntimeError( 'simulation models constructed without access to the database cannot be cached' )
+        elif callable( getattr( connect, 'read_snapshot', None ) ):
+            if model_cache is not None:
+                raise RuntimeError( 'simulation models constructed from snapshot files cannot be cached' )
+
+            self.snapshot_file = connect
+        else:
+            self.connect_to_citydb( connect )
+
+        # Spatial reference system for computing lengths (None for using the reference system of the database).
+        self.length_srid = length_srid
+
+        # Cache for simulation models (None for always retrieving the models from the database).
+        self.model_cache = model_cache
+
+        # Mode for retrieving geodata (see parameter 'with_geodata').
+        self.with_geodata = with_geodata
+
+        # Loader for geodata retrieved on first access (only used if attribute 'with_geodata' is 'lazy').
+        self.geodata_loader = None
+
+
+    def cache_settings( self ):
+        """
+        Settings of the reader that affect the simulation models. Models are only retrieved from the model cache if they have been stored by a reader with the same settings.
+
+        :return: settings (dict)
+        """
+        return dict( length_srid = self.length_srid, with_geodata = self.with_geodata )
+
+
+    @instrumented
+    def change_token( self, network_id, hash_values = False ):
+        """
+        Retrieve a token that changes whenever the data of a network changes (see NETWORK_CHANGE_TOKEN_QUERY). Computing the token requires a single aggregate query, i.e., it is much cheaper than retrieving the data. Generic attributes modified in place are only detected when hashing their values (see NETWORK_CONTENT_TOKEN_QUERY), which requires to read all generic attributes of the network.
+
+        :param network_id: ID of the network (int)
+        :param hash_values: include a hash of the values of all generic attributes (bool, optional, default=False)
+        :return: change token (string)
+        """
+        self._check_database()
+
+        # Start new session if necessary.
+        if self.current_session is None: self.start_citydb_session()
+
+        query = NETWORK_CONTENT_TOKEN_QUERY if hash_values is True else NETWORK_CHANGE_TOKEN_QUERY
+
+        return self.current_session.execute( query, dict( network_id = network_id ) ).scalar()
+
+
+    def _get_net( self, network_id, with_geodata = None ):
+        """
+        Retrieve the simulation model for a network. If a model cache is used, the model is retrieved from the cache if the network has not changed since the model has been cached. Otherwise, the model is constructed from the data in the database (and stored in the cache).
+
+        :param network_id: ID of the network (int)
+        :param with_geodata: mode for retrieving geodata, the mode of the reader is used if None (bool or string, optional, default=None)
+        :return: simulation model
+        """
+        with self.geodata_mode( with_geodata ):
+            return self._get_net_with_geodata_mode( network_id )
+
+
+    @contextlib.contextmanager
+    def geodata_mode( self, with_geodata ):
+        """
+        Context manager for temporarily changing the mode for retrieving geodata (see parameter 'with_geodata' of the constructor).
+
+        :param with_geodata: mode for retrieving geodata, the mode is not changed if None (bool or string)
+        """
+        if with_geodata is None:
+            yield
+            return
+
+        self._check_geodata_mode( with_geodata )
+        previous = self.with_geodata
+        self.with_geodata = with_geodata
+
+        try:
+            yield
+        finally:
+            self.with_geodata = previous
+
+
+    def _check_geodata_mode( self, with_geodata ):
+        if with_geodata is not True and with_geodata is not False and with_geodata != 'lazy':
+            raise RuntimeError( 'parameter \'with_geodata\' must be True, False or \'lazy\'' )
+
+        if with_geodata == 'lazy' and not self.supports_lazy_geodata:
+            raise RuntimeError( 'lazy geodata are not supported by {}, the placeholders would be resolved when adding the elements'.format(
+                type( self ).__name__ ) )
+
+
+    def _get_net_with_geodata_mode( self, network_id ):
+        if self.model_cache is None:
+            return self.get_net_from_snapshot( self.load_snapshot( network_id ) )
+
+        token = self.change_token( network_id, hash_values = self.model_cache.hash_values )
+        key = self.model_cache.key( self.connection_info, self, network_id, token )
+
+        cached = self.model_cache.load( key )
+        if cached is not None:
+            return cached[ 'net' ]
+
+        snapshot = self.load_snapshot( network_id )
+        net = self.get_net_from_snapshot( snapshot )
+
+        try:
+            self.model_cache.save( key, dict( snapshot = snapshot, net = net ) )
+        except ( OSError, pickle.PicklingError, TypeError, AttributeError ) as e:
+            warnings.warn( 'simulation model could not be cached: {}'.format( e ), RuntimeWarning )
+
+        return net
+
+
+    @instrumented
+    def load_snapshot( self, network_id ):
+        """
+        Retrieve all data required for constructing the simulation model of a network. The IDs of the network features are resolved once, all other data is then retrieved with a fixed number of statements (independent of the size of the network).
+
+        If the reader has been constructed with a snapshot file instead of connection parameters, the snapshot is loaded from the file instead.
+
+        :param network_id: ID of the network (int)
+        :return: snapshot of the retrieved data (NetworkSnapshot)
+        """
+        if self.snapshot_file is not None:
+            snapshot = self.snapshot_file.read_snapshot()
+
+            if snapshot.network_id != network_id:
+                raise RuntimeError( 'snapshot file does not contain network {}'.format( network_id ) )
+
+            return snapshot
+
+        # Map structure from database to classes.
+        self._map_classes()
+
+        # The version is retrieved first, i.e., changes made while retrieving the data are detected when refreshing the snapshot.
+        version = self._snapshot_version()
+
+        feature_ids = self._feature_ids( network_id )
+
+        return NetworkSnapshot.from_rows(
+            network_id, self._retrieve_tables( network_id, feature_ids ), feature_ids, version
+            )
+
+
+    @instrumented
+    def refresh_snapshot( self, snapshot ):
+        """
+        Update a snapshot with the data of all network features that have been added, removed or modified since the snapshot has been retrieved. Only the data of these features is retrieved from the database (except for the inter-feature links, which are retrieved completely since removed links cannot be detected otherwise).
+
+        Features are detected as modified if the feature itself, its feature graphs, its nodes or the city object connected to it have been created since, or if their last modification date is more recent than the snapshot. Features with new generic attributes are also detected as modified. Note that changes that do not update the last modification date (e.g., changing the value of an existing generic attribute) are not detected.
+
+        :param snapshot: snapshot retrieved with function 'load_snapshot' (NetworkSnapshot)
+        :return: IDs of the added, removed or modified network features (set of int)
+        """
+        self._check_database()
+
+        if snapshot.version is None or snapshot.feature_ids is None:
+            raise RuntimeError( 'snapshot cannot be refreshed (version of the database content unknown)' )
+
+        # Map structure from database to classes.
+        self._map_classes()
+
+        version = self._snapshot_version()
+
+        feature_ids = self._feature_ids( snapshot.network_id )
+
+        # Retrieve the IDs of the modified features.
+        changed_feature_ids = set(
+            row[0] for row in self.current_session.execute(
+                CHANGED_FEATURES_QUERY, dict( network_id = snapshot.network_id, **snapshot.version._asdict() )
+                )
+            )
+
+        # Add the IDs of added and removed features.
+        changed_feature_ids.update( set( feature_ids ).symmetric_difference( snapshot.feature_ids ) )
+
+        delta = NetworkSnapshot.from_rows(
+            snapshot.network_id,
+            self._retrieve_tables( snapshot.network_id, sorted( changed_feature_ids & set( feature_ids ) ) )
+            )
+
+        snapshot.merge( delta, changed_feature_ids )
+        snapshot.feature_ids = feature_ids
+        snapshot.version = version
+
+        return changed_feature_ids
+
+
+    def rebuild_net( self, net, snapshot ):
+        """
+        Update the snapshot a simulation model has been constructed from with all changes to the network since the snapshot has been retrieved (see function 'refresh_snapshot'), then rebuild the complete model from the updated snapshot. The time for retrieving the changes from the database depends on the number of changed features, not on the size of the network. The model itself is not patched, it is reconstructed completely from the snapshot in memory, i.e., the time for constructing it still depends on the size of the network.
+
+        The content of the model is replaced in place (see function 'replace_net'), i.e., references to the model remain valid (but not references to its parts, e.g., data frames). Unchanged and modified features keep the position of their rows in the snapshot and new features are appended, hence their elements are constructed in the same order as before. For instance, unchanged busses of a pandapower model keep their indices as long as no features have been removed.
+
+        :param net: simulation model constructed from the snapshot
+        :param snapshot: snapshot retrieved with function 'load_snapshot' (NetworkSnapshot)
+        :return: IDs of the added, removed or modified network features (set of int)
+        """
+        changed_feature_ids = self.refresh_snapshot( snapshot )
+
+        if len( changed_feature_ids ) > 0:
+            self.replace_net( net, self.get_net_from_snapshot( snapshot ) )
+
+        return changed_feature_ids
+
+
+    def replace_net( self, net, new_net ):
+        """
+        Replace the content of a simulation model with the content of another simulation model. Override this function for simulation models that are neither dictionaries nor plain objects.
+
+        :param net: simulation model to be updated
+        :param new_net: simulation model with the new content
+        :return: None
+        """
+        if isinstance( net, dict ):
+            net.clear()
+            net.update( new_net )
+        else:
+            net.__dict__.clear()
+            net.__dict__.update( new_net.__dict__ )
+
+
+    def _check_database( self ):
+        """
+        Check that the reader retrieves data from the database, i.e., it has not been constructed with a snapshot file or without connection parameters.
+        """
+        if self.snapshot_file is not None:
+            raise RuntimeError( 'reader has been constructed with a snapshot file and has no access to the database' )
+
+        if self.connection_info is None:
+            raise RuntimeError( 'reader has been constructed without connection parameters and has no access to the database' )
+
+
+    def _snapshot_version( self ):
+        """
+        Retrieve the current version of the database content.
+
+        :return: version (SnapshotVersion)
+        """
+        # Start new session if necessary.
+        if self.current_session is None: self.start_citydb_session()
+
+        return SnapshotVersion( *self.current_session.execute( SNAPSHOT_VERSION_QUERY ).first() )
+
+
+    def _feature_ids( self, network_id ):
+        """
+        After mapping the classes, retrieve the IDs of all features of a network.
+
+        :param network_id: ID of the network (int)
+        :return: IDs of the network features (list of int)
+        """
+        return [ f.network_feature_id for f in self.join_citydb_objects( *self._feature_ids_query( network_id ) ) ]
+
+
+    def _retrieve_tables( self, network_id, feature_ids ):
+        """
+        After mapping the classes, retrieve the data of the network features.
+
+        :param network_id: ID of the network (int)
+        :param feature_ids: IDs of the network features (list of int)
+        :return: column names and result rows for each table (OrderedDict of tuples (list of string, list of tuples))
+        """
+        queries = self._data_queries( network_id, feature_ids )
+
+        return OrderedDict(
+            ( name, ( self._query_column_names( query ), self.join_citydb_objects( *query ) ) )
+            for ( name, query ) in queries.items()
+            )
+
+
+    def get_nets( self, network_ids, processes = None ):
+        """
+        Retrieve the simulation models for several networks. All data is retrieved with the same number of statements as for a single network (see function 'load_snapshots'), the models are then constructed one after the other or in parallel.
+
+        :param network_ids: IDs of the networks (list of int)
+        :param processes: number of worker processes for constructing the models in parallel, the models are constructed in the current process if None (int, optional, default=None)
+        :return: simulation models, with the network IDs as keys (OrderedDict)
+        """
+        snapshots = self.load_snapshots( network_ids )
+
+        if processes is None:
+            return OrderedDict(
+                ( network_id, self.get_net_from_snapshot( snapshot ) ) for ( network_id, snapshot ) in snapshots.items()
+                )
+
+        with concurrent.futures.ProcessPoolExecutor( processes ) as executor:
+            nets = executor.map(
+                _get_net_from_snapshot,
+                itertools.repeat( type( self ) ), itertools.repeat( self._assembly_settings() ), snapshots.values()
+                )
+
+            return OrderedDict( zip( snapshots.keys(), nets ) )
+
+
+    @instrumented
+    def load_snapshots( self, network_ids ):
+        """
+        Retrieve all data required for constructing the simulation models of several networks. Each query is issued only once for all networks (instead of once per network), the results are then split per network.
+
+        :param network_ids: IDs of the networks (list of int)
+        :return: snapshots of the retrieved data, with the network IDs as keys (OrderedDict of NetworkSnapshot)
+        """
+        self._check_database()
+
+        network_ids = list( network_ids )
+
+        if len( network_ids ) == 0:
+            return OrderedDict()
+
+        # Map structure from database to classes.
+        self._map_classes()
+
+        version = self._snapshot_version()
+
+        network_feature_ids = OrderedDict( ( network_id, [] ) for network_id in network_ids )
+        for f in self.join_citydb_objects( *self._feature_ids_query( network_ids ) ):
+            network_feature_ids[ f.network_id ].append( f.network_feature_id )
+
+        feature_ids = sorted( set( id for ids in network_feature_ids.values() for id in ids ) )
+
+        snapshot = NetworkSnapshot.from_rows( None, self._retrieve_tables( network_ids, feature_ids ), feature_ids, version )
+
+        return snapshot.split( network_feature_ids )
+
+
+    def _assembly_settings( self ):
+        """
+        Constructor arguments for a reader without access to the database that constructs the same simulation models from snapshots as this reader (see function 'get_nets'). These are all parameters of the constructor except 'connect' and 'model_cache', their values are taken from the attributes of the same name.
+
+        :return: parameter names and values (dict)
+        """
+        if self.with_geodata == 'lazy':
+            raise RuntimeError( 'lazy geodata are not supported for simulation models constructed in worker processes' )
+
+        settings = {}
+
+        for name in list( signature( type( self ).__init__ ).parameters )[ 1: ]:
+            if name in ( 'connect', 'model_cache' ):
+                continue
+
+            if not hasattr( self, name ):
+                raise RuntimeError( 'constructor parameter \'{}\' of class \'{}\' is not stored in an attribute of the same name'.format(
+                    name, type( self ).__name__ ) )
+
+            settings[ name ] = getattr( self, name )
+
+        return settings
+
+
+    def get_net_from_snapshot( self, snapshot, processes = None, validate = False ):
+        """
+        Create the simulation model for a network from previously retrieved data.
+
+        For large networks, the model can be assembled in parallel: the snapshot is split into partitions of connected components of the network (see function 'partition_snapshot'), the partial models are constructed by worker processes and then merged into one model (see function 'merge_nets'). Networks consisting of a single connected component are always assembled in the current process.
+
+        :param snapshot: snapshot of the data retrieved for the network (NetworkSnapshot)
+        :param processes: number of worker processes for assembling the model in parallel, the model is assembled in the current process if None (int, optional, default=None)
+        :param validate: compare the elements of the merged model to the elements of the model assembled in the current process, raise an error if they differ (bool, optional, default=False)
+        :return: simulation model
+        """
+        if processes is not None:
+            partitions = self.partition_snapshot( snapshot, processes )
+
+            if len( partitions ) > 1:
+                with concurrent.futures.ProcessPoolExecutor( min( processes, len( partitions ) ) ) as executor:
+                    nets = list( executor.map(
+                        _get_net_from_snapshot,
+                        itertools.repeat( type( self ) ), itertools.repeat( self._assembly_settings() ), partitions
+                        ) )
+
+                net = self.merge_nets( nets )
+
+                if validate and self.net_elements( net ) != self.net_elements( self.get_net_from_snapshot( snapshot ) ):
+                    raise RuntimeError( 'parallel model assembly does not match serial model assembly' )
+
+                return net
+
+        self._store_data( snapshot )
+
+        self.geodata_loader = GeodataLoader( self ) if self.with_geodata == 'lazy' else None
+
+        net = self._create_net()
+
+        if snapshot.boundary_feature_ids:
+            self._add_boundary_elements( net, snapshot.boundary_feature_ids )
+
+        return net
+
+
+    def partition_snapshot( self, snapshot, partitions ):
+        """
+        Split the snapshot of a network into partitions that can be assembled independently, i.e., partitions consisting of connected components of the network. The components are distributed such that the partitions contain similar numbers of network features.
+
+        :param snapshot: snapshot of the data retrieved for the network (NetworkSnapshot)
+        :param partitions: maximal number of partitions (int)
+        :return: snapshots of the partitions (list of NetworkSnapshot)
+        """
+        if partitions < 1:
+            raise RuntimeError( 'parameter \'partitions\' must be a positive number' )
+
+        topology = TopologyIndex(
+            snapshot.rows( 'feature_graphs' ), snapshot.rows( 'nodes' ), snapshot.rows( 'inter_feature_links' )
+            )
+
+        components = OrderedDict()
+        for ( feature_id, label ) in zip( topology.feature_ids, topology.components().tolist() ):
+            components.setdefault( label, [] ).append( feature_id )
+
+        if len( components ) < 2 or partitions < 2:
+            return [ snapshot ]
+
+        # Assign the largest components first, each one to the partition with the fewest features so far.
+        loads = [ 0 ] * min( partitions, len( components ) )
+        partition_of_feature = {}
+
+        for feature_ids in sorted( components.values(), key = len, reverse = True ):
+            partition = loads.index( min( loads ) )
+            loads[ partition ] += len( feature_ids )
+            partition_of_feature.update( ( feature_id, partition ) for feature_id in feature_ids )
+
+        # Features without feature graphs are not connected to any other feature.
+        partition_feature_ids = OrderedDict( ( partition, [] ) for partition in range( len( loads ) ) )
+        for feature_id in snapshot.feature_ids:
+            partition_feature_ids[ partition_of_feature.get( feature_id, 0 ) ].append( feature_id )
+
+        split = snapshot.split( partition_feature_ids, by_network = False )
+
+        for partition in split.values():
+            partition.network_id = snapshot.network_id
+            if snapshot.boundary_feature_ids:
+                feature_ids = set( partition.feature_ids )
+                partition.boundary_feature_ids = [ id for id in snapshot.boundary_feature_ids if id in feature_ids ]
+
+        return list( split.values() )
+
+
+    def merge_nets( self, nets ):
+        """
+        Merge simulation models of disjoint parts of a network into one simulation model (see function 'get_net_from_snapshot'). Override this function for readers supporting parallel model assembly.
+
+        :param nets: simulation models (list)
+        :return: merged simulation model
+        """
+        raise RuntimeError( 'merging simulation models is not supported by this reader' )
+
+
+    def net_elements( self, net ):
+        """
+        List the elements of a simulation model by their names, e.g., for comparing models independent of the order of their elements. By default, the names of the elements in all data frames of the model are listed.
+
+        :param net: simulation model
+        :return: sorted names of the elements of each type (dict of lists)
+        """
+        tables = net.items() if isinstance( net, dict ) else vars( net ).items()
+
+        return {
+            name: sorted( str( n ) for n in table[ 'name' ] )
+            for ( name, table ) in tables
+            if isinstance( table, pandas.DataFrame ) and 'name' in table and not name.startswith( '_' )
+            }
+
+
+    def get_subnet( self, network_id, bounds = None, bounds_srid = None, roots = None, hops = None, levels = None ):
+        """
+        Retrieve the simulation model for a part of a network (see function 'load_subnet_snapshot').
+
+        :param network_id: ID of the network (int)
+        :param bounds: only include features intersecting this polygon (list of Point2D or Point2DArray, optional)
+        :param bounds_srid: spatial reference ID of the polygon, the reference system of the features is used if None (int, optional, default=None)
+        :param roots: only include features within a number of hops from these features (list of int, optional)
+        :param hops: maximal number of hops from the root features, each following one link between features (int, optional, default=None)
+        :param levels: only include features of these voltage or pressure levels (list, optional)
+        :return: simulation model
+        """
+        snapshot = self.load_subnet_snapshot( network_id, bounds, bounds_srid, roots, hops, levels )
+
+        return self.get_net_from_snapshot( snapshot )
+
+
+    @instrumented
+    def load_subnet_snapshot( self, network_id, bounds = None, bounds_srid = None, roots = None, hops = None, levels = None ):
+        """
+        Retrieve all data required for constructing the simulation model for a part of a network. The features are selected in the database, i.e., only the data of the selected features (and their direct neighbours) is retrieved:
+         - bounds: features intersecting a polygon (PostGIS spatial predicate)
+         - roots and hops: features within a number of hops from root features (recursive walk along the links of the network graph)
+         - levels: features of the given voltage or pressure levels (see function '_level_condition')
+
+        If several criteria are given, features must meet all of them. The selection is then made self-consistent: connecting features (e.g., lines) are included if all features they are connected to are part of the selection or are direct neighbours of it, and node features (e.g., busses) are included if they are selected or connected to an included connecting feature. Node features that have lost connections are boundary features (see function '_add_boundary_elements').
+
+        Note that snapshots of sub-networks cannot be refreshed (see function 'refresh_snapshot').
+
+        :param network_id: ID of the network (int)
+        :param bounds: only include features intersecting this polygon (list of Point2D or Point2DArray, optional)
+        :param bounds_srid: spatial reference ID of the polygon, the reference system of the features is used if None (int, optional, default=None)
+        :param roots: only include features within a number of hops from these features (list of int, optional)
+        :param hops: maximal number of hops from the root features, each following one link between features (int, optional, default=None)
+        :param levels: only include features of these voltage or pressure levels (list, optional)
+        :return: snapshot of the retrieved data (NetworkSnapshot)
+        """
+        self._check_database()
+
+        if bounds is None and roots is None and levels is None:
+            raise RuntimeError( 'at least one of the parameters \'bounds\', \'roots\' or \'levels\' must be specified' )
+
+        if ( roots is None ) != ( hops is None ):
+            raise RuntimeError( 'parameters \'roots\' and \'hops\' must be specified together' )
+
+        # Map structure from database to classes.
+        self._map_classes()
+
+        ( class_names, conditions, result_index, columns, _ ) = self._feature_ids_query( network_id )
+
+        class_names = list( class_names )
+        conditions = list( conditions )
+
+        if bounds is not None:
+            self.NetworkFeature = self.map_citydb_object_class(
+                'NetworkFeature',
+                table_name = 'utn9_network_feature',
+                schema = 'citydb'
+                )
+
+            polygon = geom_from_2dpolygon( bounds, bounds_srid )
+            if bounds_srid is None:
+                polygon = func.ST_SetSRID( polygon, func.ST_SRID( self.NetworkFeature.geom ) )
+
+            class_names.append( 'NetworkFeature' )
+            conditions += [
+                self.NetworkFeature.id == self.NetworkToFeature.network_feature_id,
+                geom_intersects( self.NetworkFeature.geom, polygon )
+                ]
+
+        if roots is not None:
+            conditions.append( self.in_network( self.NetworkToFeature.network_feature_id, self._walk( network_id, roots, hops ) ) )
+
+        if levels is not None:
+            conditions.append( self._level_condition( list( levels ) ) )
+
+        selected_ids = [
+            f.network_feature_id for f in self.join_citydb_objects( class_names, conditions, result_index, columns )
+            ]
+
+        # Retrieve the selected features and their direct neighbours.
+        feature_ids = self._walk( network_id, selected_ids, 1 )
+
+        snapshot = NetworkSnapshot.from_rows( network_id, self._retrieve_tables( network_id, feature_ids ), feature_ids )
+
+        ( subnet_ids, boundary_ids ) = self._select_subnet( snapshot, selected_ids )
+
+        subnet = snapshot.split( OrderedDict( [ ( network_id, subnet_ids ) ] ) )[ network_id ]
+        subnet.version = None
+        subnet.boundary_feature_ids = boundary_ids
+
+        return subnet
+
+
+    def _walk( self, network_id, roots, hops ):
+        """
+        Retrieve the IDs of all features of a network within a maximal number of hops from a set of root features (see NETWORK_WALK_QUERY).
+
+        :param network_id: ID of the network (int)
+        :param roots: IDs of the root features (list of int)
+        :param hops: maximal number of hops (int)
+        :return: IDs of the features (list of int)
+        """
+        # Start new session if necessary.
+        if self.current_session is None: self.start_citydb_session()
+
+        return sorted(
+            row[0] for row in self.current_session.execute(
+                NETWORK_WALK_QUERY, dict( network_id = network_id, roots = list( roots ), hops = hops )
+                )
+            )
+
+
+    def _select_subnet( self, snapshot, selected_ids ):
+        """
+        Make a selection of network features self-consistent (see function 'load_subnet_snapshot').
+
+        :param snapshot: snapshot of the data retrieved for the selected features and their direct neighbours (NetworkSnapshot)
+        :param selected_ids: IDs of the selected features (list of int)
+        :return: IDs of the features of the sub-network and IDs of its boundary features (tuple of lists of int)
+        """
+        node_feature_ids = set(
+            id for name in self.node_tables if name in snapshot.tables for id in snapshot.tables[ name ][ 'id' ]
+            )
+
+        graph_features = dict( zip( snapshot.tables[ 'feature_graphs' ][ 'id' ], snapshot.tables[ 'feature_graphs' ][ 'ntw_feature_id' ] ) )
+        node_features = dict( zip(
+            snapshot.tables[ 'nodes' ][ 'id' ],
+            [ graph_features.get( id ) for id in snapshot.tables[ 'nodes' ][ 'feat_graph_id' ] ]
+            ) )
+
+        # Connected features of each feature (None for features that have not been retrieved).
+        neighbours = {}
+        links = snapshot.tables[ 'inter_feature_links' ]
+
+        for ( start_node_id, end_node_id ) in zip( links[ 'start_node_id' ], links[ 'end_node_id' ] ):
+            ( start, end ) = ( node_features.get( start_node_id ), node_features.get( end_node_id ) )
+            if start == end: continue
+
+            if start is not None: neighbours.setdefault( start, [] ).append( end )
+            if end is not None: neighbours.setdefault( end, [] ).append( start )
+
+        # Connecting features must be complete, node features must be selected or connected.
+        subnet_ids = set(
+            id for id in snapshot.feature_ids
+            if id not in node_feature_ids and all( n is not None for n in neighbours.get( id, [] ) )
+            )
+        subnet_ids.update( n for id in list( subnet_ids ) for n in neighbours.get( id, [] ) if n in node_feature_ids )
+        subnet_ids.update( id for id in selected_ids if id in node_feature_ids )
+
+        boundary_ids = [
+            id for id in snapshot.feature_ids
+            if id in node_feature_ids and id in subnet_ids and any( n not in subnet_ids for n in neighbours.get( id, [] ) )
+            ]
+
+        return ( [ id for id in snapshot.feature_ids if id in subnet_ids ], boundary_ids )
+
+
+    def _level_condition( self, levels ):
+        """
+        After mapping the classes, define a condition selecting network features by voltage or pressure level (see function 'load_subnet_snapshot'). The condition refers to column 'network_feature_id' of class 'NetworkToFeature'. Override this function for readers supporting levels.
+
+        :param levels: voltage or pressure levels (list)
+        :return: condition (sqlalchemy.sql.elements.ColumnElement)
+        """
+        raise RuntimeError( 'selecting network features by level is not supported by this reader' )
+
+
+    def _add_boundary_elements( self, net, feature_ids ):
+        """
+        Add elements representing the rest of the network at the boundary features of a sub-network (e.g., external grids). Override this function for readers supporting boundary elements.
+
+        :param net: simulation model
+        :param feature_ids: IDs of the boundary features (list of int)
+        :return: None
+        """
+        warnings.warn(
+            'sub-network has {} boundary features, but no boundary elements are supported by this reader'.format( len( feature_ids ) ),
+            RuntimeWarning
+            )
+
+
+    def _feature_ids_query( self, network_id ):
+        """
+        After mapping the classes, define the query for retrieving the IDs of all features of a network (or of several networks).
+
+        :param network_id: ID of the network, or IDs of several networks (int or list of int)
+        :return: query (JoinQuery)
+        """
+        return JoinQuery(
+            class_names = [ 'NetworkToFeature' ],
+            conditions = [ self.network_condition( self.NetworkToFeature.network_id, network_id ) ],
+            result_index = 0,
+            columns = [ 'network_id', 'network_feature_id' ]
+            )
+
+
+    def _data_queries( self, network_id, feature_ids ):
+        """
+        After mapping the classes, define all queries for retrieving the relevant data. The queries are independent of each other, i.e., they can be issued in any order or concurrently.
+
+        :param network_id: ID of the network (int)
+        :param feature_ids: IDs of all features of the network (list of int)
+        :return: queries with their names (OrderedDict of JoinQuery)
+        """
+        queries = OrderedDict()
+        queries.update( self._network_feature_queries( network_id, feature_ids ) )
+        queries.update( self._feature_graph_queries( network_id, feature_ids ) )
+        queries.update( self._generic_attribute_queries( network_id, feature_ids ) )
+
+        return queries
+
+
+    def network_condition( self, column, network_id ):
+        """
+        Define a condition restricting a column to the ID of a network, or to the IDs of several networks.
+
+        :param column: column containing IDs of networks (sqlalchemy.orm.attributes.InstrumentedAttribute)
+        :param network_id: ID of the network, or IDs of several networks (int or list of int)
+        :return: condition (sqlalchemy.sql.elements.BinaryExpression)
+        """
+        if isinstance( network_id, ( list, tuple ) ):
+            return column.in_( network_id )
+
+        return column == network_id
+
+
+    def in_network( self, column, feature_ids ):
+        """
+        Define a condition restricting a column to the IDs of the network features. The IDs are sent as a single array parameter, i.e., the network is not joined again for each query.
+
+        :param column: column containing IDs of network features (sqlalchemy.orm.attributes.InstrumentedAttribute)
+        :param feature_ids: IDs of all features of the network (list of int)
+        :return: condition (sqlalchemy.sql.elements.BinaryExpression)
+        """
+        return column == any_( literal( list( feature_ids ), type_ = ARRAY( Integer ) ) )
+
+
+    def _query_column_names( self, query ):
+        """
+        Retrieve the names of the columns returned by a query.
+
+        :param query: query (JoinQuery)
+        :return: column names (list of string)
+        """
+        return [ c[ 'name' ] for c in self._join_citydb_objects_query( *query ).column_descriptions ]
+
+
+    def _store_data( self, snapshot ):
+        """
+        Store the tables of a snapshot as attributes with the same names.
+
+        :param snapshot: snapshot of the data retrieved for the network (NetworkSnapshot)
+        """
+        data = OrderedDict( ( name, snapshot.rows( name ) ) for name in snapshot.names )
+
+        for ( name, results ) in data.items():
+            setattr( self, name, results )
+
+        # Index the topology of the network once for all types of network features.
+        self.topology = TopologyIndex( self.feature_graphs, self.nodes, self.inter_feature_links )
+
+        self._store_generic_attributes( data )
+
+
+    def _store_generic_attributes( self, data ):
+        """
+        Store the data retrieved with the queries for generic attributes.
+        """
+        pass
+
+
+    def _generic_attribute_values( self, attributes, attribute_name ):
+        """
+        Retrieve the values of one generic attribute from the results of function 'pivot_generic_attributes'.
+
+        :param attributes: results of function 'pivot_generic_attributes' (list of named tuples)
+        :param attribute_name: name of the generic attribute (string)
+        :return: attribute values of all city objects having the attribute, with the city object IDs as keys (dict)
+        """
+        values = {}
+
+        for attr in attributes:
+            value = getattr( attr, attribute_name )
+            if value is not None:
+                values[ attr.cityobject_id ] = value
+
+        return values
+
+
+    def point2d_columns( self, geom, name = 'geom' ):
+        """
+        Define columns for retrieving the coordinates of a point geometry together with the other columns of a query, instead of converting the geometry with an extra round trip per feature.
+
+        :param geom: geometry column of a mapped class (sqlalchemy.orm.attributes.InstrumentedAttribute)
+        :param name: prefix of the column labels (string, optional, default='geom')
+        :return: columns labeled '<name>_x' and '<name>_y', no columns if geodata are not retrieved with the other data (list of sqlalchemy.sql.elements.Label)
+        """
+        if self.with_geodata is not True:
+            return []
+
+        return [ geom_x( geom ).label( name + '_x' ), geom_y( geom ).label( name + '_y' ) ]
+
+
+    def list_point2d_columns( self, geom, name = 'geom' ):
+        """
+        Define columns for retrieving the well-known binary representation of a line geometry together with the other columns of a query, instead of converting the geometry with an extra round trip per feature.
+
+        :param geom: geometry column of a mapped class (sqlalchemy.orm.attributes.InstrumentedAttribute)
+        :param name: prefix of the column labels (string, optional, default='geom')
+        :return: column labeled '<name>_wkb', no columns if geodata are not retrieved with the other data (list of sqlalchemy.sql.elements.Label)
+        """
+        if self.with_geodata is not True:
+            return []
+
+        return [ geom_as_binary( geom ).label( name + '_wkb' ) ]
+
+
+    def length_columns( self, geom, name = 'length' ):
+        """
+        Define a column for retrieving the length of a line geometry together with the other columns of a query. If attribute 'length_srid' is set, the geometry is transformed to this spatial reference system first.
+
+        :param geom: geometry column of a mapped class (sqlalchemy.orm.attributes.InstrumentedAttribute)
+        :param name: label of the column (string, optional, default='length')
+        :return: column labeled '<name>' (list of sqlalchemy.sql.elements.Label)
+        """
+        if self.length_srid is not None:
+            geom = transform_geom( geom, self.length_srid )
+
+        return [ length_from_geom( geom ).label( name ) ]
+
+
+    def row_to_point2d( self, row, name = 'geom' ):
+        """
+        Retrieve a point from a query result containing the columns defined by function 'point2d_columns'. Depending on the mode for retrieving geodata, a placeholder or None is returned instead (see parameter 'with_geodata' of the constructor).
+
+        :return: point (Point2D, LazyPoint2D or None)
+        """
+        if self.with_geodata is False:
+            return None
+
+        if self.with_geodata == 'lazy' and not hasattr( row, name + '_x' ):
+            return self.geodata_loader.point2d( row.id )
+
+        return Point2D( getattr( row, name + '_x' ), getattr( row, name + '_y' ) )
+
+
+    def row_to_list_point2d( self, row, name = 'geom' ):
+        """
+        Retrieve a list of points from a query result containing the columns defined by function 'list_point2d_columns'. Depending on the mode for retrieving geodata, a placeholder or None is returned instead (see parameter 'with_geodata' of the constructor).
+
+        :return: points (Point2DArray, LazyListPoint2D or None)
+        """
+        if self.with_geodata is False:
+            return None
+
+        if hasattr( row, name + '_wkt' ):
+            # Snapshots stored by previous versions contain the well-known text representation.
+            return Point2DArray( [ c[ :2 ] for c in from_wkt( getattr( row, name + '_wkt' ) ).coords ] )
+
+        if self.with_geodata == 'lazy' and not hasattr( row, name + '_wkb' ):
+            return self.geodata_loader.list_point2d( row.id )
+
+        return Point2DArray.from_wkb( getattr( row, name + '_wkb' ) )
+
+
+    def rows_to_list_point2d( self, rows, name = 'geom' ):
+        """
+        Retrieve the lists of points of several query results (see function 'row_to_list_point2d'). The points of all results are decoded in one go and stored in a single array, the points of each result are a view on this array.
+
+        :return: points of each result (list of Point2DArray, LazyListPoint2D or None)
+        """
+        if self.with_geodata is not False and len( rows ) > 0 and hasattr( rows[0], name + '_wkb' ):
+            return Point2DArray.from_wkb_list( [ getattr( row, name + '_wkb' ) for row in rows ] )
+
+        return [ self.row_to_list_point2d( row, name ) for row in rows ]
 
 
     def geom_to_point2d( self, geom ):
-        geom_wkt = self.execute_function( geom_as_text( geom ) )
-        ( x, y,z ) = from_wkt( geom_wkt ).coords[0]
-        return Point2D( x, y )
+        geom_wkb = self.execute_function( geom_as_binary( geom ) )
+        return Point2DArray.from_wkb( geom_wkb )[0]
 
 
     def geom_to_list_point2d( self, geom ):
-        geom_wkt = self.execute_function( geom_as_text( geom ) )
-        coords = from_wkt( geom_wkt ).coords
-        return [ Point2D( c[0], c[1] ) for c in coords ]
+        geom_wkb = self.execute_function( geom_as_binary( geom ) )
+        return Point2DArray.from_wkb( geom_wkb )
 
 
-    def _retrieve_feature_data( self, features, feature_graphs, nodes ):
+    def _add_each( self, add, net, elements ):
+        """
+        Add elements to the simulation model one by one.
+
+        :param add: function adding one element to the simulation model (e.g., 'add_bus')
+        :param net: simulation model
+        :param elements: parameters of the function for each element (list of dict)
+        """
+        for element in elements:
+            add( net = net, **element )
+
+
+    def _retrieve_feature_data( self, features ):
+        """
+        Retrieve IDs and names of network features, together with their feature graphs and nodes (using the topology index).
+
+        :param features: network features (list of results with attributes 'id' and 'name')
+        :return: dicts mapping IDs of network features to names, IDs of feature graphs to IDs of network features and IDs of nodes to IDs of network features (tuple of dict)
+        """
 
         # Create dict of IDs and names for these network features.
         ids = { f.id: f.name for f in features }
 
-        # Create dict of IDs of network features and associated feature graphs.
+        # Create dict of IDs of feature graphs and associated network features.
         feature_graph_ids = {
-            fg.id: fg.ntw_feature_id
-            for fg in feature_graphs if fg.ntw_feature_id in ids
+            fg_id: f_id for f_id in ids for fg_id in self.topology.feature_graphs( f_id )
             }
 
-        # Create dict of IDs of feature graph nodes and feature graphs associated with these netwrok features.
+        # Create dict of IDs of feature graph nodes and associated network features.
         node_ids = {
-            n.id : feature_graph_ids[n.feat_graph_id]
-            for n in nodes if n.feat_graph_id in feature_graph_ids
+            n_id: f_id for f_id in ids for n_id in self.topology.nodes( f_id )
             }
 
         return ( ids, feature_graph_ids, node_ids )
 
 
-    def _retrieve_connections( self, node_ids, edge_ids, links ):
-
-        node_to_edge_connections = [
-            ( edge_ids[l.end_node_id], node_ids[l.start_node_id] )
-            for l in links if l.start_node_id in node_ids and l.end_node_id in edge_ids
-            ]
+    def _retrieve_connections( self, node_ids, edge_ids ):
+        """
+        Retrieve the network features connected to network features of another type (e.g., the busses connected to lines).
 
-        edge_to_node_connections = [
-            ( edge_ids[l.start_node_id], node_ids[l.end_node_id] )
-            for l in links if l.start_node_id in edge_ids and l.end_node_id in node_ids
-            ]
+        :param node_ids: dict mapping IDs of nodes to IDs of the network features to be connected (dict)
+        :param edge_ids: dict mapping IDs of nodes to IDs of the network features for which the connections are retrieved (dict)
+        :return: dict mapping IDs of network features to lists of IDs of connected network features (dict)
+        """
+        node_features = set( node_ids.values() )
 
         connections = {}
 
-        for conn in ( node_to_edge_connections + edge_to_node_connections ):
-            edge_id = conn[0]
-            node_id = conn[1]
-            if not edge_id in connections:
-                connections[edge_id] = [ node_id ]
-            else:
-                connections[edge_id].append( node_id )
+        for edge_id in dict.fromkeys( edge_ids.values() ):
+            connected = self.topology.connected_features( edge_id, node_features )
+            if len( connected ) > 0:
+                connections[edge_id] = connected
 
         return connections
 
 
-    def _retrieve_unique_connections( self, node_ids, edge_ids, links ):
-
-        node_to_edge_connections = [
-            ( edge_ids[l.end_node_id], node_ids[l.start_node_id] )
-            for l in links if l.start_node_id in node_ids and l.end_node_id in edge_ids
-            ]
-
-        edge_to_node_connections = [
-            ( edge_ids[l.start_node_id], node_ids[l.end_node_id] )
-            for l in links if l.start_node_id in edge_ids and l.end_node_id in node_ids
-            ]
+    def _retrieve_unique_connections( self, node_ids, edge_ids ):
+        """
+        Retrieve the network feature connected to network features of another type (e.g., the bus connected to a load).
 
+        :param node_ids: dict mapping IDs of nodes to IDs of the network features to be connected (dict)
+        :param edge_ids: dict mapping IDs of nodes to IDs of the network features for which the connections are retrieved (dict)
+        :return: dict mapping IDs of network features to the ID of the connected network feature (dict)
+        """
         connections = {}
 
-        for conn in ( node_to_edge_connections + edge_to_node_connections ):
-            edge_id = conn[0]
-            node_id = conn[1]
-            if not edge_id in connections:
-                connections[edge_id] = node_id
-            else:
+        for ( edge_id, connected ) in self._retrieve_connections( node_ids, edge_ids ).items():
+            if len( connected ) > 1:
                 raise RuntimeError(
-                    'network feature with ID {} is connected to more than 1 other network feature'.format( ext_grid_id )
+                    'network feature with ID {} is connected to more than 1 other network feature'.format( edge_id )
                     )
 
+            connections[edge_id] = connected[0]
+
         return connections
-        
-        
-    def _retrieve_connections_with_link_control( self, node_ids, edge_ids, links ):
 
-        node_to_edge_connections = [
-            ( edge_ids[l.end_node_id], node_ids[l.start_node_id], l.link_control )
-            for l in links if l.start_node_id in node_ids and l.end_node_id in edge_ids
-            ]
 
-        edge_to_node_connections = [
-            ( edge_ids[l.start_node_id], node_ids[l.end_node_id], l.link_control )
-            for l in links if l.start_node_id in edge_ids and l.end_node_id in node_ids
-            ]
+    def _retrieve_connections_with_link_control( self, node_ids, edge_ids ):
+        """
+        Retrieve the network features connected to network features of another type, together with the link control of the connecting links (e.g., the nodes connected to pipes).
+
+        :param node_ids: dict mapping IDs of nodes to IDs of the network features to be connected (dict)
+        :param edge_ids: dict mapping IDs of nodes to IDs of the network features for which the connections are retrieved (dict)
+        :return: dict mapping IDs of network features to lists of tuples of connected network feature ID and link control (dict)
+        """
+        node_features = set( node_ids.values() )
 
         connections = {}
 
-        for conn in ( node_to_edge_connections + edge_to_node_connections ):
-            edge_id = conn[0]
-            node_id = conn[1]
-            link_control = conn[2]
-            if not edge_id in connections:
-                connections[edge_id] = [ ( node_id, link_control ) ]
-            else:
-                connections[edge_id].append( ( node_id, link_control ) )
+        for edge_id in dict.fromkeys( edge_ids.values() ):
+            connected = self.topology.connected_features( edge_id, node_features, link_control = True )
+            if len( connected ) > 0:
+                connections[edge_id] = connected
 
         return connections
+
+
+def _get_net_from_snapshot( reader_class, settings, snapshot ):
+    """
+    Construct a simulation model from a snapshot in a worker process (see functions 'SimModelDBReaderBase.get_nets' and 'SimModelDBReaderBase.get_net_from_snapshot'). The reader is constructed without access to the database.
+
+    :param reader_class: class of the simulation model reader (type)
+    :param settings: constructor arguments of the reader, except the connection parameters (dict)
+    :param snapshot: snapshot of the data retrieved for the network (NetworkSnapshot)
+    :return: simulation model
+    """
+    reader = reader_class( None, **settings )
+
+    return reader.get_net_from_snapshot( snapshot )
@@ -0,0 +1,193 @@
+import datetime
+import json
+import os
+
+import pyarrow
+import pyarrow.ipc
+import pyarrow.parquet
+
+from collections import OrderedDict
+
+from .network_snapshot import NetworkSnapshot, SnapshotVersion
+
+
+class SnapshotFile:
+    """
+    Columnar files containing a network snapshot, for constructing simulation models without access to the database (requires the optional dependencies 'dblayer[arrow]').
+
+    A snapshot is stored in a directory: each table of the snapshot is stored as a separate table with native column types, either in the Apache Arrow IPC file format ('<table name>.arrow') or in the Apache Parquet format ('<table name>.parquet'). The IDs of the network features, the version of the database content, the IDs of the boundary features and the names of the tables are stored in file 'snapshot.json'. Table files are memory-mapped when reading, i.e., the same snapshot can be read by many simulation jobs at little cost.
+
+    Simulation model readers accept a snapshot file instead of the connection parameters for the database. Such readers construct the simulation model of the network stored in the file (see function 'SimModelDBReaderBase.load_snapshot').
+    """
+
+    # Version of the file format.
+    version = 2
+
+    # Supported formats of the table files.
+    formats = [ 'arrow', 'parquet' ]
+
+    # Name of the file describing the content of the snapshot.
+    metadata_file_name = 'snapshot.json'
+
+
+    def __init__( self, file_name ):
+        """
+        Constructor.
+
+        :param file_name: name of the directory containing the snapshot (string)
+        """
+        self.file_name = str( file_name )
+
+
+    @classmethod
+    def write( cls, snapshot, file_name, format = 'arrow' ):
+        """
+        Store a snapshot to a directory, which is created if necessary.
+
+        :param snapshot: snapshot of the data retrieved for a network (NetworkSnapshot)
+        :param file_name: name of the directory for storing the snapshot (string)
+        :param format: format of the table files, either 'arrow' or 'parquet' (string, optional, default='arrow')
+        :return: snapshot file (SnapshotFile)
+        """
+        if format not in SnapshotFile.formats:
+            raise ValueError( 'parameter \'format\' must be one of {}'.format( SnapshotFile.formats ) )
+
+        snapshot_file = cls( file_name )
+
+        # Convert all tables before writing any file.
+        tables = OrderedDict(
+            ( name, snapshot_file._to_arrow( name, table ) ) for ( name, table ) in snapshot.tables.items()
+            )
+
+        os.makedirs( snapshot_file.file_name, exist_ok = True )
+
+        for ( name, table ) in tables.items():
+            table_file_name = snapshot_file._table_file_name( name, format )
+
+            if format == 'parquet':
+                pyarrow.parquet.write_table( table, table_file_name )
+            else:
+                with pyarrow.OSFile( table_file_name, 'wb' ) as sink:
+                    with pyarrow.ipc.new_file( sink, table.schema ) as writer:
+                        writer.write_table( table )
+
+        version = None if snapshot.version is None else [
+            snapshot.version.timestamp.isoformat(), snapshot.version.max_object_id, snapshot.version.max_attribute_id
+            ]
+
+        metadata = dict(
+            format_version = SnapshotFile.version,
+            format = format,
+            network_id = snapshot.network_id,
+            feature_ids = snapshot.feature_ids,
+            version = version,
+            boundary_feature_ids = snapshot.boundary_feature_ids,
+            tables = list( tables.keys() )
+            )
+
+        with open( os.path.join( snapshot_file.file_name, SnapshotFile.metadata_file_name ), 'w' ) as f:
+            json.dump( metadata, f )
+
+        return snapshot_file
+
+
+    def read_table( self, name ):
+        """
+        Load a table of the snapshot stored in the file. The table is memory-mapped, i.e., its columns are not copied.
+
+        :param name: name of the table (string)
+        :return: table (pyarrow.Table)
+        """
+        return self._read_table( name, self._read_metadata() )
+
+
+    def read_snapshot( self ):
+        """
+        Load the snapshot stored in the file.
+
+        :return: snapshot (NetworkSnapshot)
+        """
+        metadata = self._read_metadata()
+
+        tables = OrderedDict()
+
+        for name in metadata[ 'tables' ]:
+            table = self._read_table( name, metadata )
+
+            # Convert each column at once (snapshots store the columns as lists).
+            tables[ name ] = OrderedDict(
+                ( column, table.column( column ).to_pylist() ) for column in table.column_names
+                )
+
+        version = metadata[ 'version' ]
+        if version is not None:
+            version = SnapshotVersion( datetime.datetime.fromisoformat( version[0] ), version[1], version[2] )
+
+        return NetworkSnapshot(
+            metadata[ 'network_id' ], tables, metadata[ 'feature_ids' ], version, metadata[ 'boundary_feature_ids' ]
+            )
+
+
+    def _read_table( self, name, metadata ):
+        """
+        Load a table of the snapshot stored in the file (see function 'read_table').
+        """
+        if name not in metadata[ 'tables' ]:
+            raise RuntimeError( 'snapshot file \'{}\' does not contain table \'{}\''.format( self.file_name, name ) )
+
+        table_file_name = self._table_file_name( name, metadata[ 'format' ] )
+
+        if metadata[ 'format' ] == 'parquet':
+            return pyarrow.parquet.read_table( table_file_name, memory_map = True )
+
+        with pyarrow.memory_map( table_file_name, 'r' ) as source:
+            return pyarrow.ipc.open_file( source ).read_all()
+
+
+    def _to_arrow( self, name, table ):
+        """
+        Convert a table of a snapshot to an Arrow table, the column types are inferred from the values.
+
+        :param name: name of the table (string)
+        :param table: column names mapped to lists of values (OrderedDict)
+        :return: table (pyarrow.Table)
+        """
+        arrays = []
+
+        for ( column, values ) in table.items():
+            try:
+                arrays.append( pyarrow.array( values ) )
+            except ( pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, pyarrow.ArrowNotImplementedError ) as e:
+                raise TypeError( 'column \'{}\' of table \'{}\' cannot be stored in a snapshot file: {}'.format(
+                    column, name, e ) )
+
+        return pyarrow.Table.from_arrays( arrays, names = list( table.keys() ) )
+
+
+    def _table_file_name( self, name, format ):
+        """
+        Retrieve the name of the file storing a table of the snapshot.
+        """
+        return os.path.join( self.file_name, '{}.{}'.format( name, format ) )
+
+
+    def _read_metadata( self ):
+        """
+        Load the description of the content of the snapshot.
+        """
+        metadata_file_name = os.path.join( self.file_name, SnapshotFile.metadata_file_name )
+
+        if not os.path.isfile( metadata_file_name ):
+            raise RuntimeError( '\'{}\' does not contain a network snapshot'.format( self.file_name ) )
+
+        with open( metadata_file_name ) as f:
+            metadata = json.load( f )
+
+        if metadata[ 'format_version' ] != SnapshotFile.version:
+            raise RuntimeError( 'unsupported version of snapshot file \'{}\''.format( self.file_name ) )
+
+        return metadata
+
+
+    def __repr__( self ):
+        return 'SnapshotFile( \'{}\' )'.format( self.file_name )
@@ -9,15 +9,21 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
     Base class for constructing a simulation model for a thermal network from information contained in the 3DCityDB.
     """
 
-    def __init__( self, connect, verbose=False ):
+    # Sources, sinks and junctions are the node features of thermal networks.
+    node_tables = [ 'sources', 'sinks', 'junctions' ]
+
+    def __init__( self, connect, verbose=False, length_srid = None, model_cache = None, with_geodata = True ):
         """
         Constructor.
 
-        :param connect: tuple containing connection parameters for database (PostgreSQLConnectionInfo)
+        :param connect: tuple containing connection parameters for database (PostgreSQLConnectionInfo), snapshot file (SnapshotFile) or None (see class 'SimModelDBReaderBase')
         :param verbose: turn verbosity on/off (bool, optional, default=False)
+        :param length_srid: ID of a metric spatial reference system, pipe geometries are transformed to it before computing their lengths (int, optional, default=None)
+        :param model_cache: on-disk cache for the simulation models retrieved with function 'get_net' (ModelCache, optional, default=None)
+        :param with_geodata: retrieve geodata (True), do not retrieve geodata (False) or retrieve geodata on first access ('lazy') (bool or string, optional, default=True)
         """
 
-        super().__init__( connect )
+        super().__init__( connect, length_srid, model_cache, with_geodata )
         self.verbose = verbose
 
 
@@ -30,7 +36,7 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
 
         :param net: simulation model
         :param name: name of the thermal source (string)
-        :param deodata: position of thermal sink (dblayer.func.func_postgis_geom.Point2D)
+        :param deodata: position of thermal sink (dblayer.func.func_postgis_geom.Point2D, or None if geodata are not retrieved)
 
         :return: None
         """
@@ -47,7 +53,7 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
         :param net: simulation model
         :param name: name of the electrical bus (string)
         :param heat_diss_kw: total heat dissipation in kW (float)
-        :param deodata: position of thermal sink (dblayer.func.func_postgis_geom.Point2D)
+        :param deodata: position of thermal sink (dblayer.func.func_postgis_geom.Point2D, or None if geodata are not retrieved)
 
         :return: None
         """
@@ -63,7 +69,7 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
 
         :param net: simulation model
         :param name: name of the junction (string)
-        :param deodata: position of the junction (dblayer.func.func_postgis_geom.Point2D)
+        :param deodata: position of the junction (dblayer.func.func_postgis_geom.Point2D, or None if geodata are not retrieved)
 
         :return: None
         """
@@ -82,16 +88,77 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
         :param from_node_id: ID of connected thermal node (int)
         :param to_node_id: ID of connected thermal node (int)
         :param length_km: length of the pipe in km (float)
-        :param geodata: position of the pipe (list of dblayer.func.func_postgis_geom.Point2D)
+        :param geodata: position of the pipe (dblayer.func.func_postgis_geom.Point2DArray, or None if geodata are not retrieved)
 
         :return: None
         """
         pass
 
 
-    def get_net( self, network_id ):
+    def add_thermal_sources( self, net, thermal_sources ):
+        """
+        Add several thermal sources to the simulation model. By default, function 'add_thermal_source' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param thermal_sources: parameters of function 'add_thermal_source' for each element, i.e., name and geodata (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_thermal_source, net, thermal_sources )
+
+
+    def add_sinks( self, net, sinks ):
+        """
+        Add several thermal sinks to the simulation model. By default, function 'add_sink' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param sinks: parameters of function 'add_sink' for each element, i.e., name, heat_diss_kw and geodata (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_sink, net, sinks )
+
+
+    def add_junctions( self, net, junctions ):
+        """
+        Add several junctions to the simulation model. By default, function 'add_junction' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param junctions: parameters of function 'add_junction' for each element, i.e., name and geodata (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_junction, net, junctions )
+
+
+    def add_pipes( self, net, pipes ):
+        """
+        Add several pipes to the simulation model. By default, function 'add_pipe' is called for each element. Override this function for adding all elements in one go.
+
+        :param net: simulation model
+        :param pipes: parameters of function 'add_pipe' for each element, i.e., name, from_node_id, to_node_id, length_km and geodata (list of dict)
+
+        :return: None
+        """
+        self._add_each( self.add_pipe, net, pipes )
+
+
+    def get_net( self, network_id, with_geodata = None ):
         """
         Retrieve the electrical network as pandapower model.
+
+        :param network_id: ID of the network (int)
+        :param with_geodata: retrieve geodata (True), do not retrieve geodata (False) or retrieve geodata on first access ('lazy'), the mode of the reader is used if None (bool or string, optional, default=None)
+        :return: simulation model
+        """
+
+        # Retrieve relevant data (or the cached model).
+        return self._get_net( network_id, with_geodata )
+
+
+    def _create_net( self ):
+        """
+        Create the simulation model from the retrieved data.
         """
 
         # Initialize dict: network feature ID --> network feature name
@@ -100,14 +167,6 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
         # Initialize dict: feature graph node ID --> feature graph ID
         self.feature_graph_ids = {}
 
-        # Map structure from database to classes.
-        self._map_classes()
-
-        # Retrieve relevant data.
-        self._retrieve_data_network_features( network_id )
-        self._retrieve_data_feature_graphs( network_id )
-        self._retrieve_data_generic_attributes( network_id )
-
         # Create empty network model.
         net = self.create_empty_network()
 
@@ -125,6 +184,9 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
         Map relevant structures from database to classes.
         """
 
+        # Reflect all required tables and views in one go.
+        self.reflect_tables( SimModelDBReaderBase.reflected_tables )
+
         self.RoundPipe = self.map_citydb_object_class(
             'RoundPipe',
             table_name='utn9_ntw_feat_distrib_elem_pipe_round',
@@ -185,100 +247,107 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
             )
 
 
-    def _retrieve_data_network_features( self, network_id ):
+    def _network_feature_queries( self, network_id, feature_ids ):
         """
-        After mapping the classes, retrieve all relevant data associated to network features.
+        After mapping the classes, define the queries for retrieving all relevant data associated to network features.
         """
+        queries = OrderedDict()
 
-        self.sources = self.join_citydb_objects(
-            [ 'TerminalElement', 'NetworkToFeature' ],
+        queries[ 'sources' ] = JoinQuery(
+            class_names = [ 'TerminalElement' ],
             conditions = [
                 getattr( self.TerminalElement, 'class' ) == 'thermal-source',
-                self.TerminalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.TerminalElement.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name' ] + self.point2d_columns( self.TerminalElement.geom )
             )
 
-        self.sinks = self.join_citydb_objects(
-            [ 'TerminalElement', 'NetworkToFeature' ],
+        queries[ 'sinks' ] = JoinQuery(
+            class_names = [ 'TerminalElement' ],
             conditions = [
                 getattr( self.TerminalElement, 'class' ) == 'thermal-sink',
-                self.TerminalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.TerminalElement.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name', 'conn_cityobject_id' ] + self.point2d_columns( self.TerminalElement.geom )
             )
 
-        self.junctions = self.join_citydb_objects(
-            [ 'OtherShapePipe', 'NetworkToFeature' ],
+        queries[ 'junctions' ] = JoinQuery(
+            class_names = [ 'OtherShapePipe' ],
             conditions = [
-                self.OtherShapePipe.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.OtherShapePipe.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name' ] + self.point2d_columns( self.OtherShapePipe.geom )
             )
 
-        self.pipes = self.join_citydb_objects(
-            [ 'RoundPipe', 'NetworkToFeature' ],
+        queries[ 'pipes' ] = JoinQuery(
+            class_names = [ 'RoundPipe' ],
             conditions = [
-                self.RoundPipe.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.RoundPipe.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'name' ] + self.length_columns( self.RoundPipe.geom ) + self.list_point2d_columns( self.RoundPipe.geom )
             )
 
-        self.dhw_facilities = self.join_citydb_objects(
-            [ 'DHWFacilities', 'TerminalElement', 'NetworkToFeature' ],
+        queries[ 'dhw_facilities' ] = JoinQuery(
+            class_names = [ 'DHWFacilities', 'TerminalElement' ],
             conditions = [
                 self.DHWFacilities.id == self.TerminalElement.conn_cityobject_id,
-                self.TerminalElement.id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.TerminalElement.id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'heat_diss_tot_value' ]
             )
 
+        return queries
 
-    def _retrieve_data_feature_graphs( self, network_id ):
+
+    def _feature_graph_queries( self, network_id, feature_ids ):
         """
-        After mapping the classes, retrieve all relevant data associated to feature graphs.
+        After mapping the classes, define the queries for retrieving all relevant data associated to feature graphs.
         """
+        queries = OrderedDict()
 
-        self.feature_graphs = self.join_citydb_objects(
-            [ 'FeatureGraph', 'NetworkToFeature' ],
+        queries[ 'feature_graphs' ] = JoinQuery(
+            class_names = [ 'FeatureGraph' ],
             conditions = [
-                self.FeatureGraph.ntw_feature_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.FeatureGraph.ntw_feature_id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'ntw_feature_id' ]
             )
 
-        self.nodes = self.join_citydb_objects(
-            [ 'Node', 'FeatureGraph', 'NetworkToFeature' ],
+        queries[ 'nodes' ] = JoinQuery(
+            class_names = [ 'Node', 'FeatureGraph' ],
             conditions = [
                 self.Node.feat_graph_id == self.FeatureGraph.id,
-                self.FeatureGraph.ntw_feature_id == self.NetworkToFeature.network_feature_id,
-                self.NetworkToFeature.network_id == network_id
+                self.in_network( self.FeatureGraph.ntw_feature_id, feature_ids )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'id', 'feat_graph_id' ]
             )
 
-        self.inter_feature_links = self.join_citydb_objects(
-            [ 'InterFeatureLink', 'NetworkGraph' ],
+        queries[ 'inter_feature_links' ] = JoinQuery(
+            class_names = [ 'InterFeatureLink', 'NetworkGraph' ],
             conditions = [
                 self.InterFeatureLink.ntw_graph_id == self.NetworkGraph.id,
-                self.NetworkGraph.network_id == network_id
+                self.network_condition( self.NetworkGraph.network_id, network_id )
                 ],
-            result_index = 0
+            result_index = 0,
+            columns = [ 'start_node_id', 'end_node_id', 'link_control', self.NetworkGraph.network_id ]
             )
 
+        return queries
+
 
-    def _retrieve_data_generic_attributes( self, network_id ):
+    def _generic_attribute_queries( self, network_id, feature_ids ):
         """
-        After mapping the classes, retrieve all relevant data stored as generic attributes.
+        After mapping the classes, define the queries for retrieving all relevant data stored as generic attributes.
         """
 
-        pass
+        return OrderedDict()
 
 
     def _add_thermal_sources( self, net ):
@@ -287,19 +356,22 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( src_ids, src_feature_graph_ids, src_node_ids ) = \
-            self._retrieve_feature_data( self.sources, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.sources )
 
         # Add thermal sources to dicts.
         self.feature_names.update( src_ids )
         self.feature_graph_ids.update( src_node_ids )
 
+        thermal_sources = []
+
         for src in self.sources:
 
-            self.add_thermal_source(
-                net = net,
+            thermal_sources.append( dict(
                 name = src.name,
-                geodata = self.geom_to_point2d( src.geom )
-                )
+                geodata = self.row_to_point2d( src )
+                ) )
+
+        self.add_thermal_sources( net, thermal_sources )
 
 
     def _add_sinks( self, net ):
@@ -313,22 +385,25 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
             }
 
         ( sink_ids, sink_feature_graph_ids, sink_node_ids ) = \
-            self._retrieve_feature_data( self.sinks, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.sinks )
 
         # Add thermal sinks to dicts.
         self.feature_names.update( sink_ids )
         self.feature_graph_ids.update( sink_node_ids )
 
+        sinks = []
+
         for sink in self.sinks:
 
             dhw_facility = dhw_facility_ids[sink.conn_cityobject_id]
 
-            self.add_sink(
-                net = net,
+            sinks.append( dict(
                 name = sink.name,
                 heat_diss_kw = float( dhw_facility.heat_diss_tot_value ),
-                geodata = self.geom_to_point2d( sink.geom )
-                )
+                geodata = self.row_to_point2d( sink )
+                ) )
+
+        self.add_sinks( net, sinks )
 
 
     def _add_junctions( self, net ):
@@ -337,19 +412,22 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( junction_ids, junction_feature_graph_ids, junction_node_ids ) = \
-            self._retrieve_feature_data( self.junctions, self.feature_graphs, self.nodes )
+            self._retrieve_feature_data( self.junctions )
 
         # Add pipe junctions to dicts.
         self.feature_names.update( junction_ids )
         self.feature_graph_ids.update( junction_node_ids )
 
+        junctions = []
+
         for junction in self.junctions:
 
-            self.add_junction(
-                net = net,
+            junctions.append( dict(
                 name = junction.name,
-                geodata = self.geom_to_point2d( junction.geom )
-                )
+                geodata = self.row_to_point2d( junction )
+                ) )
+
+        self.add_junctions( net, junctions )
 
 
     def _add_pipes( self, net ):
@@ -358,14 +436,18 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
         """
 
         ( pipe_ids, pipe_feature_graph_ids, pipe_node_ids ) = \
-            self._retrieve_feature_data( self.pipes, self.feature_graphs, self.nodes
-            )
+            self._retrieve_feature_data( self.pipes )
 
         all_node_pipe_connections =  self._retrieve_connections_with_link_control(
-            self.feature_graph_ids, pipe_node_ids, self.inter_feature_links
+            self.feature_graph_ids, pipe_node_ids
             )
 
-        for pipe in self.pipes:
+        pipes = []
+
+        # Decode the geometries of all pipes in one go.
+        all_pipe_geomdata = self.rows_to_list_point2d( self.pipes )
+
+        for ( pipe, pipe_geomdata ) in zip( self.pipes, all_pipe_geomdata ):
             connected_node_ids = all_node_pipe_connections[pipe.id]
 
             if not len( connected_node_ids ) == 2:
@@ -386,15 +468,14 @@ class ThermalSimModelDBReader( SimModelDBReaderBase ):
                 from_node_id = connected_node_ids[1][0]
                 to_node_id = connected_node_ids[0][0]
 
-            length = 1e-3 * self.execute_function( length_from_geom( pipe.geom ) )
-
-            pipe_geomdata = self.geom_to_list_point2d( pipe.geom )
+            length = 1e-3 * pipe.length
 
-            self.add_pipe(
-                net = net,
+            pipes.append( dict(
                 name = pipe.name,
                 from_node_id = from_node_id,
                 to_node_id = to_node_id,
                 length_km = length,
                 geodata = pipe_geomdata
-                )
+                ) )
+
+        self.add_pipes( net, pipes )
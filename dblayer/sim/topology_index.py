@@ -0,0 +1,175 @@
+import numpy
+
+from sqlalchemy import text
+
+
+# SQL query for retrieving the IDs of all features of a network within a maximal number of hops from a set of root
+# features, where each hop follows one link of the network graph (in any direction).
+NETWORK_WALK_QUERY = text(
+    """
+    WITH RECURSIVE walk( feature_id, depth ) AS (
+        SELECT unnest( CAST( :roots AS integer[] ) ), 0
+        UNION
+        SELECT fg2.ntw_feature_id, w.depth + 1
+        FROM walk w
+        JOIN citydb.utn9_feature_graph fg1 ON fg1.ntw_feature_id = w.feature_id
+        JOIN citydb.utn9_node n1 ON n1.feat_graph_id = fg1.id
+        JOIN citydb.utn9_link l ON l.start_node_id = n1.id OR l.end_node_id = n1.id
+        JOIN citydb.utn9_network_graph g ON g.id = l.ntw_graph_id AND g.network_id = :network_id
+        JOIN citydb.utn9_node n2 ON n2.id = CASE WHEN l.start_node_id = n1.id THEN l.end_node_id ELSE l.start_node_id END
+        JOIN citydb.utn9_feature_graph fg2 ON fg2.id = n2.feat_graph_id
+        WHERE w.depth < :hops
+    )
+    SELECT DISTINCT w.feature_id FROM walk w
+    JOIN citydb.utn9_network_to_network_feature ntf ON ntf.network_feature_id = w.feature_id
+    WHERE ntf.network_id = :network_id
+    """
+    )
+
+
+class TopologyIndex:
+    """
+    Index of the topology of a network, built from its feature graphs, nodes and inter-feature links.
+
+    The index maps each node to its network feature and stores the network features connected by inter-feature links in compressed sparse row (CSR) form, i.e., the features connected to a feature are retrieved in O(degree) instead of scanning all links.
+    """
+
+    def __init__( self, feature_graphs, nodes, links ):
+        """
+        Constructor.
+
+        :param feature_graphs: feature graphs of the network (list of results with attributes 'id' and 'ntw_feature_id')
+        :param nodes: nodes of the feature graphs (list of results with attributes 'id' and 'feat_graph_id')
+        :param links: inter-feature links of the network (list of results with attributes 'start_node_id', 'end_node_id' and 'link_control')
+        """
+        # Map feature graphs to network features.
+        feature_graph_features = { fg.id: fg.ntw_feature_id for fg in feature_graphs }
+
+        # Enumerate network features (in order of appearance).
+        self.feature_ids = list( dict.fromkeys( feature_graph_features.values() ) )
+        self.feature_index = { feature_id: i for ( i, feature_id ) in enumerate( self.feature_ids ) }
+
+        # Map nodes to network features (ignoring nodes of feature graphs not associated to the network).
+        self.node_features = {
+            n.id: feature_graph_features[ n.feat_graph_id ]
+            for n in nodes if n.feat_graph_id in feature_graph_features
+            }
+
+        # Feature graphs and nodes of each network feature.
+        ( self.feature_graph_indptr, self.feature_graph_ids ) = self._csr(
+            [ self.feature_index[ f ] for f in feature_graph_features.values() ],
+            list( feature_graph_features.keys() )
+            )
+        ( self.node_indptr, self.node_ids ) = self._csr(
+            [ self.feature_index[ f ] for f in self.node_features.values() ],
+            list( self.node_features.keys() )
+            )
+
+        # Retrieve the network features connected by each link (ignoring links to unknown nodes).
+        valid_links = [
+            l for l in links if l.start_node_id in self.node_features and l.end_node_id in self.node_features
+            ]
+        start_features = [ self.feature_index[ self.node_features[ l.start_node_id ] ] for l in valid_links ]
+        end_features = [ self.feature_index[ self.node_features[ l.end_node_id ] ] for l in valid_links ]
+
+        self.link_control = [ l.link_control for l in valid_links ]
+
+        # Links starting and ending at each network feature (in the order of the links).
+        ( self.out_indptr, self.out_links ) = self._csr( start_features, range( len( valid_links ) ) )
+        ( self.in_indptr, self.in_links ) = self._csr( end_features, range( len( valid_links ) ) )
+
+        self.start_features = numpy.array( start_features, dtype = numpy.int64 )
+        self.end_features = numpy.array( end_features, dtype = numpy.int64 )
+
+
+    def _csr( self, rows, values ):
+        """
+        Group values by row in compressed sparse row form, keeping the order of the values within each row.
+
+        :param rows: row index of each value (list of int)
+        :param values: values (list)
+        :return: index pointer and values sorted by row (tuple of numpy.ndarray)
+        """
+        rows = numpy.array( rows, dtype = numpy.int64 )
+        order = numpy.argsort( rows, kind = 'stable' )
+
+        indptr = numpy.zeros( len( self.feature_ids ) + 1, dtype = numpy.int64 )
+        numpy.cumsum( numpy.bincount( rows, minlength = len( self.feature_ids ) ), out = indptr[ 1: ] )
+
+        return ( indptr, numpy.array( list( values ), dtype = numpy.int64 )[ order ] )
+
+
+    def feature_graphs( self, feature_id ):
+        """
+        Retrieve the feature graphs of a network feature.
+
+        :param feature_id: ID of the network feature (int)
+        :return: IDs of the feature graphs (list of int)
+        """
+        i = self.feature_index.get( feature_id )
+        if i is None: return []
+
+        return self.feature_graph_ids[ self.feature_graph_indptr[ i ] : self.feature_graph_indptr[ i + 1 ] ].tolist()
+
+
+    def nodes( self, feature_id ):
+        """
+        Retrieve the nodes of the feature graphs of a network feature.
+
+        :param feature_id: ID of the network feature (int)
+        :return: IDs of the nodes (list of int)
+        """
+        i = self.feature_index.get( feature_id )
+        if i is None: return []
+
+        return self.node_ids[ self.node_indptr[ i ] : self.node_indptr[ i + 1 ] ].tolist()
+
+
+    def connected_features( self, feature_id, features = None, link_control = False ):
+        """
+        Retrieve the network features connected to a network feature via inter-feature links. Features at the start of links ending at the feature are listed first, followed by features at the end of links starting at the feature (each in the order of the links).
+
+        :param feature_id: ID of the network feature (int)
+        :param features: only retrieve connected network features with these IDs (set or dict, optional)
+        :param link_control: also retrieve the link control of the links (bool, optional, default=False)
+        :return: IDs of the connected network features (list of int), or tuples of ID and link control if parameter link_control is True
+        """
+        i = self.feature_index.get( feature_id )
+        if i is None: return []
+
+        links = \
+            [ ( self.start_features[ k ], k ) for k in self.in_links[ self.in_indptr[ i ] : self.in_indptr[ i + 1 ] ] ] + \
+            [ ( self.end_features[ k ], k ) for k in self.out_links[ self.out_indptr[ i ] : self.out_indptr[ i + 1 ] ] ]
+
+        connected = []
+
+        for ( j, k ) in links:
+            connected_id = self.feature_ids[ j ]
+            if features is not None and connected_id not in features:
+                continue
+
+            connected.append( ( connected_id, self.link_control[ k ] ) if link_control else connected_id )
+
+        return connected
+
+
+    def components( self ):
+        """
+        Label the connected components of the network, i.e., the groups of network features connected (directly or indirectly) via inter-feature links.
+
+        :return: label of the component of each network feature, in the order of attribute 'feature_ids' (numpy.ndarray of int)
+        """
+        parent = list( range( len( self.feature_ids ) ) )
+
+        def find( i ):
+            while parent[ i ] != i:
+                parent[ i ] = parent[ parent[ i ] ]
+                i = parent[ i ]
+            return i
+
+        for ( start, end ) in zip( self.start_features.tolist(), self.end_features.tolist() ):
+            ( root_start, root_end ) = ( find( start ), find( end ) )
+            if root_start != root_end:
+                parent[ max( root_start, root_end ) ] = min( root_start, root_end )
+
+        return numpy.array( [ find( i ) for i in range( len( self.feature_ids ) ) ], dtype = numpy.int64 )
@@ -32,6 +32,7 @@ class DBReader( DBAccess ):
         self.connect_to_citydb( connect )
 
 
+    @instrumented
     def read_from_db( self, sim_name ):
         """
         Read scenario from database. Requires SimulationPackage schema to be installed. Returns a new schema.
@@ -85,15 +86,18 @@ class DBReader( DBAccess ):
 
     def _retrieve_simulation_from_db( self, sim_name ):
         # Retrieve the simulation ID.
-        sim_query = self.current_session.query( Simulation ).filter_by( name = sim_name ).one()
+        sim_query = self.current_session.query( self.simpkg.Simulation ).filter_by( name = sim_name ).one()
         self.sim_id = sim_query.id
 
         # Retrieve generic parameters assciated to simulation.
-        parameters = self.current_session.query( GenericParameterSimulation ).filter_by( simulation_id = self.sim_id ).all()
+        parameters = self.current_session.query( self.simpkg.GenericParameterSimulation ).filter_by( simulation_id = self.sim_id ).all()
         self.simulation_parameters = self._retrieve_generic_parameters( parameters )
 
 
     def _retrieve_nodes_from_db( self ):
+        Node = self.simpkg.Node
+        GenericParameterNode = self.simpkg.GenericParameterNode
+
         # Retrieve nodes of the simulation configuration.
         nodes = self.current_session.query( Node ).filter(
             and_(
@@ -134,10 +138,12 @@ class DBReader( DBAccess ):
 
 
     def _retrieve_envs_and_meta_models_from_db( self ):
+        Node = self.simpkg.Node
+
         for node_name, node in self.nodes.items():
             # Retrieve environment associated to node (stored as SimulationTool).
             env_id = node.tool_id
-            env = self.current_session.query( SimulationTool ).filter_by( id = env_id ).one()
+            env = self.current_session.query( self.simpkg.SimulationTool ).filter_by( id = env_id ).one()
 
             # Store environment name in node object.
             node.env = env.name
@@ -147,7 +153,7 @@ class DBReader( DBAccess ):
                 self.envs[ env.name ] = env
 
                 # Retrieve environment parameters
-                parameters = self.current_session.query( GenericParameterTool ).filter_by( tool_id = env_id ).all()
+                parameters = self.current_session.query( self.simpkg.GenericParameterTool ).filter_by( tool_id = env_id ).all()
                 self.env_parameters[ env.name ] = self._retrieve_generic_parameters( parameters )
 
             # Retrieve meta model associated to node (stored as Node with attribute 'is_template' set to True).
@@ -165,12 +171,12 @@ class DBReader( DBAccess ):
                 self.meta_models[ meta_model.name ] = meta_model
 
                 # Retrieve attributes (inputs/outputs) of meta model.
-                attributes = self.current_session.query( Port ).filter_by( node_id = meta_model_id ).all()
+                attributes = self.current_session.query( self.simpkg.Port ).filter_by( node_id = meta_model_id ).all()
                 self.meta_model_attributes[ meta_model.name ] = attributes
 
 
     def _retrieve_links_from_db( self ):
-        links = self.current_session.query( PortConnectionExt ).filter_by( simulation_id = self.sim_id ).all()
+        links = self.current_session.query( self.simpkg.PortConnectionExt ).filter_by( simulation_id = self.sim_id ).all()
         self.links = dict( [ ( l.name, l ) for l in links ] )
 
 
@@ -336,30 +342,18 @@ class DBReader( DBAccess ):
 
 
     def _retrieve_object_ref( self, table_name, object_id, column_name ):
-        # Retrieve meta data.
-        metadata = MetaData( self.engine )
-
         # Extract name of actual schema and table.
         schema_name, table_name = table_name.split( '.' )
 
-        # Define table.
-        table = None
-        with warnings.catch_warnings():
-            warnings.simplefilter( 'ignore', category = sa_exc.SAWarning )
-
-            if schema_name is 'citydb_view':
-                table = Table( table_name, metadata, Column( 'id', Integer, primary_key = True ),
-                    autoload = True, schema = schema_name )
-            else:
-                table = Table( table_name, metadata,
-                    autoload = True, schema = schema_name )
+        # Retrieve table (from the shared meta data, if it has been reflected before).
+        table = self._reflect_table( table_name, schema_name, view = ( schema_name == 'citydb_view' ) )
 
         # Construct SQL command using SQLAlchemy.
         sql_command = select( [ getattr( table.c, column_name ) ] ).where( table.c.id == object_id )
 
-        # Connect to database and retrieve result.
-        connection = self.engine.connect()
-        result = connection.execute( sql_command ).scalar()
+        # Borrow connection from the pool and retrieve result.
+        with self._instance_engine.connect() as connection:
+            result = connection.execute( sql_command ).scalar()
 
         if isinstance( result, decimal.Decimal ):
             return float( result )
@@ -371,6 +365,8 @@ class DBReader( DBAccess ):
 
 
     def _retrieve_generic_attr_ref( self, generic_attr_name, generic_attr_id ):
+        GenericAttribute = self.simpkg.GenericAttribute
+
         # Retrieve generic attribute from database.
         attribute = self.current_session.query( GenericAttribute ).filter(
             and_(
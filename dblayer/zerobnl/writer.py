@@ -37,6 +37,7 @@ class DBWriter( DBAccess ):
         self.attribute_ids = {}
 
 
+    @instrumented
     def write_to_db( self, sim, sim_name, write_meta_models = True, write_envs = True  ):
         """
         Write simulator setup to database.
@@ -144,6 +145,8 @@ class DBWriter( DBAccess ):
 
 
     def _retrieve_meta_model_from_db( self, meta_name ):
+        Node = self.simpkg.Node
+
         meta_model = self.current_session.query( Node ).filter(
             and_(
                 Node.name == meta_name,
@@ -186,7 +189,7 @@ class DBWriter( DBAccess ):
 
 
     def _retrieve_env_from_db( self, env_name ):
-        env = self.current_session.query( SimulationTool ).filter_by( name = env_name ).one()
+        env = self.current_session.query( self.simpkg.SimulationTool ).filter_by( name = env_name ).one()
         self.env_ids[ env_name ] = env.id
 
 
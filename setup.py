@@ -9,6 +9,7 @@ setup(
     version = '1.0',
     platforms = [ 'any' ],
     packages = find_packages(),
+    python_requires = '>=3.7',
     install_requires = [
         'fluids>=0.1.75',
         'networkx>=2.4',
@@ -22,6 +23,10 @@ setup(
         'pandangas @ git+https://github.com/IntegrCiTy/PandaNGas.git@dd16c9f1a753de03207bbc7d7e9a41a3fba99656',
         'pandathermal @ git+https://github.com/IntegrCiTy/PandaThermal.git@55afee02dff4ac1288d0abef4bdc9ea44f02d632',
     ],
+    extras_require = {
+        'async': [ 'aiopg>=1.0' ],
+        'arrow': [ 'pyarrow>=1.0' ],
+    },
     description = 'Data Access Layer for the IntegrCiTy toolchain',
     long_description = 'README.md',
     license = 'BSD 2-Clause License',
@@ -39,7 +44,8 @@ setup(
 	'License :: OSI Approved :: BSD License',
 	'Natural Language :: English',
 	'Operating System :: OS Independent',
-	'Programming Language :: Python :: 3.6',
+	'Programming Language :: Python :: 3.7',
+	'Programming Language :: Python :: 3.8',
 	'Topic :: Scientific/Engineering :: Energy Simulation'
     ],
 )
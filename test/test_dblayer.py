@@ -151,6 +151,35 @@ def fix_gas_network_id():
 def fix_srid():
     return 4326
 
+
+@pytest.fixture()
+def fix_disconnected_network( fix_access, fix_srid ):
+    '''
+    Fixture for testing. Creates an electrical network with two busses, which are not connected to each other. The network, its features and its network graph are deleted again after the test.
+
+    :return: network ID and network graph ID (tuple of int)
+    '''
+    ( ntw_id, ntw_graph_id ) = el_net.write_network_to_db(
+        fix_access,
+        name = 'test_disconnected_network',
+        type = 'singlePhaseAlternatingCurrent'
+        )
+    el_net.write_bus_to_db( fix_access, 'disconnected-bus-1', 'busbar', Point2D( 0., 0. ), 0.4, fix_srid, ntw_id, ntw_graph_id )
+    el_net.write_bus_to_db( fix_access, 'disconnected-bus-2', 'busbar', Point2D( 1., 0. ), 0.4, fix_srid, ntw_id, ntw_graph_id )
+    fix_access.commit_citydb_session()
+
+    yield ( ntw_id, ntw_graph_id )
+
+    # Delete the network (including its network graph) and all its features (including their feature graphs).
+    fix_access._execute_raw_sql(
+        '''
+        CREATE TEMP TABLE test_network_features ON COMMIT DROP AS
+            SELECT network_feature_id AS id FROM citydb.utn9_network_to_network_feature WHERE network_id = {0};
+        SELECT citydb_pkg.utn9_delete_network( {0} );
+        SELECT citydb_pkg.utn9_delete_network_feature( id ) FROM test_network_features;
+        '''.format( ntw_id )
+        )
+
 def test_cleanup_citydb_schema( fix_access ):
     fix_access.cleanup_citydb_schema()
 
@@ -364,6 +393,33 @@ def test_geom_func( fix_connect, fix_access ):
         assert( str( e ) == 'first and last point do not coincide' )
 
 
+def test_geom_point2d_array( fix_connect, fix_access ):
+    points = Point2DArray( [ [ 3, 5 ], [ 4, 6 ], [ 15, 7 ], [ 3, 5 ] ] )
+
+    assert( points == [ Point2D( 3, 5 ), Point2D( 4, 6 ), Point2D( 15, 7 ), Point2D( 3, 5 ) ] )
+    assert( points[1] == Point2D( 4., 6. ) )
+    assert( points[ 1:3 ].coords.base is points.coords )
+
+    # Arrays and lists of points are converted to the same geometries.
+    geo = fix_access.execute_function( geom_from_2dlinestring( points[ :2 ] ) )
+    assert( geo == fix_access.execute_function( geom_from_2dlinestring( [ Point2D( 3, 5 ), Point2D( 4, 6 ) ] ) ) )
+
+    geo = fix_access.execute_function( geom_from_2dpolygon( points ) )
+    assert( geo == '010300008001000000040000000000000000000840000000000000144000000000000000000000000000001040000000000000184000000000000000000000000000002E400000000000001C400000000000000000000000000000084000000000000014400000000000000000' )
+
+    # Geometries are decoded from their (hexadecimal) well-known binary representation.
+    assert( Point2DArray.from_wkb( geo ) == points )
+    assert( Point2DArray.from_wkb( fix_access.execute_function( geom_as_binary( geo ) ) ) == points )
+
+    # Several geometries are decoded into one buffer.
+    decoded = Point2DArray.from_wkb_list( [ points[ :2 ].to_wkb(), points.to_wkb( WKB_POLYGON_Z ) ] )
+    assert( decoded[0] == points[ :2 ] and decoded[1] == points )
+    assert( decoded[0].coords.base is decoded[1].coords.base )
+
+    with pytest.raises( ValueError ):
+        geom_from_2dpolygon( points[ :3 ] )
+
+
 def test_insert_surface_geometry( fix_access, fix_srid ):
 
     geom_2d_points = [ Point2D( 0., 0. ), Point2D( 0., 1. ), Point2D( 1., 1. ), Point2D( 0., 0. ) ]
@@ -624,3 +680,796 @@ def test_sim_utn_gas_pandangas( fix_connect, fix_gas_network_id ):
     assert( m_dot_nodes['node-N2'] == 0.000262 )
     assert( m_dot_nodes['node-N3'] == 0.000394 )
     #assert( pipes_max_m_dot[('N6','SNK9')] == pytest.approx( 0.05, 1e-4 ) )
+
+
+def test_add_citydb_objects_bulk( fix_access ):
+    # Insert several time series using a single inserter function with many argument rows.
+    ts_args = [
+        dict( name = 'TS_BULK_{:02d}'.format( i ), values_array = [ i, i + 1 ],
+            values_unit = 'kW', time_interval = 1., time_interval_unit = 'h' )
+        for i in range( 5 )
+        ]
+    ts_ids = fix_access.add_citydb_objects( insert_regular_time_series, ts_args, chunk_size = 2 )
+
+    # Expect one new ID per time series, returned in input order.
+    assert( len( ts_ids ) == 5 )
+    assert( len( set( ts_ids ) ) == 5 )
+    assert( ts_ids == sorted( ts_ids ) )
+
+    # Insert different types of objects using a list of inserter functions and arguments.
+    bui_id = fix_access.add_citydb_object( insert_building, name = 'BUILDING_BULK' )
+    attr_ids = fix_access.add_citydb_objects( [
+        ( insert_genericattrib_real, dict( attrname = 'BULK_ATTR_01', attrvalue = 1.5, cityobject_id = bui_id ) ),
+        ( insert_genericattrib_integer, dict( attrname = 'BULK_ATTR_02', attrvalue = 2, cityobject_id = bui_id ) ),
+        ( insert_genericattrib_string, dict( attrname = 'BULK_ATTR_03', attrvalue = '3', cityobject_id = bui_id ) )
+        ] )
+
+    fix_access.commit_citydb_session()
+
+    GenericAttribute = fix_access.map_citydb_object_class( 'GenericAttribute' )
+    attributes = fix_access.get_citydb_objects( 'GenericAttribute',
+        conditions = [ GenericAttribute.cityobject_id == bui_id ] )
+
+    assert( sorted( attr_ids ) == sorted( attr.id for attr in attributes ) )
+    assert( { attr.id: attr.attrname for attr in attributes }[ attr_ids[1] ] == 'BULK_ATTR_02' )
+
+
+def test_connection_pool_options( fix_connect ):
+    # Connect with explicit settings for the connection pool.
+    # Connect via another host name, i.e., with an engine not shared with the other tests.
+    access = DBAccess()
+    access.connect_to_citydb( fix_connect._replace( host = '127.0.0.1', pool_size = 2, max_overflow = 0,
+        pool_pre_ping = True, statement_timeout = 10000, application_name = 'dblayer_test' ) )
+
+    assert( access.engine.pool.size() == 2 )
+
+    # Low-level connections are borrowed from the pool and returned to it.
+    for _ in range( 5 ):
+        access._execute_raw_sql( 'SELECT 1;' )
+    assert( access.engine.pool.checkedout() == 0 )
+
+    # Settings are applied to the connections.
+    assert( access.execute_function( func.current_setting( 'application_name' ) ) == 'dblayer_test' )
+    assert( access.execute_function( func.current_setting( 'statement_timeout' ) ) == '10s' )
+
+    access.disconnect_from_citydb()
+    assert( access.engine is None )
+
+
+def test_reflection_cache( fix_connect, tmp_path ):
+    # Connect via another host name, i.e., with a registry not shared with the other tests.
+    connect = fix_connect._replace( host = '127.0.0.1', reflection_cache_dir = str( tmp_path ) )
+
+    # Reflect a view and store it in the cache.
+    access = DBAccess()
+    access.connect_to_citydb( connect )
+    access.map_citydb_object_class( 'CachedBuildingView', table_name = 'building', schema = 'citydb_view' )
+    assert( len( list( tmp_path.iterdir() ) ) == 1 )
+
+    registry = access.registry
+    access.disconnect_from_citydb()
+
+    # A new registry for the same database loads the view from the cache.
+    cached_access = DBAccess()
+    cached_access.connect_to_citydb( connect )
+    assert( cached_access.registry is not registry )
+    assert( 'citydb_view.building' in cached_access.metadata.tables )
+    assert( cached_access._reflect_table( 'building', 'citydb_view', view = True ) is \
+        cached_access.metadata.tables[ 'citydb_view.building' ] )
+
+    cached_access.disconnect_from_citydb()
+
+
+def test_reflect_tables( fix_access ):
+    views = [
+        ( 'utn9_node', 'citydb_view' ),
+        ( 'utn9_link_interfeature', 'citydb_view' ),
+        ( 'cityobject_genericattrib_real', 'citydb_view' )
+        ]
+
+    # Reflect several views and a table in one go.
+    fix_access.reflect_tables( views + [ ( 'utn9_network_to_network_feature', 'citydb' ) ] )
+
+    for ( table_name, schema ) in views:
+        table = fix_access.metadata.tables[ '{}.{}'.format( schema, table_name ) ]
+        assert( [ c.name for c in table.primary_key ] == [ 'id' ] )
+
+    assert( 'citydb.utn9_network_to_network_feature' in fix_access.metadata.tables )
+
+    # Mapped classes are served from the shared meta data.
+    Node = fix_access.map_citydb_object_class( 'ReflectedNode', table_name = 'utn9_node', schema = 'citydb_view' )
+    assert( sqlalchemy.inspect( Node ).local_table is fix_access.metadata.tables[ 'citydb_view.utn9_node' ] )
+
+
+def test_reflect_tables_column_types( fix_connect ):
+    import warnings
+
+    # Connect via another host name, i.e., with a registry (and meta data) not shared with the other tests.
+    access = DBAccess()
+    access.connect_to_citydb( fix_connect._replace( host = '127.0.0.1' ) )
+
+    access.reflect_tables( [ ( 'building', 'citydb_view' ) ] )
+    reflected = access.metadata.tables[ 'citydb_view.building' ]
+
+    # Geometry columns are not recognized by SQLAlchemy.
+    with warnings.catch_warnings():
+        warnings.simplefilter( 'ignore', category = sqlalchemy.exc.SAWarning )
+        autoloaded = Table( 'building', MetaData(), autoload = True, autoload_with = access.engine, schema = 'citydb_view' )
+
+    # The view contains columns of type 'timestamp with time zone' (e.g., 'creation_date').
+    assert( reflected.columns[ 'creation_date' ].type.timezone is True )
+
+    assert( reflected.columns.keys() == autoloaded.columns.keys() )
+    for column in autoloaded.columns:
+        assert( repr( reflected.columns[ column.name ].type ) == repr( column.type ) )
+
+    access.disconnect_from_citydb()
+
+
+def test_iter_citydb_objects( fix_access ):
+    GenericAttribute = fix_access.map_citydb_object_class( 'GenericAttribute' )
+    Building = fix_access.map_citydb_object_class( 'Building' )
+
+    # Stream objects in small chunks and compare with the results retrieved all at once.
+    buildings = fix_access.iter_citydb_objects( 'Building', yield_per = 1 )
+    assert( sorted( b.id for b in buildings ) == sorted( b.id for b in fix_access.get_citydb_objects( 'Building' ) ) )
+
+    conditions = [ GenericAttribute.cityobject_id == Building.id ]
+    attributes = fix_access.iter_join_citydb_objects( [ 'GenericAttribute', 'Building' ],
+        conditions = conditions, result_index = 0, yield_per = 2 )
+    assert( sorted( a.id for a in attributes ) == sorted( a.id for a in fix_access.join_citydb_objects(
+        [ 'GenericAttribute', 'Building' ], conditions = conditions, result_index = 0 ) ) )
+
+
+def test_get_citydb_objects_columns( fix_access ):
+    GenericAttribute = fix_access.map_citydb_object_class( 'GenericAttribute' )
+    Building = fix_access.map_citydb_object_class( 'Building' )
+
+    # Retrieve only selected columns as named tuples.
+    buildings = fix_access.get_citydb_objects( 'Building', columns = [ 'id', 'name' ] )
+    assert( all( b._fields == ( 'id', 'name' ) for b in buildings ) )
+    assert( sorted( b.id for b in buildings ) == sorted( b.id for b in fix_access.get_citydb_objects( 'Building' ) ) )
+
+    # Column names refer to the object class selected by the result index.
+    attributes = fix_access.join_citydb_objects( [ 'GenericAttribute', 'Building' ],
+        conditions = [ GenericAttribute.cityobject_id == Building.id, Building.name == 'BUILDING_01' ],
+        result_index = 1, columns = [ 'name', GenericAttribute.attrname ] )
+    assert( len( attributes ) == 3 )
+    assert( all( a.name == 'BUILDING_01' for a in attributes ) )
+    assert( sorted( a.attrname for a in attributes ) == [ 'BUILDING_01_ATTR_01', 'BUILDING_01_ATTR_02', 'BUILDING_01_ATTR_03' ] )
+
+    with pytest.raises( RuntimeError ):
+        fix_access.get_citydb_objects( 'Building', columns = [ 'unknown_column' ] )
+
+
+def test_orm_registry( fix_connect ):
+    # Instances connected with the same parameters share engine and mappings.
+    access = DBAccess()
+    access.connect_to_citydb( fix_connect )
+    shared_access = DBAccess()
+    shared_access.connect_to_citydb( fix_connect )
+    assert( shared_access.registry is access.registry )
+    assert( shared_access.engine is access.engine )
+    assert( shared_access.simpkg.Node is access.simpkg.Node )
+
+    # Settings of the shared engine cannot be changed by other instances.
+    with pytest.raises( RuntimeError ):
+        DBAccess().connect_to_citydb( fix_connect._replace( pool_size = 3 ) )
+
+    # Instances connected to another host use separate registries with their own mapped classes.
+    other_connect = fix_connect._replace( host = '127.0.0.1', application_name = 'dblayer_test_registry' )
+    other_access = DBAccess()
+    other_access.connect_to_citydb( other_connect )
+    assert( other_access.registry is not access.registry )
+    assert( other_access.simpkg.Node is not access.simpkg.Node )
+
+    # The template classes of the Simulation Package are never mapped themselves.
+    import dblayer.orm.orm_simpkg as orm_simpkg
+    assert( sqlalchemy.inspect( orm_simpkg.Node, raiseerr = False ) is None )
+    assert( other_access.map_citydb_object_class( 'Building' ) is not access.map_citydb_object_class( 'Building' ) )
+
+    # Both registries can be queried side by side.
+    assert( len( other_access.get_citydb_objects( 'Building' ) ) == len( access.get_citydb_objects( 'Building' ) ) )
+
+    other_node = other_access.simpkg.Node
+    other_building = other_access.map_citydb_object_class( 'Building' )
+
+    other_access.disconnect_from_citydb()
+    assert( DBAccess.registry_key( other_connect ) not in DBAccess.registries )
+
+    # The classes mapped for a discarded registry are no longer mapped.
+    assert( sqlalchemy.inspect( other_node, raiseerr = False ) is None )
+    assert( sqlalchemy.inspect( other_building, raiseerr = False ) is None )
+
+    # Reconnecting to the database maps new classes.
+    other_access.connect_to_citydb( other_connect )
+    assert( other_access.simpkg.Node is not other_node )
+    assert( len( other_access.get_citydb_objects( 'Building' ) ) == len( access.get_citydb_objects( 'Building' ) ) )
+    other_access.disconnect_from_citydb()
+
+    # Disconnecting an instance does not affect the other instances sharing the engine.
+    access.disconnect_from_citydb()
+    assert( len( shared_access.get_citydb_objects( 'Building' ) ) > 0 )
+
+
+def test_thread_safe_access( fix_connect ):
+    from concurrent.futures import ThreadPoolExecutor
+
+    # One instance shared by several threads, each thread using its own session.
+    access = DBAccess( thread_safe = True )
+    access.connect_to_citydb( fix_connect )
+
+    def retrieve_buildings( index ):
+        buildings = access.get_citydb_objects( 'Building', columns = [ 'id' ] )
+        session = access.current_session
+        access.close_citydb_session()
+        return ( sorted( b.id for b in buildings ), session )
+
+    with ThreadPoolExecutor( max_workers = 4 ) as executor:
+        results = list( executor.map( retrieve_buildings, range( 8 ) ) )
+
+    assert( all( ids == results[0][0] for ( ids, _ ) in results ) )
+    assert( access.current_session is None )
+
+    access.disconnect_from_citydb()
+
+
+def test_async_access( fix_connect, fix_access, fix_electrical_network_id ):
+    import asyncio
+    from dblayer.aio import AsyncDBAccess
+
+    async def retrieve():
+        access = AsyncDBAccess()
+        await access.connect_to_citydb( fix_connect )
+
+        GenericAttribute = await access.map_citydb_object_class( 'GenericAttribute' )
+        Building = await access.map_citydb_object_class( 'Building' )
+
+        # Issue independent queries concurrently.
+        ( buildings, attributes, pi ) = await asyncio.gather(
+            access.get_citydb_objects( 'Building' ),
+            access.join_citydb_objects( [ 'GenericAttribute', 'Building' ],
+                conditions = [ GenericAttribute.cityobject_id == Building.id ], result_index = 0 ),
+            access.execute_function( func.pi() )
+            )
+        assert( pi == pytest.approx( 3.141593, 1e-6 ) )
+
+        # Retrieve a simulation model, with all queries of the reader issued concurrently.
+        net = await access.get_net( PandaPowerModelDBReader( fix_connect ), fix_electrical_network_id )
+
+        await access.disconnect_from_citydb()
+        return ( buildings, attributes, net )
+
+    ( buildings, attributes, net ) = asyncio.run( retrieve() )
+
+    GenericAttribute = fix_access.map_citydb_object_class( 'GenericAttribute' )
+    Building = fix_access.map_citydb_object_class( 'Building' )
+
+    assert( sorted( b.id for b in buildings ) == sorted( b.id for b in fix_access.get_citydb_objects( 'Building' ) ) )
+    assert( sorted( b.name for b in buildings ) == sorted( b.name for b in fix_access.get_citydb_objects( 'Building' ) ) )
+    assert( sorted( a.id for a in attributes ) == sorted( a.id for a in fix_access.join_citydb_objects(
+        [ 'GenericAttribute', 'Building' ], conditions = [ GenericAttribute.cityobject_id == Building.id ], result_index = 0 ) ) )
+
+    assert( len( net.bus ) == 4 )
+    assert( len( net.line ) == 1 )
+    assert( len( net.trafo ) == 1 )
+
+
+def test_query_report( fix_access ):
+    building_count = len( fix_access.get_citydb_objects( 'Building' ) )
+
+    with fix_access.query_report() as report:
+        fix_access.get_citydb_objects( 'Building' )
+        for _ in range( 3 ):
+            fix_access.execute_function( func.pi() )
+
+    # Statements are counted per calling method and per SQL function.
+    assert( report.total.round_trips == 4 )
+    assert( report.by_method[ 'get_citydb_objects' ].round_trips == 1 )
+    assert( report.by_method[ 'get_citydb_objects' ].rows == building_count )
+    assert( report.by_method[ 'execute_function' ].round_trips == 3 )
+    assert( report.by_function[ 'pi' ].round_trips == 3 )
+    assert( report.elapsed >= report.total.time )
+
+    # Cumulative statistics of the instance include the instrumented block.
+    assert( fix_access.query_statistics.total.round_trips >= report.total.round_trips )
+
+    # Statements are only counted while a report is active.
+    assert( fix_access.registry.instrumented == 0 )
+    round_trips = fix_access.query_statistics.total.round_trips
+    fix_access.execute_function( func.pi() )
+    assert( fix_access.query_statistics.total.round_trips == round_trips )
+
+
+def test_sim_reader_inline_geometry( fix_connect, fix_electrical_network_id ):
+    pp_reader = PandaPowerModelDBReader( fix_connect )
+
+    with pytest.warns( RuntimeWarning ):
+        with pp_reader.query_report() as report:
+            net = pp_reader.get_net( network_id = fix_electrical_network_id )
+
+    # Geometries are retrieved together with the features, not with one extra statement per feature.
+    assert( 'ST_AsText' not in report.by_function )
+    assert( len( net.bus_geodata ) == 4 )
+    assert( len( net.line_geodata ) == 1 )
+    assert( all( len( coords ) >= 2 for coords in net.line_geodata.coords ) )
+
+
+def test_sim_reader_server_side_length( fix_connect, fix_electrical_network_id ):
+    pp_reader = PandaPowerModelDBReader( fix_connect )
+
+    with pytest.warns( RuntimeWarning ):
+        with pp_reader.query_report() as report:
+            net = pp_reader.get_net( network_id = fix_electrical_network_id )
+
+    # Line lengths are computed by the feature query.
+    assert( 'execute_function' not in report.by_method )
+    assert( net.line.iloc[0].length_km > 0. )
+
+    # Lengths are computed in the metric reference system if requested (the test network uses WGS 84).
+    pp_reader_metric = PandaPowerModelDBReader( fix_connect, length_srid = 3857 )
+
+    with pytest.warns( RuntimeWarning ):
+        net_metric = pp_reader_metric.get_net( network_id = fix_electrical_network_id )
+
+    assert( net_metric.line.iloc[0].length_km > net.line.iloc[0].length_km )
+
+
+def test_pivot_generic_attributes( fix_access, fix_electrical_network_id ):
+    GenericAttribute = fix_access.map_citydb_object_class( 'GenericAttributeReal' )
+    NetworkToFeature = fix_access.map_citydb_object_class( 'NetworkToFeature',
+        table_name = 'utn9_network_to_network_feature', schema = 'citydb' )
+
+    conditions = [
+        GenericAttribute.cityobject_id == NetworkToFeature.network_feature_id,
+        NetworkToFeature.network_id == fix_electrical_network_id
+        ]
+
+    with fix_access.query_report() as report:
+        attributes = fix_access.pivot_generic_attributes( [ 'vn_kv', 'r_ohm_per_km' ],
+            class_names = [ 'NetworkToFeature' ], conditions = conditions, class_name = 'GenericAttributeReal' )
+
+    assert( report.total.round_trips == 1 )
+
+    # Compare with retrieving each attribute separately.
+    for name in [ 'vn_kv', 'r_ohm_per_km' ]:
+        values = fix_access.join_citydb_objects( [ 'GenericAttributeReal', 'NetworkToFeature' ],
+            conditions = conditions + [ GenericAttribute.attrname == name ],
+            result_index = 0, columns = [ 'cityobject_id', 'realval' ] )
+
+        assert( len( values ) > 0 )
+        assert( { v.cityobject_id: v.realval for v in values } ==
+            { a.cityobject_id: getattr( a, name ) for a in attributes if getattr( a, name ) is not None } )
+
+
+def test_sim_reader_snapshot( fix_connect, fix_electrical_network_id ):
+    pp_reader = PandaPowerModelDBReader( fix_connect )
+
+    with pytest.warns( RuntimeWarning ):
+        pp_reader.load_snapshot( fix_electrical_network_id )
+
+    # Once the classes are mapped, the version of the database content and the feature IDs are retrieved once and each table with one statement.
+    with pp_reader.query_report() as report:
+        snapshot = pp_reader.load_snapshot( fix_electrical_network_id )
+
+    assert( report.total.round_trips == len( snapshot ) + 2 )
+    assert( snapshot.network_id == fix_electrical_network_id )
+    assert( len( snapshot.rows( 'busses' ) ) == 4 )
+    assert( snapshot.columns( 'lines' )[ :3 ] == [ 'id', 'name', 'class' ] )
+    assert( len( snapshot.to_dataframe( 'feature_graphs' ) ) == len( snapshot.rows( 'feature_graphs' ) ) )
+
+    # The simulation model is created from the snapshot without accessing the database.
+    with pp_reader.query_report() as report:
+        net = pp_reader.get_net_from_snapshot( snapshot )
+
+    assert( report.total.round_trips == 0 )
+    assert( len( net.bus ) == 4 )
+    assert( len( net.line ) == 1 )
+    assert( len( net.trafo ) == 1 )
+
+
+def test_sim_reader_topology_index( fix_connect, fix_electrical_network_id ):
+    pp_reader = PandaPowerModelDBReader( fix_connect )
+
+    with pytest.warns( RuntimeWarning ):
+        pp_reader.get_net( network_id = fix_electrical_network_id )
+
+    topology = pp_reader.topology
+    bus_ids = { bus.id for bus in pp_reader.busses }
+
+    # Each line connects 2 busses.
+    for line in pp_reader.lines:
+        assert( len( topology.connected_features( line.id, bus_ids ) ) == 2 )
+        assert( len( topology.nodes( line.id ) ) > 0 )
+
+    # Connections are symmetric.
+    for line in pp_reader.lines:
+        for bus_id in topology.connected_features( line.id, bus_ids ):
+            assert( line.id in topology.connected_features( bus_id ) )
+
+    assert( topology.connected_features( -1 ) == [] )
+
+
+def test_sim_pandapower_bulk( fix_connect, fix_electrical_network_id ):
+    from dblayer.sim.electrical_sim_model_db_reader import ElectricalSimModelDBReader
+
+    class PerElementReader( PandaPowerModelDBReader ):
+        # Add elements one by one (default implementation of the base class).
+        add_busses = ElectricalSimModelDBReader.add_busses
+        add_lines = ElectricalSimModelDBReader.add_lines
+        add_loads = ElectricalSimModelDBReader.add_loads
+        add_transformers = ElectricalSimModelDBReader.add_transformers
+        add_switches = ElectricalSimModelDBReader.add_switches
+        add_ext_grids = ElectricalSimModelDBReader.add_ext_grids
+
+    pp_reader = PandaPowerModelDBReader( fix_connect )
+    with pytest.warns( RuntimeWarning ):
+        snapshot = pp_reader.load_snapshot( fix_electrical_network_id )
+
+    net_bulk = pp_reader.get_net_from_snapshot( snapshot )
+    net_single = PerElementReader( fix_connect ).get_net_from_snapshot( snapshot )
+
+    for table in [ 'bus', 'line', 'load', 'trafo', 'switch', 'ext_grid', 'bus_geodata' ]:
+        pd.testing.assert_frame_equal( net_bulk[ table ], net_single[ table ], check_dtype = False )
+
+    assert( net_bulk.line_geodata.coords.tolist() == net_single.line_geodata.coords.tolist() )
+
+    pp.runpp( net_bulk, numba=False )
+    pp.runpp( net_single, numba=False )
+    pd.testing.assert_frame_equal( net_bulk.res_bus, net_single.res_bus )
+
+    # Busses are identified by their feature IDs, not by their names.
+    net = pp_reader.create_empty_network()
+    pp_reader.add_busses( net, [
+        dict( id = 1, name = 'bus', type = 'b', vn_kv = 0.4, geodata = None ),
+        dict( id = 2, name = 'bus', type = 'b', vn_kv = 0.4, geodata = None )
+        ] )
+    pp_reader.add_loads( net, [ dict( name = 'load', bus_id = 2, p_kw = 1., q_kvar = 0. ) ] )
+
+    assert( pp_reader.bus_indices[1] != pp_reader.bus_indices[2] )
+    assert( net.load.bus.tolist() == [ pp_reader.bus_indices[2] ] )
+
+
+def test_sim_pandangas_pandathermal_bulk( fix_connect, fix_gas_network_id, fix_thermal_network_id ):
+    from dblayer.sim.gas_sim_model_db_reader import GasSimModelDBReader
+    from dblayer.sim.thermal_sim_model_db_reader import ThermalSimModelDBReader
+
+    class PerElementGasReader( PandaNGasModelDBReader ):
+        # Add elements one by one (default implementation of the base class).
+        add_network_nodes = GasSimModelDBReader.add_network_nodes
+        add_feeders = GasSimModelDBReader.add_feeders
+        add_sinks = GasSimModelDBReader.add_sinks
+        add_stations = GasSimModelDBReader.add_stations
+        add_pipes = GasSimModelDBReader.add_pipes
+
+    class PerElementThermalReader( PandaThermalModelDBReader ):
+        # Add elements one by one (default implementation of the base class).
+        add_thermal_sources = ThermalSimModelDBReader.add_thermal_sources
+        add_sinks = ThermalSimModelDBReader.add_sinks
+        add_junctions = ThermalSimModelDBReader.add_junctions
+        add_pipes = ThermalSimModelDBReader.add_pipes
+
+    pg_reader = PandaNGasModelDBReader( fix_connect )
+    snapshot = pg_reader.load_snapshot( fix_gas_network_id )
+
+    net_bulk = pg_reader.get_net_from_snapshot( snapshot )
+    net_single = PerElementGasReader( fix_connect ).get_net_from_snapshot( snapshot )
+
+    for table in [ 'bus', 'pipe', 'feeder', 'load', 'station' ]:
+        pd.testing.assert_frame_equal( net_bulk[ table ], net_single[ table ], check_dtype = False )
+
+    pth_reader = PandaThermalModelDBReader( fix_connect )
+    snapshot = pth_reader.load_snapshot( fix_thermal_network_id )
+
+    net_bulk = pth_reader.get_net_from_snapshot( snapshot )
+    net_single = PerElementThermalReader( fix_connect ).get_net_from_snapshot( snapshot )
+
+    assert( dict( net_bulk.nodes( data = True ) ) == dict( net_single.nodes( data = True ) ) )
+    assert( sorted( net_bulk.edges( data = True ) ) == sorted( net_single.edges( data = True ) ) )
+
+
+def test_sim_model_cache( fix_connect, fix_access, fix_electrical_network_id, tmp_path ):
+    model_cache = ModelCache( str( tmp_path ), max_size = 100 * 1024 * 1024 )
+    pp_reader = PandaPowerModelDBReader( fix_connect, model_cache = model_cache )
+
+    # The change token does not change as long as the network is unchanged.
+    token = pp_reader.change_token( fix_electrical_network_id )
+    assert( token == pp_reader.change_token( fix_electrical_network_id ) )
+
+    # Generic attributes modified in place (e.g., their unit) are detected when hashing their values.
+    token = pp_reader.change_token( fix_electrical_network_id, hash_values = True )
+    assert( token == pp_reader.change_token( fix_electrical_network_id, hash_values = True ) )
+
+    attribute = \
+        '( SELECT min( ga.id ) FROM citydb.cityobject_genericattrib ga ' \
+        'JOIN citydb.utn9_network_to_network_feature n ON n.network_feature_id = ga.cityobject_id ' \
+        'WHERE n.network_id = {} )'.format( fix_electrical_network_id )
+
+    fix_access._execute_raw_sql(
+        'UPDATE citydb.cityobject_genericattrib SET unit = coalesce( unit, \'\' ) || \'_changed\' WHERE id = {};'.format( attribute ) )
+
+    try:
+        assert( pp_reader.change_token( fix_electrical_network_id, hash_values = True ) != token )
+    finally:
+        fix_access._execute_raw_sql(
+            'UPDATE citydb.cityobject_genericattrib SET unit = nullif( left( unit, -8 ), \'\' ) WHERE id = {};'.format( attribute ) )
+
+    assert( pp_reader.change_token( fix_electrical_network_id, hash_values = True ) == token )
+
+    # The first call constructs the model and stores it in the cache.
+    with pytest.warns( RuntimeWarning ):
+        net = pp_reader.get_net( network_id = fix_electrical_network_id )
+    assert( len( list( tmp_path.iterdir() ) ) == 1 )
+
+    # Another reader retrieves the model from the cache, with a single query for the change token.
+    cached_reader = PandaPowerModelDBReader( fix_connect, model_cache = model_cache )
+    with cached_reader.query_report() as report:
+        cached_net = cached_reader.get_net( network_id = fix_electrical_network_id )
+
+    assert( report.total.round_trips == 1 )
+    pd.testing.assert_frame_equal( cached_net.bus, net.bus )
+    pd.testing.assert_frame_equal( cached_net.line, net.line )
+
+    # Readers with other settings do not share cached models.
+    assert( model_cache.key( fix_connect, pp_reader, fix_electrical_network_id, token ) != \
+        model_cache.key( fix_connect, PandaPowerModelDBReader( fix_connect, length_srid = 3857 ), fix_electrical_network_id, token ) )
+
+    # Least recently used entries are evicted.
+    small_cache = ModelCache( str( tmp_path ), max_size = 1 )
+    small_cache.save( 'other', net )
+    assert( len( list( tmp_path.iterdir() ) ) == 1 )
+    assert( small_cache.load( 'other' ) is not None )
+
+
+def test_sim_reader_refresh( fix_connect, fix_access, fix_srid, fix_disconnected_network ):
+    # The network is modified by this test.
+    ( ntw_id, ntw_graph_id ) = fix_disconnected_network
+
+    pp_reader = PandaPowerModelDBReader( fix_connect )
+    snapshot = pp_reader.load_snapshot( ntw_id )
+    net = pp_reader.get_net_from_snapshot( snapshot )
+    assert( len( net.bus ) == 2 )
+
+    # Nothing has changed.
+    assert( pp_reader.rebuild_net( net, snapshot ) == set() )
+    assert( len( net.bus ) == 2 )
+
+    bus_indices = { name: pp.get_element_index( net, 'bus', name ) for name in net.bus.name }
+
+    # Add a bus and rebuild the model in place.
+    bus = el_net.write_bus_to_db( fix_access, 'refresh-bus', 'busbar', Point2D( 2., 0. ), 20., fix_srid, ntw_id, ntw_graph_id )
+    fix_access.commit_citydb_session()
+
+    bus_table = net.bus
+    assert( pp_reader.rebuild_net( net, snapshot ) == { bus.feature_id } )
+    assert( net.bus is not bus_table )
+    assert( len( net.bus ) == 3 )
+
+    # The model is rebuilt completely, but the unchanged busses keep their indices.
+    for ( name, index ) in bus_indices.items():
+        assert( pp.get_element_index( net, 'bus', name ) == index )
+    assert( net.bus.vn_kv[ pp.get_element_index( net, 'bus', 'refresh-bus' ) ] == 20. )
+
+    # The refreshed snapshot and model are identical to newly retrieved ones.
+    fresh_snapshot = pp_reader.load_snapshot( ntw_id )
+    for name in fresh_snapshot.names:
+        assert( set( snapshot.rows( name ) ) == set( fresh_snapshot.rows( name ) ) )
+
+    fresh_net = pp_reader.get_net_from_snapshot( fresh_snapshot )
+    pd.testing.assert_frame_equal(
+        net.bus.sort_values( 'name' ).reset_index( drop = True ),
+        fresh_net.bus.sort_values( 'name' ).reset_index( drop = True )
+        )
+
+
+def test_sim_reader_get_nets( fix_connect, fix_electrical_network_id, fix_disconnected_network ):
+    ( disconnected_network_id, _ ) = fix_disconnected_network
+    network_ids = [ fix_electrical_network_id, disconnected_network_id ]
+
+    pp_reader = PandaPowerModelDBReader( fix_connect )
+
+    with pytest.warns( RuntimeWarning ):
+        pp_reader.load_snapshot( fix_electrical_network_id )
+
+    # All networks are retrieved with as many statements as a single network.
+    with pp_reader.query_report() as report:
+        snapshots = pp_reader.load_snapshots( network_ids )
+
+    assert( list( snapshots.keys() ) == network_ids )
+    assert( report.total.round_trips == len( snapshots[ fix_electrical_network_id ] ) + 2 )
+
+    # The snapshots are identical to snapshots retrieved separately.
+    for network_id in network_ids:
+        snapshot = pp_reader.load_snapshot( network_id )
+        assert( sorted( snapshot.feature_ids ) == sorted( snapshots[ network_id ].feature_ids ) )
+        for name in snapshot.names:
+            assert( set( snapshot.rows( name ) ) == set( snapshots[ network_id ].rows( name ) ) )
+
+    # Construct the models in the current process and in worker processes.
+    nets = pp_reader.get_nets( network_ids )
+    parallel_nets = pp_reader.get_nets( network_ids, processes = 2 )
+
+    assert( len( nets[ fix_electrical_network_id ].bus ) == 4 )
+    assert( len( nets[ disconnected_network_id ].bus ) == 2 )
+
+    for network_id in network_ids:
+        for table in [ 'bus', 'line', 'load', 'trafo', 'switch', 'ext_grid' ]:
+            pd.testing.assert_frame_equal( nets[ network_id ][ table ], parallel_nets[ network_id ][ table ] )
+
+
+def test_sim_reader_parallel_assembly( fix_connect, fix_electrical_network_id, fix_disconnected_network ):
+    pp_reader = PandaPowerModelDBReader( fix_connect )
+
+    with pytest.warns( RuntimeWarning ):
+        snapshot = pp_reader.load_snapshot( fix_electrical_network_id )
+
+    # The network is connected, hence it is assembled in the current process.
+    assert( len( pp_reader.partition_snapshot( snapshot, 2 ) ) == 1 )
+
+    net = pp_reader.get_net_from_snapshot( snapshot, processes = 2, validate = True )
+    assert( len( net.bus ) == 4 )
+
+    # The two busses of this network are not connected.
+    ( disconnected_network_id, _ ) = fix_disconnected_network
+    snapshot = pp_reader.load_snapshot( disconnected_network_id )
+    partitions = pp_reader.partition_snapshot( snapshot, 2 )
+
+    assert( len( partitions ) == 2 )
+    assert( sorted( id for p in partitions for id in p.feature_ids ) == sorted( snapshot.feature_ids ) )
+
+    # The partial models are merged into the same model as assembled in the current process.
+    net = pp_reader.get_net_from_snapshot( snapshot, processes = 2, validate = True )
+    serial_net = pp_reader.get_net_from_snapshot( snapshot )
+
+    assert( pp_reader.net_elements( net ) == pp_reader.net_elements( serial_net ) )
+    pd.testing.assert_frame_equal(
+        net.bus.sort_values( 'name' ).reset_index( drop = True ),
+        serial_net.bus.sort_values( 'name' ).reset_index( drop = True )
+        )
+
+
+def test_sim_reader_snapshot_file( fix_connect, fix_electrical_network_id, tmp_path ):
+    pyarrow = pytest.importorskip( 'pyarrow' )
+    from dblayer.sim.snapshot_file import SnapshotFile
+    from dblayer.sim.network_snapshot import NetworkSnapshot
+
+    pp_reader = PandaPowerModelDBReader( fix_connect )
+
+    with pytest.warns( RuntimeWarning ):
+        snapshot = pp_reader.load_snapshot( fix_electrical_network_id )
+
+    net = pp_reader.get_net_from_snapshot( snapshot )
+
+    for format in SnapshotFile.formats:
+        snapshot_file = SnapshotFile.write( snapshot, tmp_path / format, format = format )
+
+        # The snapshot is restored completely.
+        restored = snapshot_file.read_snapshot()
+        assert( restored.network_id == fix_electrical_network_id )
+        assert( restored.feature_ids == snapshot.feature_ids )
+        assert( restored.version == snapshot.version )
+        assert( restored.tables == snapshot.tables )
+
+        # Each table is stored with native column types.
+        assert( snapshot_file.read_table( 'feature_graphs' ).column( 'id' ).type == pyarrow.int64() )
+
+        # Readers constructed with the file do not access the database.
+        file_reader = PandaPowerModelDBReader( snapshot_file )
+
+        with file_reader.query_report() as report:
+            file_net = file_reader.get_net( fix_electrical_network_id )
+
+        assert( report.total.round_trips == 0 )
+
+        for table in [ 'bus', 'line', 'load', 'trafo', 'switch', 'ext_grid' ]:
+            pd.testing.assert_frame_equal( net[ table ], file_net[ table ] )
+
+        with pytest.raises( RuntimeError ):
+            file_reader.load_snapshot( fix_electrical_network_id + 1 )
+
+        with pytest.raises( RuntimeError ):
+            file_reader.change_token( fix_electrical_network_id )
+
+    # Columns with values of mixed types are not supported.
+    with pytest.raises( TypeError ):
+        SnapshotFile.write( NetworkSnapshot( None, OrderedDict( t = OrderedDict( c = [ 1, 'a' ] ) ) ), tmp_path / 'mixed' )
+
+
+def test_sim_reader_geodata( fix_connect, fix_electrical_network_id ):
+    pp_reader = PandaPowerModelDBReader( fix_connect )
+
+    with pytest.warns( RuntimeWarning ):
+        net = pp_reader.get_net( fix_electrical_network_id )
+
+    assert( len( net.bus_geodata ) == len( net.bus ) )
+    assert( len( net.line_geodata ) == len( net.line ) )
+
+    # Without geodata, the models only differ in their geodata.
+    with pp_reader.query_report() as report:
+        net_without_geodata = pp_reader.get_net( fix_electrical_network_id, with_geodata = False )
+
+    assert( len( net_without_geodata.bus_geodata ) == 0 )
+    assert( len( net_without_geodata.line_geodata ) == 0 )
+
+    for table in [ 'bus', 'line', 'load', 'trafo', 'switch', 'ext_grid' ]:
+        pd.testing.assert_frame_equal( net[ table ], net_without_geodata[ table ] )
+
+    # The reader mode is restored after the call.
+    assert( pp_reader.with_geodata is True )
+
+    # Lazy geodata are not supported by pandapower, which copies them to its tables.
+    with pytest.raises( RuntimeError ):
+        pp_reader.get_net( fix_electrical_network_id, with_geodata = 'lazy' )
+
+    with pytest.raises( RuntimeError ):
+        PandaPowerModelDBReader( fix_connect, with_geodata = 'lazy' )
+
+    with pytest.raises( RuntimeError ):
+        pp_reader.get_net( fix_electrical_network_id, with_geodata = 'yes' )
+
+    class LazyGeodataReader( PandaPowerModelDBReader ):
+        # Keep the placeholders instead of copying the geodata to the tables.
+        supports_lazy_geodata = True
+
+        def add_busses( self, net, busses ):
+            self.bus_geodata = [ b[ 'geodata' ] for b in busses ]
+            super().add_busses( net, [ dict( b, geodata = None ) for b in busses ] )
+
+        def add_lines( self, net, lines ):
+            self.line_geodata = [ l[ 'geodata' ] for l in lines ]
+            super().add_lines( net, [ dict( l, geodata = None ) for l in lines ] )
+
+    lazy_reader = LazyGeodataReader( fix_connect, with_geodata = 'lazy' )
+
+    # No geometry is retrieved before the geodata are accessed.
+    with lazy_reader.query_report() as lazy_report:
+        lazy_reader.get_net( fix_electrical_network_id )
+
+    assert( 'GeodataLoader.geometry' not in lazy_report.by_method )
+
+    # The geodata of all elements are retrieved with a single statement on first access.
+    with lazy_reader.query_report() as access_report:
+        bus_geodata = [ ( g.x, g.y ) for g in lazy_reader.bus_geodata ]
+        line_geodata = [ g.list() for g in lazy_reader.line_geodata ]
+
+    assert( access_report.by_method[ 'GeodataLoader.geometry' ].round_trips == 1 )
+    assert( bus_geodata == list( zip( net.bus_geodata.x, net.bus_geodata.y ) ) )
+    assert( line_geodata == net.line_geodata.coords.tolist() )
+
+    lazy_reader.disconnect_from_citydb()
+
+
+def test_sim_reader_subnet( fix_connect, fix_electrical_network_id ):
+    pp_reader = PandaPowerModelDBReader( fix_connect )
+
+    with pytest.warns( RuntimeWarning ):
+        snapshot = pp_reader.load_snapshot( fix_electrical_network_id )
+
+    bus_ids = dict( zip( snapshot.tables[ 'busses' ][ 'name' ], snapshot.tables[ 'busses' ][ 'id' ] ) )
+
+    # Select the features around bus 'bus-2': the line to bus 'bus-1' is complete, the switch behind it is not.
+    net = pp_reader.get_subnet( fix_electrical_network_id, roots = [ bus_ids[ 'bus-2' ] ], hops = 1 )
+
+    assert( sorted( net.bus.name ) == [ 'bus-1', 'bus-2' ] )
+    assert( len( net.line ) == 1 )
+    assert( len( net.load ) == 1 )
+    assert( len( net.switch ) == 0 )
+    assert( len( net.trafo ) == 0 )
+
+    # The rest of the network is replaced by an external grid at the boundary.
+    assert( list( net.ext_grid.name ) == [ 'boundary-bus-1' ] )
+    pp.runpp( net, numba=False )
+
+    # Select the features within a polygon (excluding the medium voltage bus).
+    bounds = [ Point2D( 2.5, -1. ), Point2D( 11., -1. ), Point2D( 11., 1. ), Point2D( 2.5, 1. ), Point2D( 2.5, -1. ) ]
+    net = pp_reader.get_subnet( fix_electrical_network_id, bounds = bounds )
+
+    assert( 'bus-1' in list( net.bus.name ) and 'bus-2' in list( net.bus.name ) )
+    assert( 'bus-mv' not in list( net.bus.name ) )
+    assert( len( net.ext_grid ) >= 1 )
+
+    # Parameters are checked.
+    with pytest.raises( RuntimeError ):
+        pp_reader.get_subnet( fix_electrical_network_id )
+    with pytest.raises( RuntimeError ):
+        pp_reader.get_subnet( fix_electrical_network_id, roots = [ bus_ids[ 'bus-2' ] ] )